@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'core.middleware.DBReadinessMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -90,6 +92,37 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'core.User'
 
+# Cache
+# CACHE_URL selects a shared backend: redis://host:6379/0, memcached://host:11211,
+# db://table_name (DatabaseCache; run `createcachetable`), file:///path or locmem://.
+# Use Redis in production: its add() is atomic across processes, which the stampede
+# locks, metrics slots and shared sidebar status rely on. Unset, each process keeps its
+# own in-memory cache, so nothing is shared between the web, worker and scheduler.
+
+def _cache_config(url):
+    if url.startswith(('redis://', 'rediss://')):
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': url}
+    if url.startswith('memcached://'):
+        return {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': url[len('memcached://'):]}
+    if url.startswith('db://'):
+        return {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': url[len('db://'):] or 'iims_cache'}
+    if url.startswith('file://'):
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': url[len('file://'):]}
+    return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'iims'}
+
+if 'test' in sys.argv:
+    _cache_url = 'locmem://'
+else:
+    _cache_url = os.getenv('CACHE_URL', 'locmem://')
+
+CACHES = {
+    'default': dict(
+        _cache_config(_cache_url),
+        KEY_PREFIX='iims',
+        TIMEOUT=int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300')),
+    )
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -136,3 +169,126 @@ GROQ_MODEL = os.getenv('GROQ_MODEL', 'openai/gpt-oss-120b')
 GROQ_TEMPERATURE = float(os.getenv('GROQ_TEMPERATURE', '0.7'))
 GROQ_REASONING_EFFORT = os.getenv('GROQ_REASONING_EFFORT', 'medium')
 GROQ_MAX_COMPLETION_TOKENS = int(os.getenv('GROQ_MAX_COMPLETION_TOKENS', '8192'))
+
+# Agent knowledge base chunking (characters)
+AGENT_CHUNK_SIZE = int(os.getenv('AGENT_CHUNK_SIZE', '1200'))
+AGENT_CHUNK_OVERLAP = int(os.getenv('AGENT_CHUNK_OVERLAP', '200'))
+
+# Agent document processing pipeline
+AGENT_DOC_MAX_PAGES = int(os.getenv('AGENT_DOC_MAX_PAGES', '1000'))
+AGENT_DOC_MAX_BYTES = int(os.getenv('AGENT_DOC_MAX_BYTES', str(50 * 1024 * 1024)))
+# Characters of extracted text kept on the document row; the full text lives in its chunks
+AGENT_DOC_CONTENT_CHARS = int(os.getenv('AGENT_DOC_CONTENT_CHARS', '200000'))
+
+# Agent prompt token budgets (estimated tokens per section)
+AGENT_PROMPT_MAX_TOKENS = int(os.getenv('AGENT_PROMPT_MAX_TOKENS', '12000'))
+AGENT_PROMPT_SYSTEM_TOKENS = int(os.getenv('AGENT_PROMPT_SYSTEM_TOKENS', '3000'))
+AGENT_PROMPT_REPORT_TOKENS = int(os.getenv('AGENT_PROMPT_REPORT_TOKENS', '1500'))
+AGENT_PROMPT_RAG_TOKENS = int(os.getenv('AGENT_PROMPT_RAG_TOKENS', '2000'))
+AGENT_PROMPT_SUMMARY_TOKENS = int(os.getenv('AGENT_PROMPT_SUMMARY_TOKENS', '800'))
+AGENT_PROMPT_HISTORY_TOKENS = int(os.getenv('AGENT_PROMPT_HISTORY_TOKENS', '3000'))
+AGENT_PROMPT_USER_TOKENS = int(os.getenv('AGENT_PROMPT_USER_TOKENS', '4000'))
+
+# Rolling conversation summaries: condense once this many turns are unsummarised,
+# keeping the most recent ones verbatim (capped below the agent's 10-message history window)
+AGENT_SUMMARY_THRESHOLD = int(os.getenv('AGENT_SUMMARY_THRESHOLD', '9'))
+AGENT_SUMMARY_KEEP_RECENT = int(os.getenv('AGENT_SUMMARY_KEEP_RECENT', '6'))
+
+# Intelligence graph: cached adjacency lists (seconds) and per-entity neighbour cap
+GRAPH_ADJACENCY_TTL = int(os.getenv('GRAPH_ADJACENCY_TTL', '600'))
+GRAPH_MAX_FANOUT = int(os.getenv('GRAPH_MAX_FANOUT', '200'))
+# CSR graph snapshot for analytics: where it is written (shared by the web and worker
+# processes) and how often run_scheduler queues a refresh (seconds)
+GRAPH_SNAPSHOT_DIR = os.getenv('GRAPH_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'var', 'graph_snapshot'))
+GRAPH_SNAPSHOT_INTERVAL = int(os.getenv('GRAPH_SNAPSHOT_INTERVAL', '900'))
+
+# Trend rollups: EWMA spike detector on hourly report counts
+TREND_EWMA_ALPHA = float(os.getenv('TREND_EWMA_ALPHA', '0.08'))
+TREND_Z_THRESHOLD = float(os.getenv('TREND_Z_THRESHOLD', '4.0'))
+TREND_MIN_SPIKE_COUNT = int(os.getenv('TREND_MIN_SPIKE_COUNT', '5'))
+TREND_WARMUP_HOURS = int(os.getenv('TREND_WARMUP_HOURS', '24'))
+
+# Sidebar status indicators are served from cache and refreshed after this many seconds
+GLOBAL_STATUS_TTL = int(os.getenv('GLOBAL_STATUS_TTL', '60'))
+
+# DB circuit breaker (core.circuit_breaker): consecutive connection failures before
+# requests fail fast, and the initial/maximum cool-down before a probe (seconds)
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv('DB_BREAKER_FAILURE_THRESHOLD', '3'))
+DB_BREAKER_RESET_TIMEOUT = float(os.getenv('DB_BREAKER_RESET_TIMEOUT', '5'))
+DB_BREAKER_MAX_RESET_TIMEOUT = float(os.getenv('DB_BREAKER_MAX_RESET_TIMEOUT', '60'))
+
+# Audit log sink (core.audit): entries are spooled to disk and bulk-inserted in the
+# background every AUDIT_FLUSH_INTERVAL seconds or once AUDIT_BATCH_SIZE are buffered
+AUDIT_SPOOL_DIR = os.getenv('AUDIT_SPOOL_DIR', os.path.join(BASE_DIR, 'var', 'audit'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '2'))
+# Tests write synchronously so assertions see the rows inside the test transaction
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'False' if 'test' in sys.argv else 'True') == 'True'
+
+# Manual URL fetch (intelligence.url_fetcher): concurrent downloads per job, parallel
+# requests per host, and the overall deadline (seconds) after which a job stops waiting
+URL_FETCH_WORKERS = int(os.getenv('URL_FETCH_WORKERS', '8'))
+URL_FETCH_PER_HOST = int(os.getenv('URL_FETCH_PER_HOST', '2'))
+URL_FETCH_DEADLINE = float(os.getenv('URL_FETCH_DEADLINE', '90'))
+# Pages are truncated at this size; parser backend is lxml, html.parser or regex
+# (empty: lxml when installed, else html.parser)
+URL_FETCH_MAX_BYTES = int(os.getenv('URL_FETCH_MAX_BYTES', str(2 * 1024 * 1024)))
+URL_FETCH_PARSER = os.getenv('URL_FETCH_PARSER', '')
+
+# Adaptive RSS polling (intelligence.scheduler): bounds and starting point of each
+# source's poll interval (seconds), and the new items a poll should find on average
+SOURCE_POLL_MIN_INTERVAL = int(os.getenv('SOURCE_POLL_MIN_INTERVAL', '300'))
+SOURCE_POLL_MAX_INTERVAL = int(os.getenv('SOURCE_POLL_MAX_INTERVAL', str(6 * 3600)))
+SOURCE_POLL_DEFAULT_INTERVAL = int(os.getenv('SOURCE_POLL_DEFAULT_INTERVAL', '1800'))
+SOURCE_POLL_ITEMS_PER_POLL = float(os.getenv('SOURCE_POLL_ITEMS_PER_POLL', '2'))
+
+# Background jobs (intelligence.jobs, run by `manage.py run_jobs`): job slots per
+# worker process, retry backoff base and the heartbeat age after which a running
+# job is requeued (seconds). JOB_CONCURRENCY caps running jobs per type.
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', '30'))
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '300'))
+# Tests run jobs inline inside enqueue() so they share the test transaction
+JOBS_ASYNC = os.getenv('JOBS_ASYNC', 'False' if 'test' in sys.argv else 'True') == 'True'
+
+# Per-source quarantine (intelligence.scheduler): consecutive failures before a feed
+# is quarantined, first quarantine length and its cap (seconds); feed download timeout
+SOURCE_QUARANTINE_AFTER = int(os.getenv('SOURCE_QUARANTINE_AFTER', '3'))
+SOURCE_QUARANTINE_BASE = int(os.getenv('SOURCE_QUARANTINE_BASE', '1800'))
+SOURCE_QUARANTINE_MAX = int(os.getenv('SOURCE_QUARANTINE_MAX', str(24 * 3600)))
+# Seconds a worker's claim on a source lasts if it dies before releasing it
+SOURCE_FETCH_CLAIM_SECONDS = int(os.getenv('SOURCE_FETCH_CLAIM_SECONDS', '1800'))
+FEED_FETCH_TIMEOUT = float(os.getenv('FEED_FETCH_TIMEOUT', '20'))
+
+# Pipeline metrics (core.metrics, served at /health/metrics/): how often each process
+# shares its counters through the cache, how long a silent process stays included
+# (seconds), and an optional bearer token required from scrapers
+METRICS_PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', '15'))
+METRICS_SNAPSHOT_TTL = int(os.getenv('METRICS_SNAPSHOT_TTL', '3600'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Structured log lines (e.g. one JSON line per feed ingestion from `iims.metrics`)
+# go to stderr; tests only show warnings
+LOG_LEVEL = 'WARNING' if 'test' in sys.argv else os.getenv('LOG_LEVEL', 'INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'iims': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+        'intelligence': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# Request profiling (core.profiling, report at /health/profile/ for staff): off by
+# default; the fraction of requests profiled, samples kept per view and process, and
+# the duration (ms) above which a request is written to the slow log
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', 'False') == 'True'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '1.0'))
+PROFILE_WINDOW = int(os.getenv('PROFILE_WINDOW', '200'))
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '1000'))
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.core.signals import got_request_exception
+        from .circuit_breaker import record_request_exception
+        got_request_exception.connect(record_request_exception, dispatch_uid='core_db_circuit_breaker')
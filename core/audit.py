@@ -0,0 +1,226 @@
+"""
+Buffered audit sink for UserActionLog.
+
+Views call `record_action()` instead of `UserActionLog.objects.create()`. The entry is
+appended to a per-process spool file (so it survives a crash before the flush) and to
+an in-memory buffer; a background thread bulk-inserts the buffer every
+AUDIT_FLUSH_INTERVAL seconds or as soon as AUDIT_BATCH_SIZE entries are waiting.
+
+Spool files:
+  audit-<pid>.jsonl             entries written since the last flush of a live worker
+  audit-<pid>-<n>.flushing      a batch being inserted by its worker
+  audit-<pid>-<n>.pending       a batch whose insert failed, or a dead worker's spool
+Pending files are replayed on every flush and by `manage.py flush_audit_spool`.
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger('iims.audit')
+
+
+class AuditSink:
+    def __init__(self, spool_dir, batch_size=200, flush_interval=2.0, asynchronous=True):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.asynchronous = asynchronous
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._buffer = []
+        self._spool = None
+        self._pid = None
+
+    # -- recording -----------------------------------------------------------
+
+    def record(self, user, action, target_object='', details='', ip_address=None):
+        entry = {
+            'user_id': user.pk if hasattr(user, 'pk') else user,
+            'action': action,
+            'target_object': (target_object or '')[:255],
+            'details': details or '',
+            'ip_address': ip_address or None,
+            'timestamp': timezone.now().isoformat(),
+        }
+        if not self.asynchronous:
+            self._write([entry])
+            return
+
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._ensure_started()
+            try:
+                if self._spool is None:
+                    self._spool = open(self._spool_path(), 'a', encoding='utf-8')
+                self._spool.write(line)
+                self._spool.flush()
+            except OSError as e:
+                # Still buffered in memory; only crash durability is lost
+                logger.warning(f"Audit spool write failed: {e}")
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _spool_path(self):
+        return self.spool_dir / f'audit-{os.getpid()}.jsonl'
+
+    def _ensure_started(self):
+        """Starts the flush thread once per process (also after a fork). Caller holds the lock."""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._buffer = []
+        self._spool = None
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        # A spool left by an earlier process with the same pid is not ours to flush
+        if self._spool_path().exists():
+            self._to_pending(self._spool_path())
+        threading.Thread(target=self._run, name='audit-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        from django.db import close_old_connections
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Audit flush loop error: {e}")
+            finally:
+                close_old_connections()
+
+    # -- flushing ------------------------------------------------------------
+
+    def flush(self):
+        """Writes the buffered entries, then replays pending spools. Returns the number written."""
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+            claimed = None
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+                claimed = self._rename(self._spool_path(), '.flushing')
+
+        written = 0
+        if entries:
+            try:
+                self._write(entries)
+                written = len(entries)
+            except Exception as e:
+                # The spool keeps these entries; the next flush retries them
+                logger.error(f"Audit flush failed, {len(entries)} entries kept in spool: {e}")
+                if claimed is not None:
+                    os.replace(claimed, claimed.with_suffix('.pending'))
+                return 0
+        if claimed is not None:
+            claimed.unlink(missing_ok=True)
+        return written + self.replay_pending()
+
+    def _to_pending(self, path):
+        return self._rename(path, '.pending')
+
+    def _rename(self, path, suffix):
+        target = path.with_name(f'{path.stem}-{time.time_ns()}{suffix}')
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            return None
+        return target
+
+    def replay_pending(self):
+        """Inserts the entries of pending spools and dead workers' spools. Returns the number written."""
+        if not self.spool_dir.exists():
+            return 0
+        for spool in self.spool_dir.glob('audit-*.jsonl'):
+            pid = spool.stem.split('-')[1]
+            if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                self._to_pending(spool)
+        for spool in self.spool_dir.glob('audit-*.flushing'):
+            pid = spool.stem.split('-')[1]
+            if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                os.replace(spool, spool.with_suffix('.pending'))
+        for spool in self.spool_dir.glob('audit-*.replaying-*'):
+            pid = spool.suffix.rsplit('-', 1)[1]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                os.replace(spool, spool.with_suffix('.pending'))
+
+        written = 0
+        for pending in sorted(self.spool_dir.glob('audit-*.pending')):
+            # Renaming claims the file, so concurrent workers never replay it twice
+            replaying = pending.with_suffix(f'.replaying-{os.getpid()}')
+            try:
+                os.replace(pending, replaying)
+            except FileNotFoundError:
+                continue
+            try:
+                entries = _read_spool(replaying)
+                self._write(entries)
+            except Exception as e:
+                logger.error(f"Audit replay of {pending.name} failed: {e}")
+                os.replace(replaying, pending)
+                break
+            replaying.unlink(missing_ok=True)
+            written += len(entries)
+        return written
+
+    def _write(self, entries):
+        from django.contrib.auth import get_user_model
+        from .models import UserActionLog
+        # Users deleted before the flush would fail the whole batch on the foreign key
+        user_ids = {entry['user_id'] for entry in entries}
+        known = set(get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True))
+        UserActionLog.objects.bulk_create([
+            UserActionLog(
+                user_id=entry['user_id'],
+                action=entry['action'],
+                target_object=entry['target_object'],
+                details=entry['details'],
+                ip_address=entry['ip_address'],
+                timestamp=parse_datetime(entry['timestamp']),
+            )
+            for entry in entries if entry['user_id'] in known
+        ], batch_size=500)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_spool(path):
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Torn last line from a crash mid-write
+                logger.warning(f"Skipping unreadable audit spool line in {path.name}")
+    return entries
+
+
+audit_sink = AuditSink(
+    spool_dir=getattr(settings, 'AUDIT_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'var', 'audit')),
+    batch_size=int(getattr(settings, 'AUDIT_BATCH_SIZE', 200)),
+    flush_interval=float(getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2)),
+    asynchronous=getattr(settings, 'AUDIT_ASYNC', True),
+)
+
+
+def record_action(user, action, target_object='', details='', ip_address=None):
+    """Queues a UserActionLog entry; it is written to the database in the background."""
+    audit_sink.record(user, action, target_object, details, ip_address)
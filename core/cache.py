@@ -0,0 +1,174 @@
+"""
+Namespaced access to the shared cache (settings.CACHES['default']).
+
+Each subsystem gets its own namespace (dashboard, translation, rules, search, graph, jobs)
+with O(1) invalidation through a version counter, stampede-protected get_or_set and
+per-process hit/miss counters reported by the health endpoints.
+"""
+import os
+import time
+import logging
+import threading
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class NamespacedCache:
+    # Time a recompute may hold the lock before another caller takes over
+    LOCK_TIMEOUT = 30
+    # How long callers wait for another worker's recompute on a cold key
+    COLD_WAIT = 2.0
+    COLD_POLL = 0.05
+
+    def __init__(self, namespace, default_timeout=300):
+        self.namespace = namespace
+        self.default_timeout = default_timeout
+        self._stats_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'recomputes': 0, 'waits': 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _version(self):
+        version = cache.get(f'ns:{self.namespace}:version')
+        if version is None:
+            cache.add(f'ns:{self.namespace}:version', 1, None)
+            version = cache.get(f'ns:{self.namespace}:version') or 1
+        return version
+
+    def make_key(self, key):
+        return f'ns:{self.namespace}:{self._version()}:{key}'
+
+    def get(self, key, default=None):
+        envelope = cache.get(self.make_key(key), _MISSING)
+        if envelope is _MISSING:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return envelope['value']
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        # Kept past its freshness window so it can be served while being recomputed
+        cache.set(self.make_key(key), {'value': value, 'fresh_until': time.time() + timeout}, timeout * 2)
+
+    def delete(self, key):
+        cache.delete(self.make_key(key))
+
+    def add(self, key, value, timeout=None):
+        """Atomic set-if-absent (on backends that support it); used for locks and leases."""
+        timeout = self.default_timeout if timeout is None else timeout
+        return cache.add(self.make_key(key), {'value': value, 'fresh_until': time.time() + timeout}, timeout)
+
+    def get_many(self, keys):
+        prefix = self.make_key('')
+        found = cache.get_many([prefix + key for key in keys])
+        hits = len(found)
+        with self._stats_lock:
+            self.stats['hits'] += hits
+            self.stats['misses'] += len(keys) - hits
+        return {full_key[len(prefix):]: envelope['value'] for full_key, envelope in found.items()}
+
+    def set_many(self, mapping, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        prefix = self.make_key('')
+        fresh_until = time.time() + timeout
+        cache.set_many(
+            {prefix + key: {'value': value, 'fresh_until': fresh_until} for key, value in mapping.items()},
+            timeout * 2,
+        )
+
+    def delete_many(self, keys):
+        prefix = self.make_key('')
+        cache.delete_many([prefix + key for key in keys])
+
+    def invalidate(self):
+        """Drops every key in the namespace at once by moving to a new version."""
+        try:
+            cache.incr(f'ns:{self.namespace}:version')
+        except ValueError:
+            cache.set(f'ns:{self.namespace}:version', 2, None)
+
+    def get_or_set(self, key, producer, timeout=None):
+        """
+        Returns the cached value, computing it with `producer()` when missing or stale.
+        Only the caller holding the recompute lock runs the producer: others are served
+        the stale value, or on a cold key wait briefly for the lock holder's result.
+        """
+        full_key = self.make_key(key)
+        lock_key = f'{full_key}:lock'
+        envelope = cache.get(full_key, _MISSING)
+
+        if envelope is not _MISSING:
+            if time.time() < envelope['fresh_until']:
+                self._count('hits')
+                return envelope['value']
+            if not cache.add(lock_key, os.getpid(), self.LOCK_TIMEOUT):
+                self._count('stale')
+                return envelope['value']
+        else:
+            self._count('misses')
+            if not cache.add(lock_key, os.getpid(), self.LOCK_TIMEOUT):
+                self._count('waits')
+                deadline = time.time() + self.COLD_WAIT
+                while time.time() < deadline:
+                    time.sleep(self.COLD_POLL)
+                    envelope = cache.get(full_key, _MISSING)
+                    if envelope is not _MISSING:
+                        return envelope['value']
+                # Lock holder is slow or gone; compute without the lock rather than fail
+
+        try:
+            self._count('recomputes')
+            value = producer()
+            self.set(key, value, timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+
+NAMESPACES = {}
+
+
+def namespace(name, default_timeout=300):
+    """Returns the process-wide NamespacedCache for a subsystem."""
+    if name not in NAMESPACES:
+        NAMESPACES[name] = NamespacedCache(name, default_timeout)
+    return NAMESPACES[name]
+
+
+dashboard_cache = namespace('dashboard', 60)
+translation_cache = namespace('translation', 3600)
+rules_cache = namespace('rules', 600)
+search_cache = namespace('search', 300)
+graph_cache = namespace('graph', 600)
+
+
+def cache_stats():
+    """Backend description and this process's hit/miss counters per namespace."""
+    from django.conf import settings
+    stats = {}
+    for name, ns in NAMESPACES.items():
+        counters = dict(ns.stats)
+        lookups = counters['hits'] + counters['misses'] + counters['stale']
+        counters['hit_ratio'] = round((counters['hits'] + counters['stale']) / lookups, 3) if lookups else None
+        stats[name] = counters
+
+    backend = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+    reachable = True
+    try:
+        cache.set('health:ping', 1, 10)
+        reachable = cache.get('health:ping') == 1
+    except Exception as e:
+        logger.warning(f"Cache backend unreachable: {e}")
+        reachable = False
+    return {
+        'status': 'healthy' if reachable else 'unhealthy',
+        'backend': backend,
+        'scope': f'process {os.getpid()}',
+        'namespaces': stats,
+    }
@@ -0,0 +1,143 @@
+import time
+import logging
+import threading
+from django.conf import settings
+from django.db import connection
+from django.db.utils import OperationalError, InterfaceError
+
+logger = logging.getLogger('iims.db')
+
+# Errors that mean "the database is unreachable", as opposed to bad queries or constraint violations
+CONNECTIVITY_ERRORS = (OperationalError, InterfaceError)
+
+
+class CircuitBreaker:
+    """
+    Process-level view of database health.
+
+    CLOSED: requests pass; real query failures are counted and `failure_threshold`
+    consecutive ones open the circuit.
+    OPEN: requests fail fast until the cool-down expires. The cool-down doubles on
+    every failed probe, up to `max_reset_timeout`.
+    HALF_OPEN: exactly one thread runs a probe; everyone else keeps failing fast
+    until it reports back.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=5.0, max_reset_timeout=60.0, probe=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.probe = probe or self._select_one
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.open_count = 0
+            self.opened_until = 0.0
+            self.last_error = ''
+            self.last_failure_at = None
+            self.last_success_at = None
+
+    @staticmethod
+    def _select_one():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+
+    def record_success(self):
+        if self.state == self.CLOSED and not self.consecutive_failures:
+            # Hot path: avoid taking the lock on every successful query
+            self.last_success_at = time.time()
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("DB circuit closed: database reachable again")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.open_count = 0
+            self.last_success_at = time.time()
+
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+            self.last_failure_at = time.time()
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        timeout = min(self.reset_timeout * (2 ** self.open_count), self.max_reset_timeout)
+        self.open_count += 1
+        self.state = self.OPEN
+        self.opened_until = time.time() + timeout
+        logger.error(f"DB circuit open for {timeout:.1f}s after {self.consecutive_failures} failures: {self.last_error}")
+
+    def retry_after(self):
+        return max(int(self.opened_until - time.time() + 0.999), 1)
+
+    def allow_request(self):
+        """True if the request may touch the database. Never blocks or sleeps."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.time() < self.opened_until:
+            return False
+        # Cool-down over (or a probe is in flight): only one thread gets to probe
+        if not self._probe_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                if self.state == self.CLOSED:
+                    return True
+                self.state = self.HALF_OPEN
+            try:
+                self.probe()
+            except Exception as e:
+                self.record_failure(e)
+                return False
+            self.record_success()
+            return True
+        finally:
+            self._probe_lock.release()
+
+    def observe(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook: feeds real query outcomes into the breaker."""
+        try:
+            result = execute(sql, params, many, context)
+        except CONNECTIVITY_ERRORS as e:
+            self.record_failure(e)
+            e._circuit_recorded = True
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_after': self.retry_after() if self.state != self.CLOSED else 0,
+            'last_error': self.last_error,
+            'last_failure_at': self.last_failure_at,
+            'last_success_at': self.last_success_at,
+        }
+
+
+db_breaker = CircuitBreaker(
+    failure_threshold=int(getattr(settings, 'DB_BREAKER_FAILURE_THRESHOLD', 3)),
+    reset_timeout=float(getattr(settings, 'DB_BREAKER_RESET_TIMEOUT', 5)),
+    max_reset_timeout=float(getattr(settings, 'DB_BREAKER_MAX_RESET_TIMEOUT', 60)),
+)
+
+
+def record_request_exception(sender, request=None, **kwargs):
+    """got_request_exception hook: counts connection failures raised outside query execution."""
+    import sys
+    error = sys.exc_info()[1]
+    if isinstance(error, CONNECTIVITY_ERRORS) and not getattr(error, '_circuit_recorded', False):
+        db_breaker.record_failure(error)
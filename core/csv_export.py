@@ -0,0 +1,32 @@
+"""
+Streaming CSV output shared by the audit log and report exports.
+
+Cells that a spreadsheet would evaluate as a formula (text starting with =, +, -, @
+or a tab/carriage return) are prefixed with a single quote, so an exported title or
+log detail can never run as a formula when the file is opened.
+"""
+import csv
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+def safe_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class StreamingCSVWriter:
+    """csv.writer whose writerow() returns the escaped CSV line instead of writing it."""
+
+    def __init__(self):
+        self._writer = csv.writer(Echo())
+
+    def writerow(self, row):
+        return self._writer.writerow([safe_cell(value) for value in row])
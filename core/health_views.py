@@ -6,6 +6,7 @@ Provides HTTP endpoints for monitoring system health.
 """
 
 from django.http import JsonResponse
+from django.contrib.auth.decorators import user_passes_test
 from django.db import connection
 from django.conf import settings
 import sys
@@ -26,12 +27,15 @@ def health_check(request):
     
     is_healthy = True
     
+    from .circuit_breaker import db_breaker
+
     # Check database
     try:
         with connection.cursor() as cursor:
             cursor.execute("SELECT 1")
             result = cursor.fetchone()
             if result[0] == 1:
+                db_breaker.record_success()
                 health_status['checks']['database'] = {
                     'status': 'healthy',
                     'message': 'Database connection successful'
@@ -43,12 +47,20 @@ def health_check(request):
                 }
                 is_healthy = False
     except Exception as e:
+        db_breaker.record_failure(e)
         health_status['checks']['database'] = {
             'status': 'unhealthy',
             'message': f'Database connection failed: {str(e)}'
         }
         is_healthy = False
     
+    # Request-path view of DB health (see core.circuit_breaker)
+    health_status['checks']['db_circuit'] = db_breaker.snapshot()
+
+    # Shared cache backend and this worker's hit ratios (see core.cache)
+    from .cache import cache_stats
+    health_status['checks']['cache'] = cache_stats()
+
     # Check if in debug mode
     health_status['checks']['debug_mode'] = {
         'status': 'info',
@@ -116,6 +128,11 @@ def detailed_health_check(request):
         }
         is_healthy = False
     
+    # Cache check
+    from .cache import cache_stats
+    health_status['checks']['cache'] = cache_stats()
+    health_status['checks']['cache']['location'] = settings.CACHES['default'].get('LOCATION', '')
+
     # Static files check
     static_root = settings.STATIC_ROOT
     if static_root and os.path.exists(static_root):
@@ -263,3 +280,34 @@ def db_health(request):
         except Exception:
             masked = 'present'
     return JsonResponse({'db': 'unavailable', 'error': last_error, 'database_url': masked}, status=503)
+
+
+def metrics(request):
+    """
+    Pipeline counters and stage timings of all processes in the Prometheus text format.
+    When METRICS_TOKEN is set, scrapers must send it as a bearer token.
+
+    Usage: GET /health/metrics/
+    """
+    from django.http import HttpResponse
+    from .metrics import render_prometheus
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization', '') != f'Bearer {token}':
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@user_passes_test(lambda u: u.is_staff)
+def request_profile(request):
+    """
+    Per-view latency and query percentiles, duplicated SQL and recent slow requests
+    collected by core.profiling.ProfilingMiddleware (PROFILE_REQUESTS=True).
+
+    Usage: GET /health/profile/ (staff only); ?reset=1 clears this process's samples
+    """
+    from .profiling import store, report
+    if request.GET.get('reset'):
+        store.reset()
+    data = report(top=int(request.GET.get('top', 20)))
+    data['enabled'] = getattr(settings, 'PROFILE_REQUESTS', False)
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
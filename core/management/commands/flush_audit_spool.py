@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core.audit import audit_sink
+
+
+class Command(BaseCommand):
+    help = 'Writes audit entries left in the spool directory by failed flushes or crashed workers'
+
+    def handle(self, *args, **options):
+        written = audit_sink.replay_pending()
+        self.stdout.write(self.style.SUCCESS(f"Replayed {written} audit entries from {audit_sink.spool_dir}"))
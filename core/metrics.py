@@ -0,0 +1,278 @@
+"""
+Lightweight counters and timers with a Prometheus text exposition.
+
+`registry.incr()` and `registry.observe()` update totals in this process only. Every
+PUBLISH_INTERVAL seconds (and at exit) the process writes its cumulative snapshot to
+the shared cache. /health/metrics/ sums the snapshots of all processes that published
+within SNAPSHOT_TTL, so the web workers, `run_jobs` and `run_scheduler` report
+together. A restarted process starts from zero, which Prometheus treats as a counter
+reset.
+
+`StageTimer` wraps one unit of work (e.g. one feed fetch): each `stage()` is observed
+in a histogram labelled by stage and added to per-label totals. `finish()` writes a
+single structured log line with the stage times and counts.
+"""
+import os
+import json
+import time
+import socket
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('iims.metrics')
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PUBLISH_INTERVAL = float(getattr(settings, 'METRICS_PUBLISH_INTERVAL', 15))
+SNAPSHOT_TTL = int(getattr(settings, 'METRICS_SNAPSHOT_TTL', 3600))
+
+HELP = {}
+
+
+def describe(name, kind, text):
+    """Registers the # HELP / # TYPE lines of a metric family."""
+    HELP[name] = (kind, text)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+class ProcessSnapshots:
+    """
+    Shares one snapshot per process through the cache. Each process owns a numbered
+    slot, `<kind>:slot:<n>`, claimed with cache.add() and written only by its owner, so
+    processes publishing at the same time never overwrite each other's totals. A slot
+    whose process stopped publishing expires after SNAPSHOT_TTL and is reused;
+    `<kind>:slots` holds the highest slot in use.
+    """
+
+    def __init__(self, kind, snapshot):
+        self.kind = kind
+        self.snapshot = snapshot
+        self.high_key = f'{kind}:slots'
+        # Off for one-off processes (benchmarks) that must not show up in the live totals
+        self.enabled = True
+        self._published = 0.0
+        self._owner = None
+        self._slot = None
+
+    def _slot_key(self, slot):
+        return f'{self.kind}:slot:{slot}'
+
+    def _slot_keys(self):
+        return [self._slot_key(slot) for slot in range(1, (cache.get(self.high_key) or 0) + 1)]
+
+    def _claim_slot(self, entry):
+        """Stores `entry` in the lowest free slot and returns its number."""
+        taken = cache.get_many(self._slot_keys())
+        slot = 1
+        while self._slot_key(slot) in taken or not cache.add(self._slot_key(slot), entry, SNAPSHOT_TTL):
+            slot += 1
+        return slot
+
+    def maybe_publish(self):
+        if time.monotonic() - self._published >= PUBLISH_INTERVAL:
+            self.publish()
+
+    def publish(self):
+        """Writes this process's snapshot to its slot in the shared cache."""
+        self._published = time.monotonic()
+        if not self.enabled:
+            return
+        owner = f'{socket.gethostname()}:{os.getpid()}'
+        if self._owner != owner:
+            # First publish, or a forked child that must not share its parent's slot
+            if self._owner is None:
+                atexit.register(self.publish)
+            self._owner, self._slot = owner, None
+        try:
+            entry = {'owner': owner, 'snapshot': self.snapshot()}
+            current = cache.get(self._slot_key(self._slot)) if self._slot else None
+            if current and current['owner'] == owner:
+                cache.set(self._slot_key(self._slot), entry, SNAPSHOT_TTL)
+            else:
+                # The slot also expires while the process stays silent for SNAPSHOT_TTL
+                self._slot = self._claim_slot(entry)
+            # Only ever raised; a lost race is repaired by the owner's next publish
+            if (cache.get(self.high_key) or 0) < self._slot:
+                cache.set(self.high_key, self._slot, None)
+        except Exception as e:
+            logger.warning(f"{self.kind} publish failed: {e}")
+
+    def collect(self):
+        """Snapshots of all live processes, this one freshly published."""
+        self.publish()
+        return [entry['snapshot'] for entry in cache.get_many(self._slot_keys()).values()]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self.shared = ProcessSnapshots('metrics', self.snapshot)
+        # When set to a list, every observation is also appended as (name, labels, seconds)
+        self.trace = None
+
+    def incr(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += amount
+        self.shared.maybe_publish()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0, 0.0, [0] * len(BUCKETS)]
+            histogram[0] += 1
+            histogram[1] += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[2][i] += 1
+            if self.trace is not None:
+                self.trace.append((name, labels, seconds))
+        self.shared.maybe_publish()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, list(labels), count, total, list(buckets)]
+                    for (name, labels), (count, total, buckets) in self._histograms.items()
+                ],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def publish(self):
+        self.shared.publish()
+
+
+registry = Registry()
+
+
+def collect():
+    """Sums the published snapshots of all live processes."""
+    snapshots = registry.shared.collect()
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, count, total, buckets in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0, 0.0, [0] * len(BUCKETS)])
+            merged[0] += count
+            merged[1] += total
+            merged[2] = [a + b for a, b in zip(merged[2], buckets)]
+    return counters, histograms, len(snapshots)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _header(lines, name, kind, seen):
+    if name in seen:
+        return
+    seen.add(name)
+    if name in HELP:
+        lines.append(f'# HELP {name} {HELP[name][1]}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def render_prometheus():
+    """Metrics of all processes in the Prometheus text exposition format (0.0.4)."""
+    counters, histograms, processes = collect()
+    lines, seen = [], set()
+    lines.append('# HELP iims_metrics_processes Processes whose metrics are included')
+    lines.append('# TYPE iims_metrics_processes gauge')
+    lines.append(f'iims_metrics_processes {processes}')
+
+    for (name, labels), value in sorted(counters.items()):
+        _header(lines, name, 'counter', seen)
+        lines.append(f'{name}{_labels(labels)} {value:g}')
+
+    for (name, labels), (count, total, buckets) in sorted(histograms.items()):
+        _header(lines, name, 'histogram', seen)
+        for bound, cumulative in zip(BUCKETS, buckets):
+            lines.append(f'{name}_bucket{_labels(labels, [("le", f"{bound:g}")])} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {count}')
+        lines.append(f'{name}_sum{_labels(labels)} {total:.6f}')
+        lines.append(f'{name}_count{_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """
+    Times the stages of one unit of work. Stage durations go to the `<prefix>_stage_seconds`
+    histogram (labelled by stage only, to keep the series count low) and to
+    `<prefix>_stage_seconds_total` / `<prefix>_stage_calls_total` with the timer's labels.
+    """
+
+    def __init__(self, prefix, event, **labels):
+        self.prefix = prefix
+        self.event = event
+        self.labels = labels
+        self.stages = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        self.stages[name] += seconds
+        registry.observe(f'{self.prefix}_stage_seconds', seconds, stage=name)
+        registry.incr(f'{self.prefix}_stage_seconds_total', seconds, stage=name, **self.labels)
+        registry.incr(f'{self.prefix}_stage_calls_total', 1, stage=name, **self.labels)
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+        registry.incr(f'{self.prefix}_{name}_total', amount, **self.labels)
+
+    def finish(self, outcome='ok', **fields):
+        """Records the outcome and logs one JSON line with the stage breakdown."""
+        elapsed = time.perf_counter() - self.started
+        registry.incr(f'{self.prefix}_runs_total', 1, outcome=outcome, **self.labels)
+        registry.observe(f'{self.prefix}_run_seconds', elapsed, outcome=outcome)
+        logger.info(json.dumps({
+            'event': self.event,
+            'outcome': outcome,
+            **self.labels,
+            'seconds': round(elapsed, 4),
+            'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            'counts': dict(self.counts),
+            **fields,
+        }, ensure_ascii=False, default=str))
+        return elapsed
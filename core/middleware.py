@@ -1,13 +1,10 @@
-import time
 import logging
 from django.conf import settings
 from django.http import JsonResponse
 from django.db import connection
+from .circuit_breaker import db_breaker
 
 
-DB_READINESS_MAX_RETRIES = int(getattr(settings, 'DB_READINESS_MAX_RETRIES', 5))
-DB_READINESS_BACKOFF_BASE = float(getattr(settings, 'DB_READINESS_BACKOFF_BASE', 0.5))
-
 WHITELIST_PREFIXES = (
     '/health',
     getattr(settings, 'STATIC_URL', '/static/'),
@@ -15,25 +12,11 @@ WHITELIST_PREFIXES = (
 )
 
 
-def _check_db_ready(retries: int = DB_READINESS_MAX_RETRIES, base_delay: float = DB_READINESS_BACKOFF_BASE) -> bool:
-    logger = logging.getLogger('iims.db')
-    for attempt in range(retries):
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute('SELECT 1')
-                cursor.fetchone()
-            if attempt > 0:
-                logger.info(f"DB readiness confirmed after {attempt+1} attempts")
-            return True
-        except Exception as e:
-            delay = base_delay * (2 ** attempt)
-            logger.warning(f"DB not ready (attempt {attempt+1}/{retries}): {e}. Retrying in {delay:.2f}s")
-            time.sleep(delay)
-    logger.error("DB readiness failed after maximum retries")
-    return False
-
-
 class DBReadinessMiddleware:
+    """
+    Fails fast with a degraded response while the DB circuit breaker is open.
+    No per-request probe: the breaker learns from the queries requests actually run.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
         self.logger = logging.getLogger('iims.db')
@@ -46,11 +29,14 @@ class DBReadinessMiddleware:
         if any(path.startswith(pfx) for pfx in WHITELIST_PREFIXES):
             return self.get_response(request)
 
-        if not _check_db_ready():
-            return JsonResponse({
+        if not db_breaker.allow_request():
+            response = JsonResponse({
                 'status': 'degraded',
                 'message': 'النظام يعمل بوضع التدهور لعدم توفر قاعدة البيانات',
                 'allowlist': list(WHITELIST_PREFIXES),
             }, status=503)
+            response['Retry-After'] = str(db_breaker.retry_after())
+            return response
 
-        return self.get_response(request)
+        with connection.execute_wrapper(db_breaker.observe):
+            return self.get_response(request)
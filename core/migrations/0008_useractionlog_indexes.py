@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_user_national_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useractionlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='التوقيت'),
+        ),
+        migrations.AddIndex(
+            model_name='useractionlog',
+            index=models.Index(fields=['user', 'timestamp'], name='audit_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useractionlog',
+            index=models.Index(fields=['timestamp'], name='audit_time_idx'),
+        ),
+    ]
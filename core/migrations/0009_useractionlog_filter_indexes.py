@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_useractionlog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useractionlog',
+            index=models.Index(fields=['action', 'timestamp'], name='audit_action_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useractionlog',
+            index=models.Index(fields=['ip_address', 'timestamp'], name='audit_ip_time_idx'),
+        ),
+    ]
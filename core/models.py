@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import qrcode
 from io import BytesIO
@@ -64,12 +65,19 @@ class UserActionLog(models.Model):
     target_object = models.CharField(_("الهدف"), max_length=255, blank=True, help_text="Report ID, Search Query, etc.")
     details = models.TextField(_("التفاصيل"), blank=True)
     ip_address = models.GenericIPAddressField(_("عنوان IP"), null=True, blank=True)
-    timestamp = models.DateTimeField(_("التوقيت"), auto_now_add=True)
+    # Set when the action happens, not when the audit sink flushes it
+    timestamp = models.DateTimeField(_("التوقيت"), default=timezone.now, editable=False)
 
     class Meta:
         verbose_name = _("سجل نشاط")
         verbose_name_plural = _("سجلات الأنشطة")
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='audit_user_time_idx'),
+            models.Index(fields=['timestamp'], name='audit_time_idx'),
+            models.Index(fields=['action', 'timestamp'], name='audit_action_time_idx'),
+            models.Index(fields=['ip_address', 'timestamp'], name='audit_ip_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.action} - {self.timestamp}"
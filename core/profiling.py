@@ -0,0 +1,203 @@
+"""
+Opt-in request profiling (PROFILE_REQUESTS).
+
+`ProfilingMiddleware` wraps every DB query of a sampled request and records, per view,
+the query count, DB time and total time. Queries are grouped by fingerprint (the SQL
+with literals replaced by `?`); a fingerprint seen more than once in one request is
+the signature of an N+1 loop and is counted as duplicated. Requests slower than
+PROFILE_SLOW_MS are written to the `iims.profile` log and kept in a short slow list.
+
+Each process keeps the last PROFILE_WINDOW samples per view and shares them through
+the cache (see core.metrics.ProcessSnapshots); /health/profile/ merges them into
+percentiles for staff.
+"""
+import re
+import json
+import math
+import time
+import random
+import logging
+import threading
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from .metrics import ProcessSnapshots
+
+logger = logging.getLogger('iims.profile')
+
+WINDOW = int(getattr(settings, 'PROFILE_WINDOW', 200))
+SLOW_MS = float(getattr(settings, 'PROFILE_SLOW_MS', 1000))
+SLOW_KEEP = 50
+MAX_FINGERPRINTS = 200
+SKIP_PREFIXES = (getattr(settings, 'STATIC_URL', '/static/'), '/favicon.ico', '/health/profile')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with literals and placeholder lists collapsed, so the rows of one N+1 loop match."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)), 1) - 1]
+
+
+class RequestProfile:
+    """Collects the queries of one request; used as a DB execute wrapper."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        """{fingerprint: repeats} for queries run more than once."""
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class ProfileStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=WINDOW))
+        self.duplicates = {}
+        self.slow = deque(maxlen=SLOW_KEEP)
+        self.shared = ProcessSnapshots('profile', self.snapshot)
+
+    def record(self, view, total_ms, db_ms, queries, duplicates, slow=None):
+        with self._lock:
+            self.samples[view].append((round(total_ms, 2), round(db_ms, 2), queries, sum(duplicates.values()) - len(duplicates)))
+            for sql, count in duplicates.items():
+                entry = self.duplicates.setdefault(sql, {'requests': 0, 'extra_queries': 0, 'views': []})
+                entry['requests'] += 1
+                entry['extra_queries'] += count - 1
+                if view not in entry['views']:
+                    entry['views'].append(view)
+            if len(self.duplicates) > MAX_FINGERPRINTS:
+                keep = sorted(self.duplicates.items(), key=lambda item: -item[1]['extra_queries'])[:MAX_FINGERPRINTS // 2]
+                self.duplicates = dict(keep)
+            if slow:
+                self.slow.append(slow)
+        self.shared.maybe_publish()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'samples': {view: list(samples) for view, samples in self.samples.items()},
+                'duplicates': {sql: dict(entry, views=list(entry['views'])) for sql, entry in self.duplicates.items()},
+                'slow': list(self.slow),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.duplicates.clear()
+            self.slow.clear()
+
+
+store = ProfileStore()
+
+
+def report(top=20):
+    """Per-view percentiles, the worst duplicated queries and recent slow requests of all processes."""
+    snapshots = store.shared.collect()
+    samples = defaultdict(list)
+    duplicates = {}
+    slow = []
+    for snapshot in snapshots:
+        for view, rows in snapshot['samples'].items():
+            samples[view].extend(rows)
+        for sql, entry in snapshot['duplicates'].items():
+            merged = duplicates.setdefault(sql, {'requests': 0, 'extra_queries': 0, 'views': []})
+            merged['requests'] += entry['requests']
+            merged['extra_queries'] += entry['extra_queries']
+            merged['views'] += [view for view in entry['views'] if view not in merged['views']]
+        slow.extend(snapshot['slow'])
+
+    views = []
+    for view, rows in samples.items():
+        total, db, queries, repeated = zip(*rows)
+        views.append({
+            'view': view,
+            'requests': len(rows),
+            'total_ms': {f'p{p}': percentile(total, p) for p in (50, 95, 99)},
+            'db_ms': {f'p{p}': percentile(db, p) for p in (50, 95, 99)},
+            'queries': {'p50': percentile(queries, 50), 'p95': percentile(queries, 95), 'max': max(queries)},
+            'duplicated_queries_max': max(repeated),
+        })
+    views.sort(key=lambda row: -row['total_ms']['p95'])
+    worst = sorted(duplicates.items(), key=lambda item: -item[1]['extra_queries'])[:top]
+    return {
+        'processes': len(snapshots),
+        'window': WINDOW,
+        'slow_ms': SLOW_MS,
+        'views': views,
+        'duplicated_sql': [dict(entry, sql=sql) for sql, entry in worst],
+        'slow_requests': sorted(slow, key=lambda row: row['at'], reverse=True)[:SLOW_KEEP],
+    }
+
+
+class ProfilingMiddleware:
+    """
+    Records query count, DB time, total time and duplicated SQL per view for a
+    PROFILE_SAMPLE_RATE fraction of requests. Not loaded unless PROFILE_REQUESTS is on.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILE_REQUESTS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = float(getattr(settings, 'PROFILE_SAMPLE_RATE', 1.0))
+
+    def __call__(self, request):
+        if request.path.startswith(SKIP_PREFIXES) or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        db_ms = profile.db_seconds * 1000
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        duplicates = profile.duplicates()
+        slow = None
+        if total_ms >= SLOW_MS:
+            slow = {
+                'at': time.time(),
+                'view': view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': profile.queries,
+                'duplicated': sorted(duplicates.items(), key=lambda item: -item[1])[:5],
+            }
+            logger.warning(json.dumps({'event': 'slow_request', **slow}, ensure_ascii=False))
+        store.record(view, total_ms, db_ms, profile.queries, duplicates, slow)
+        return response
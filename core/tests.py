@@ -1,7 +1,18 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class SystemTest(TestCase):
     def test_sec_user_card(self):
         User = get_user_model()
@@ -30,3 +41,163 @@ class SystemTest(TestCase):
         self.assertContains(response, 'مدير النظام') # Full Name
         
         print("\n[TEST] Card View validated successfully.")
+
+
+class DBCircuitBreakerTests(TestCase):
+    def setUp(self):
+        from django.db.utils import OperationalError
+        from .circuit_breaker import CircuitBreaker
+        self.error = OperationalError("connection refused")
+        self.probe_calls = 0
+        self.probe_fails = True
+
+        def probe():
+            self.probe_calls += 1
+            if self.probe_fails:
+                raise self.error
+
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05, probe=probe)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self.breaker.record_failure(self.error)
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure(self.error)
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.probe_calls, 0)
+
+    def test_half_open_probe_closes_or_backs_off(self):
+        import time
+        self.breaker.record_failure(self.error)
+        self.breaker.record_failure(self.error)
+        time.sleep(0.06)
+        # Failed probe re-opens with a doubled cool-down
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.probe_calls, 1)
+        self.assertEqual(self.breaker.state, self.breaker.OPEN)
+        self.assertGreater(self.breaker.opened_until - time.time(), 0.06)
+
+        time.sleep(0.11)
+        self.probe_fails = False
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, self.breaker.CLOSED)
+
+    def test_middleware_serves_degraded_response_while_open(self):
+        from .circuit_breaker import db_breaker
+        db_breaker.reset()
+        self.addCleanup(db_breaker.reset)
+        for _ in range(db_breaker.failure_threshold):
+            db_breaker.record_failure(self.error)
+
+        response = self.client.get(reverse('login'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'degraded')
+        self.assertIn('Retry-After', response)
+        # Health endpoints stay reachable; their successful DB check closes the circuit
+        self.assertEqual(self.client.get('/health/').json()['checks']['db_circuit']['state'], 'closed')
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+
+class NamespacedCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .cache import NamespacedCache
+        cache.clear()
+        self.ns = NamespacedCache('test', default_timeout=60)
+        self.calls = 0
+
+    def producer(self):
+        self.calls += 1
+        return self.calls
+
+    def test_invalidate_drops_whole_namespace(self):
+        self.ns.set('a', 1)
+        self.ns.set_many({'b': 2, 'c': 3})
+        self.assertEqual(self.ns.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2, 'c': 3})
+        self.ns.invalidate()
+        self.assertIsNone(self.ns.get('a'))
+        self.assertEqual(self.ns.get_many(['b', 'c']), {})
+
+    def test_get_or_set_serves_stale_while_another_worker_recomputes(self):
+        from django.core.cache import cache
+        import time
+        self.assertEqual(self.ns.get_or_set('k', self.producer), 1)
+        self.assertEqual(self.ns.get_or_set('k', self.producer), 1)
+        # Past its freshness window but still within the hard TTL
+        cache.set(self.ns.make_key('k'), {'value': 1, 'fresh_until': time.time() - 1}, 60)
+        # Another worker holds the recompute lock: the stale value is served
+        cache.add(self.ns.make_key('k') + ':lock', 'other', 30)
+        self.assertEqual(self.ns.get_or_set('k', self.producer), 1)
+        self.assertEqual(self.ns.stats['stale'], 1)
+        # Lock released: the next caller recomputes
+        cache.delete(self.ns.make_key('k') + ':lock')
+        self.assertEqual(self.ns.get_or_set('k', self.producer), 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_rule_edits_invalidate_rules_cache(self):
+        from intelligence.models import ClassificationRule
+        from .cache import rules_cache
+        rules_cache.set('classification_rules', [])
+        ClassificationRule.objects.create(name='Cache rule', keywords='x')
+        self.assertIsNone(rules_cache.get('classification_rules'))
+
+    def test_health_reports_cache_stats(self):
+        data = self.client.get('/health/').json()['checks']['cache']
+        self.assertEqual(data['status'], 'healthy')
+        self.assertEqual(data['backend'], 'LocMemCache')
+        self.assertIn('dashboard', data['namespaces'])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .profiling import store
+        cache.clear()
+        store.reset()
+        self.user = get_user_model().objects.create_user(
+            username='analyst', password='Aa159632@', job_number='AN-001', is_staff=True,
+        )
+        self.client.force_login(self.user)
+
+    def test_fingerprint_collapses_literals(self):
+        from .profiling import fingerprint
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 7 AND name = 'x''y' AND k IN (%s, %s, %s)"),
+            fingerprint("SELECT *  FROM t WHERE id = 12 AND name = 'z' AND k IN (%s, %s)"),
+        )
+
+    @override_settings(PROFILE_REQUESTS=True)
+    def test_duplicated_queries_are_reported_per_view(self):
+        from unittest.mock import patch
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from django.urls import resolve
+        from intelligence.models import Source
+        from .profiling import ProfilingMiddleware
+        sources = [Source.objects.create(name=f'S{n}', url=f'http://s{n}.test/rss') for n in range(3)]
+
+        def n_plus_one(request):
+            request.resolver_match = resolve(reverse('source_manager'))
+            for source in sources:
+                Source.objects.get(pk=source.pk)
+            return HttpResponse()
+
+        with patch('core.profiling.SLOW_MS', 0), self.assertLogs('iims.profile', 'WARNING'):
+            ProfilingMiddleware(n_plus_one)(RequestFactory().get(reverse('source_manager')))
+        # Real requests go through the same middleware
+        self.assertEqual(self.client.get(reverse('check_notifications')).status_code, 200)
+
+        data = self.client.get(reverse('request_profile')).json()
+        views = {row['view']: row for row in data['views']}
+        self.assertEqual((views['check_notifications']['requests'], views['check_notifications']['duplicated_queries_max']), (1, 0))
+        self.assertEqual(views['source_manager']['duplicated_queries_max'], 2)
+        worst = data['duplicated_sql'][0]
+        self.assertIn('intelligence_source', worst['sql'])
+        self.assertEqual((worst['extra_queries'], worst['views']), (2, ['source_manager']))
+        self.assertEqual(data['slow_requests'][0]['view'], 'source_manager')
+
+    def test_report_is_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('request_profile')).status_code, 302)
@@ -1,4 +1,6 @@
-from django.test import TestCase, Client
+import shutil
+import tempfile
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from core.models import UserActionLog
 from intelligence.models import IntelligenceReport, Source
@@ -6,6 +8,15 @@ from django.urls import reverse
 
 User = get_user_model()
 
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class AuditLogTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -55,3 +66,135 @@ class AuditLogTests(TestCase):
         self.user.save()
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
+
+    def test_search_pages_log_once(self):
+        url = reverse('search') + '?q=secret'
+        self.client.get(url)
+        self.client.get(url + '&page=2')
+        self.assertEqual(UserActionLog.objects.filter(action=UserActionLog.ActionType.SEARCH).count(), 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AuditSinkTests(TestCase):
+    def setUp(self):
+        import shutil, tempfile
+        from core.audit import AuditSink
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, True)
+        # Flushes are driven by the test; the background thread never wakes up
+        self.sink = AuditSink(self.spool_dir, batch_size=10_000, flush_interval=3600)
+        self.user = User.objects.create_user(username='auditor', password='password')
+
+    def spool_files(self, pattern='*'):
+        import glob, os
+        return glob.glob(os.path.join(self.spool_dir, pattern))
+
+    def test_entries_are_spooled_then_bulk_inserted(self):
+        with self.assertNumQueries(0):
+            for i in range(3):
+                self.sink.record(self.user, UserActionLog.ActionType.VIEW_REPORT, f"Report ID: {i}")
+        self.assertEqual(len(self.spool_files('*.jsonl')), 1)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.sink.flush(), 3)
+        self.assertEqual(UserActionLog.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.spool_files(), [])
+
+    def test_failed_flush_is_replayed_from_spool(self):
+        from unittest import mock
+        self.sink.record(self.user, UserActionLog.ActionType.SEARCH, "Query: x")
+        with mock.patch.object(self.sink, '_write', side_effect=RuntimeError("db down")):
+            self.assertEqual(self.sink.flush(), 0)
+        self.assertEqual(len(self.spool_files('*.pending')), 1)
+        self.assertFalse(UserActionLog.objects.exists())
+
+        self.assertEqual(self.sink.flush(), 1)
+        self.assertEqual(UserActionLog.objects.get().target_object, "Query: x")
+
+    def test_dead_worker_spool_is_recovered(self):
+        import json, os
+        from django.utils import timezone
+        entry = {
+            'user_id': self.user.id, 'action': 'LOGIN', 'target_object': 'System Login',
+            'details': '', 'ip_address': '10.0.0.1', 'timestamp': timezone.now().isoformat(),
+        }
+        # pid above any pid_max, plus a torn line from a crash mid-write
+        with open(os.path.join(self.spool_dir, 'audit-99999999.jsonl'), 'w') as f:
+            f.write(json.dumps(entry) + '\n{"user_id": ')
+        self.assertEqual(self.sink.replay_pending(), 1)
+        self.assertEqual(UserActionLog.objects.get().ip_address, '10.0.0.1')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AuditExplorerTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        self.staff = User.objects.create_user(username='auditor', password='password', is_staff=True)
+        self.other = User.objects.create_user(username='analyst2', password='password')
+        self.client.login(username='auditor', password='password')
+        now = timezone.now()
+        logs = []
+        for i in range(250):
+            logs.append(UserActionLog(
+                user=self.other if i % 2 else self.staff,
+                action=UserActionLog.ActionType.SEARCH if i % 5 == 0 else UserActionLog.ActionType.VIEW_REPORT,
+                target_object=f"Report ID: {i}",
+                ip_address='10.0.0.5' if i % 10 == 0 else '10.0.0.1',
+                # Pairs share a timestamp so the id tie-breaker is exercised
+                timestamp=now - timedelta(minutes=i // 2),
+            ))
+        UserActionLog.objects.bulk_create(logs)
+
+    def walk(self, params=''):
+        from urllib.parse import quote
+        seen, url = [], reverse('audit_log') + '?' + params
+        while url:
+            response = self.client.get(url)
+            seen.extend(log.id for log in response.context['logs'])
+            cursor = response.context['older_cursor']
+            url = f"{reverse('audit_log')}?{response.context['filter_query']}&before={quote(cursor)}" if cursor else None
+        return seen
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen = self.walk()
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+        self.assertEqual(len(self.walk('user=analyst2&ip=10.0.0.1')), 125)
+
+    def test_invalid_ip_filter_is_ignored(self):
+        self.assertEqual(len(self.walk('ip=10.0.0.999')), 250)
+        for url in (reverse('audit_log'), reverse('audit_log_export')):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url + '?ip=not-an-ip&action=SEARCH').status_code, 200)
+
+    def test_page_queries_do_not_depend_on_rows(self):
+        self.client.get(reverse('audit_log'))
+        # session, user, page (with users joined); no per-row user lookups
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('audit_log') + '?action=VIEW')
+        self.assertEqual(len(response.context['logs']), 100)
+
+    def test_streaming_export(self):
+        import json
+        response = self.client.get(reverse('audit_log_export') + '?action=SEARCH&format=jsonl')
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 50)
+        self.assertEqual({row['action'] for row in rows}, {'SEARCH'})
+
+        response = self.client.get(reverse('audit_log_export') + '?ip=10.0.0.5')
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0], 'timestamp,user,action,target_object,ip_address,details')
+        self.assertEqual(len(lines), 26)
+
+    def test_csv_export_escapes_formulas(self):
+        import csv
+        import io
+        UserActionLog.objects.create(
+            user=self.other, action=UserActionLog.ActionType.SEARCH,
+            target_object='=HYPERLINK("http://evil.test")', details='@SUM(A1)', ip_address='10.9.9.9',
+        )
+        response = self.client.get(reverse('audit_log_export') + '?ip=10.9.9.9')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[1][3:], ["'=HYPERLINK(\"http://evil.test\")", '10.9.9.9', "'@SUM(A1)"])
@@ -1,4 +1,6 @@
-from django.test import TestCase, Client
+import shutil
+import tempfile
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.files.base import ContentFile
@@ -6,6 +8,15 @@ import json
 
 User = get_user_model()
 
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class QRLoginTests(TestCase):
     def setUp(self):
         self.client = Client()
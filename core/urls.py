@@ -14,6 +14,7 @@ urlpatterns = [
     # User management
     path('card/<str:username>/', views.user_card_view, name='user_card'),
     path('audit/', views.audit_log_view, name='audit_log'),
+    path('audit/export/', views.audit_log_export_view, name='audit_log_export'),
     path('users/', views.user_list_view, name='user_list'),
     path('users/add/', views.user_create_view, name='user_create'),
     path('users/<int:user_id>/edit/', views.user_edit_view, name='user_edit'),
@@ -24,4 +25,6 @@ urlpatterns = [
     path('health/live/', health_views.liveness_check, name='liveness_check'),
     path('health/app', health_views.app_health, name='app_health'),
     path('health/db', health_views.db_health, name='db_health'),
+    path('health/metrics/', health_views.metrics, name='metrics'),
+    path('health/profile/', health_views.request_profile, name='request_profile'),
 ]
@@ -1,13 +1,22 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth import get_user_model, login
 from django.contrib.auth.views import LoginView
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Q
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
 from .models import UserActionLog
+from .audit import record_action
+from .csv_export import StreamingCSVWriter
 from .forms import UserForm
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from urllib.parse import urlencode
+import itertools
 import json
 
 
@@ -34,7 +43,7 @@ class SecurityLoginView(LoginView):
         user = self.request.user
         ip = self.get_client_ip()
         
-        UserActionLog.objects.create(
+        record_action(
             user=user,
             action=UserActionLog.ActionType.LOGIN,
             target_object="System Login",
@@ -52,7 +61,7 @@ class SecurityLoginView(LoginView):
         try:
             if username:
                 user = User.objects.get(username=username)
-                UserActionLog.objects.create(
+                record_action(
                     user=user,
                     action=UserActionLog.ActionType.ACCESS_DENIED,
                     target_object="Login Failed",
@@ -73,10 +82,149 @@ def user_card_view(request, username):
     }
     return render(request, 'core/card.html', context)
 
+AUDIT_PAGE_SIZE = 100
+AUDIT_EXPORT_FIELDS = ['timestamp', 'user__username', 'action', 'target_object', 'ip_address', 'details']
+
+
+def _audit_filters(request):
+    """
+    Applies the explorer filters (user, action, date range, IP). Each one maps to an
+    indexed column, so every combination is served by an index range on timestamp.
+    """
+    filters = {
+        'user': request.GET.get('user', '').strip(),
+        'action': request.GET.get('action', ''),
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+        'ip': request.GET.get('ip', '').strip(),
+    }
+    logs = UserActionLog.objects.all()
+
+    if filters['user']:
+        user_ids = get_user_model().objects.filter(username=filters['user']).values_list('id', flat=True)
+        logs = logs.filter(user_id__in=list(user_ids))
+    if filters['action'] in UserActionLog.ActionType.values:
+        logs = logs.filter(action=filters['action'])
+    ip_address = _parse_ip(filters['ip'])
+    if ip_address:
+        logs = logs.filter(ip_address=ip_address)
+
+    date_from = _parse_day(filters['date_from'])
+    date_to = _parse_day(filters['date_to'])
+    if date_from:
+        logs = logs.filter(timestamp__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+    if date_to:
+        logs = logs.filter(timestamp__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)))
+    return logs, filters
+
+
+def _parse_day(value):
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_ip(value):
+    try:
+        validate_ipv46_address(value)
+    except ValidationError:
+        return None
+    return value
+
+
+def _encode_cursor(log):
+    return f"{log.timestamp.isoformat()}_{log.id}"
+
+
+def _decode_cursor(value):
+    try:
+        stamp, log_id = value.rsplit('_', 1)
+        timestamp = parse_datetime(stamp)
+        return (timestamp, int(log_id)) if timestamp else None
+    except ValueError:
+        return None
+
+
 @user_passes_test(lambda u: u.is_staff)
 def audit_log_view(request):
-    logs = UserActionLog.objects.all()[:100]
-    return render(request, 'core/audit_log.html', {'logs': logs})
+    """
+    Audit log explorer with keyset pagination on (timestamp, id): `before` pages
+    towards older entries, `after` towards newer ones, at constant cost for any depth.
+    """
+    logs, filters = _audit_filters(request)
+    logs = logs.select_related('user')
+
+    before = _decode_cursor(request.GET.get('before', ''))
+    after = _decode_cursor(request.GET.get('after', ''))
+    if after:
+        timestamp, log_id = after
+        page = list(logs.filter(
+            Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=log_id)
+        ).order_by('timestamp', 'id')[:AUDIT_PAGE_SIZE + 1])
+        has_newer = len(page) > AUDIT_PAGE_SIZE
+        page = page[:AUDIT_PAGE_SIZE][::-1]
+        has_older = True
+    else:
+        if before:
+            timestamp, log_id = before
+            logs = logs.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=log_id))
+        page = list(logs.order_by('-timestamp', '-id')[:AUDIT_PAGE_SIZE + 1])
+        has_older = len(page) > AUDIT_PAGE_SIZE
+        page = page[:AUDIT_PAGE_SIZE]
+        has_newer = before is not None
+
+    query = {key: value for key, value in filters.items() if value}
+    context = {
+        'logs': page,
+        'filters': filters,
+        'action_choices': UserActionLog.ActionType.choices,
+        'filter_query': urlencode(query),
+        'older_cursor': _encode_cursor(page[-1]) if page and has_older else '',
+        'newer_cursor': _encode_cursor(page[0]) if page and has_newer else '',
+    }
+    return render(request, 'core/audit_log.html', context)
+
+
+@user_passes_test(lambda u: u.is_staff)
+def audit_log_export_view(request):
+    """
+    Streams the filtered audit log as CSV or JSONL. Rows are read with a server-side
+    cursor in chunks, so memory use does not grow with the number of rows exported.
+    """
+    export_format = request.GET.get('format', 'csv')
+    logs, filters = _audit_filters(request)
+    rows = logs.order_by('-timestamp', '-id').values_list(*AUDIT_EXPORT_FIELDS).iterator(chunk_size=2000)
+
+    record_action(
+        user=request.user,
+        action=UserActionLog.ActionType.EXPORT,
+        target_object=f"Audit Log Export ({export_format})",
+        details=f"Filters: {json.dumps({k: v for k, v in filters.items() if v}, ensure_ascii=False)}",
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+
+    stamp = timezone.now().strftime('%Y%m%d_%H%M')
+    if export_format == 'jsonl':
+        columns = ['timestamp', 'user', 'action', 'target_object', 'ip_address', 'details']
+        lines = (
+            json.dumps(dict(zip(columns, (row[0].isoformat(),) + row[1:])), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+        response = StreamingHttpResponse(lines, content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="audit_log_{stamp}.jsonl"'
+        return response
+
+    writer = StreamingCSVWriter()
+    header = ['timestamp', 'user', 'action', 'target_object', 'ip_address', 'details']
+    lines = itertools.chain(
+        # BOM so spreadsheet tools open the Arabic text as UTF-8
+        ['\ufeff' + writer.writerow(header)],
+        (writer.writerow((row[0].isoformat(),) + row[1:]) for row in rows),
+    )
+    response = StreamingHttpResponse(lines, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="audit_log_{stamp}.csv"'
+    return response
 
 @user_passes_test(lambda u: u.is_staff)
 def user_list_view(request):
@@ -106,7 +254,7 @@ def user_create_view(request):
         if form.is_valid():
             user = form.save()
             # Log action
-            UserActionLog.objects.create(
+            record_action(
                 user=request.user,
                 action=UserActionLog.ActionType.EXPORT, # Using EXPORT as generic admin action for now or define new type
                 target_object=f"Created User: {user.username}",
@@ -128,6 +276,13 @@ def user_edit_view(request, user_id):
         form = UserForm(request.POST, request.FILES, instance=user)
         if form.is_valid():
             form.save()
+            record_action(
+                user=request.user,
+                action=UserActionLog.ActionType.OTHER,
+                target_object=f"Edited User: {user.username}",
+                details=f"Updated fields: {', '.join(form.changed_data) or '-'}",
+                ip_address=request.META.get('REMOTE_ADDR')
+            )
             return redirect('user_list')
     else:
         form = UserForm(instance=user)
@@ -161,7 +316,7 @@ def qr_login_view(request):
                 login(request, user, backend='django.contrib.auth.backends.ModelBackend')
                 
                 # Log the action
-                UserActionLog.objects.create(
+                record_action(
                     user=user,
                     action=UserActionLog.ActionType.LOGIN,
                     target_object="QR Login",
@@ -194,7 +349,7 @@ def password_reset_request_view(request):
                 user.save()
                 
                 # Log action
-                UserActionLog.objects.create(
+                record_action(
                     user=user,
                     action=UserActionLog.ActionType.OTHER,
                     target_object="Password Reset",
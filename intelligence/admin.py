@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     Source, IntelligenceReport, Entity, CriticalAlertRule, 
     IntelligenceNotification, SovereignTerm, IgnoredSource,
-    ClassificationRule, EntityExtractionPattern, SearchConstraint
+    ClassificationRule, EntityExtractionPattern, SearchConstraint,
+    EntityCooccurrence, BackgroundJob
 )
 
 @admin.register(Source)
@@ -19,6 +20,14 @@ class IntelligenceReportAdmin(admin.ModelAdmin):
     date_hierarchy = 'published_at'
 
 
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_type', 'status', 'attempts', 'unique_key', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('job_type', 'status')
+    search_fields = ('unique_key', 'error')
+    readonly_fields = ('attempts', 'locked_by', 'heartbeat_at', 'started_at', 'finished_at', 'result')
+
+
 @admin.register(SearchConstraint)
 class SearchConstraintAdmin(admin.ModelAdmin):
     list_display = ('term', 'constraint_type', 'is_active', 'created_at')
@@ -31,6 +40,13 @@ class EntityAdmin(admin.ModelAdmin):
     list_filter = ('entity_type',)
     search_fields = ('name',)
 
+@admin.register(EntityCooccurrence)
+class EntityCooccurrenceAdmin(admin.ModelAdmin):
+    list_display = ('entity_a', 'entity_b', 'count', 'last_seen')
+    list_select_related = ('entity_a', 'entity_b')
+    raw_id_fields = ('entity_a', 'entity_b')
+    ordering = ('-count',)
+
 @admin.register(CriticalAlertRule)
 class CriticalAlertRuleAdmin(admin.ModelAdmin):
     list_display = ('name', 'severity_level', 'user', 'is_active')
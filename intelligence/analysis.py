@@ -1,5 +1,7 @@
 import re
 from .models import IntelligenceReport, Entity, ClassificationRule, EntityExtractionPattern
+from .cooccurrence import record_cooccurrences
+from core.cache import rules_cache
 
 class ContentAnalyzer:
     def analyze_report(self, report: IntelligenceReport):
@@ -9,10 +11,10 @@ class ContentAnalyzer:
         text = f"{report.title} {report.content}"
         
         # 1. Entity Extraction
-        self._extract_entities(report, text)
+        entity_ids = self._extract_entities(report, text)
         
         # 2. Cross-Referencing & Linking
-        self._find_related_reports(report)
+        self._find_related_reports(report, entity_ids)
 
         # 3. Dynamic Credibility Scoring
         self._update_credibility(report)
@@ -20,16 +22,25 @@ class ContentAnalyzer:
         # 4. Classification
         self._classify_content(report, text)
 
-    def _find_related_reports(self, report):
+    def _find_related_reports(self, report, entity_ids=None):
         """
         Finds related reports based on title similarity and shared entities.
         """
         # Get recent reports (e.g., last 48 hours) excluding self
         # For simplicity, we'll check last 50 reports
-        candidates = IntelligenceReport.objects.exclude(id=report.id).order_by('-published_at')[:50]
+        candidates = list(IntelligenceReport.objects.exclude(id=report.id).order_by('-published_at').only('id', 'title')[:50])
         
         report_tokens = set(report.title.split())
-        
+
+        # Candidates sharing at least one entity, in one query instead of one per candidate
+        if entity_ids is None:
+            entity_ids = set(report.entities.values_list('id', flat=True))
+        sharing = set(Entity.reports.through.objects.filter(
+            entity_id__in=entity_ids,
+            intelligencereport_id__in=[candidate.id for candidate in candidates],
+        ).values_list('intelligencereport_id', flat=True)) if entity_ids else set()
+
+        related = []
         for candidate in candidates:
             # Check Title Similarity (Jaccard Index)
             candidate_tokens = set(candidate.title.split())
@@ -41,12 +52,12 @@ class ContentAnalyzer:
                 
             similarity = len(intersection) / len(union)
             
-            # Check Shared Entities
-            shared_entities = report.entities.all() & candidate.entities.all()
-            
             # If significant similarity or shared entities found
-            if similarity > 0.1 or shared_entities.exists(): # Low threshold for demo
-                report.related_reports.add(candidate)
+            if similarity > 0.1 or candidate.id in sharing: # Low threshold for demo
+                related.append(candidate)
+
+        if related:
+            report.related_reports.add(*related)
 
     def _update_credibility(self, report):
         """
@@ -56,26 +67,26 @@ class ContentAnalyzer:
         
         # Corroboration Bonus
         # Check how many distinct sources have reported similar stories
-        related_sources = set()
-        for related in report.related_reports.all():
-            related_sources.add(related.source.id)
+        related_sources = set(report.related_reports.values_list('source_id', flat=True))
             
         # Add 5 points for each corroborating source (excluding own source)
-        if report.source.id in related_sources:
-            related_sources.remove(report.source.id)
+        related_sources.discard(report.source_id)
             
         bonus = len(related_sources) * 5
         
         final_score = min(100, base_score + bonus)
         report.credibility_score = final_score
-        report.save()
+        # Saved together with the classification in _classify_content
 
     def _extract_entities(self, report, text):
         """
         Dynamic Entity Extraction based on Sovereign Patterns.
+        Returns the ids of all entities linked to the report.
         """
-        # Load all patterns (cached in practice, here direct DB for simplicity)
-        patterns = EntityExtractionPattern.objects.all()
+        # Patterns are shared through the rules cache and invalidated when edited
+        patterns = rules_cache.get_or_set('entity_patterns', lambda: list(EntityExtractionPattern.objects.all()))
+        linked_ids = set(report.entities.values_list('id', flat=True))
+        new_ids = set()
         
         for pattern in patterns:
             if pattern.pattern in text:
@@ -83,7 +94,14 @@ class ContentAnalyzer:
                     name=pattern.pattern,
                     defaults={'entity_type': pattern.entity_type}
                 )
-                 report.entities.add(entity)
+                 if entity.id not in linked_ids:
+                     report.entities.add(entity)
+                     new_ids.add(entity.id)
+
+        # Keep the entity co-occurrence table in step with the new links
+        if new_ids:
+            record_cooccurrences(report, new_ids, linked_ids)
+        return linked_ids | new_ids
 
     def _classify_content(self, report, text):
         """
@@ -93,7 +111,10 @@ class ContentAnalyzer:
         text_lower = text.lower()
         
         # Load rules ordered by weight (Highest priority first)
-        rules = ClassificationRule.objects.filter(is_active=True).order_by('-weight')
+        rules = rules_cache.get_or_set(
+            'classification_rules',
+            lambda: list(ClassificationRule.objects.filter(is_active=True).order_by('-weight')),
+        )
         
         matched_rule = None
         
@@ -1,35 +1,101 @@
+import logging
+import time
+from django.conf import settings
+from core.cache import dashboard_cache
 from django.utils import timezone
 from datetime import timedelta
 from django.db import connection
-from .models import IntelligenceReport, Source, Entity
+from .models import IntelligenceReport, Source
 
-def global_status_context(request):
-    """
-    Provides global status indicators for the sidebar and other views.
-    Ensures consistency across the application.
-    """
+logger = logging.getLogger(__name__)
+
+STATUS_CACHE_KEY = 'global_status'
+STATUS_LOCK_KEY = 'global_status:refreshing'
+
+# Served as-is while the cache is cold and a refresh is already running elsewhere
+COLD_STATUS = {
+    'recent_reports_count': 0,
+    'ingestion_online': False,
+    'analysis_online': False,
+}
+
+
+def _ttl():
+    return int(getattr(settings, 'GLOBAL_STATUS_TTL', 60))
+
+
+def compute_global_status():
+    """Runs the status queries. Returns the offline defaults if the database is unreachable."""
     try:
         # Quick DB availability check (no retries here; middleware handles retries)
         connection.ensure_connection()
-        db_available = True
     except Exception:
-        db_available = False
-
-    if not db_available:
-        return {
-            'recent_reports_count': 0,
-            'ingestion_online': False,
-            'analysis_online': False,
-        }
-
-    recent_reports_count = IntelligenceReport.objects.filter(
-        published_at__gte=timezone.now() - timedelta(hours=24)
-    ).count()
-    ingestion_online = Source.objects.filter(is_active=True).exists()
-    analysis_online = IntelligenceReport.objects.exists() 
-    
+        return dict(COLD_STATUS)
+
     return {
-        'recent_reports_count': recent_reports_count,
-        'ingestion_online': ingestion_online,
-        'analysis_online': analysis_online,
+        'recent_reports_count': IntelligenceReport.objects.filter(
+            published_at__gte=timezone.now() - timedelta(hours=24)
+        ).count(),
+        'ingestion_online': Source.objects.filter(is_active=True).exists(),
+        'analysis_online': IntelligenceReport.objects.exists(),
     }
+
+
+# Last status this process saw; served when the shared cache cannot be reached
+_last_status = None
+
+
+def refresh_global_status():
+    """
+    Recomputes the indicators and stores them in the shared cache.
+    Called after ingestion and source changes, and by the refresh_status job when a
+    cached entry goes stale.
+    """
+    global _last_status
+    try:
+        status = compute_global_status()
+        # Kept well past the refresh interval so readers can serve it while it is being refreshed
+        dashboard_cache.set(STATUS_CACHE_KEY, {'status': status, 'refresh_after': time.time() + _ttl()}, _ttl() * 10)
+    except Exception as e:
+        logger.warning(f"Global status refresh failed: {e}")
+        return None
+    _last_status = status
+    return status
+
+
+def _schedule_refresh():
+    """Queues one refresh_status job across all workers; the cache lock stops duplicates."""
+    from . import jobs
+    if not dashboard_cache.add(STATUS_LOCK_KEY, True, 30):
+        return
+    try:
+        jobs.enqueue(jobs.JobType.REFRESH_STATUS, unique_key='refresh_status')
+    except Exception as e:
+        dashboard_cache.delete(STATUS_LOCK_KEY)
+        logger.warning(f"Could not queue the global status refresh: {e}")
+
+
+def global_status_context(request):
+    """
+    Provides global status indicators for the sidebar and other views.
+    Served from the shared cache, so the common path issues no DB queries; if the cache
+    is unreachable, the last status this process saw is served instead.
+    """
+    global _last_status
+    try:
+        cached = dashboard_cache.get(STATUS_CACHE_KEY)
+        if cached is not None:
+            _last_status = cached['status']
+            if time.time() >= cached['refresh_after']:
+                _schedule_refresh()
+            return cached['status']
+
+        # Cold cache: one request computes inline, concurrent ones get the offline defaults
+        if dashboard_cache.add(STATUS_LOCK_KEY, True, 30):
+            try:
+                return refresh_global_status() or dict(COLD_STATUS)
+            finally:
+                dashboard_cache.delete(STATUS_LOCK_KEY)
+    except Exception as e:
+        logger.warning(f"Global status cache unavailable: {e}")
+    return dict(_last_status or COLD_STATUS)
@@ -0,0 +1,136 @@
+from datetime import timedelta
+from itertools import combinations
+from django.db import transaction
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Entity, EntityCooccurrence, EntityCooccurrenceBucket
+
+ENTITY_FIELDS = ('id', 'name', 'entity_type')
+
+
+def _pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def record_cooccurrences(report, new_entity_ids, all_entity_ids=None):
+    """
+    Counts the report once for every entity pair that involves a newly linked entity.
+    Pairs among entities that were already linked were counted on an earlier pass,
+    so re-analysing a report does not inflate the counts.
+    """
+    new_entity_ids = set(new_entity_ids)
+    if all_entity_ids is None:
+        all_entity_ids = set(report.entities.values_list('id', flat=True))
+    all_entity_ids = set(all_entity_ids) | new_entity_ids
+
+    pairs = {
+        _pair(a, b) for a, b in combinations(sorted(all_entity_ids), 2)
+        if a in new_entity_ids or b in new_entity_ids
+    }
+    if not pairs:
+        return 0
+
+    seen = report.published_at or report.created_at or timezone.now()
+    day = timezone.localtime(seen).date() if timezone.is_aware(seen) else seen.date()
+
+    with transaction.atomic():
+        EntityCooccurrence.objects.bulk_create(
+            [EntityCooccurrence(entity_a_id=a, entity_b_id=b, first_seen=seen, last_seen=seen) for a, b in pairs],
+            ignore_conflicts=True,
+        )
+        pair_ids = [
+            pair_id for pair_id, a, b in EntityCooccurrence.objects.filter(
+                entity_a_id__in=all_entity_ids, entity_b_id__in=all_entity_ids
+            ).values_list('id', 'entity_a_id', 'entity_b_id')
+            if (a, b) in pairs
+        ]
+        EntityCooccurrence.objects.filter(id__in=pair_ids).update(
+            count=F('count') + 1,
+            last_seen=Greatest('last_seen', Value(seen)),
+        )
+        EntityCooccurrenceBucket.objects.bulk_create(
+            [EntityCooccurrenceBucket(pair_id=pair_id, day=day) for pair_id in pair_ids],
+            ignore_conflicts=True,
+        )
+        EntityCooccurrenceBucket.objects.filter(pair_id__in=pair_ids, day=day).update(count=F('count') + 1)
+    return len(pair_ids)
+
+
+def _window_start(days):
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def top_cooccurring(entity_id, k=10, days=None):
+    """
+    Entities most often seen with `entity_id`, overall or within the last `days` days.
+    Returns dicts with the partner entity, count and last_seen.
+    """
+    pairs = EntityCooccurrence.objects.filter(Q(entity_a_id=entity_id) | Q(entity_b_id=entity_id))
+    if days:
+        rows = list(
+            EntityCooccurrenceBucket.objects.filter(
+                pair__in=pairs, day__gte=_window_start(days)
+            ).values('pair__entity_a_id', 'pair__entity_b_id', 'pair__last_seen')
+            .annotate(total=Sum('count')).order_by('-total')[:k]
+        )
+        results = [
+            (row['pair__entity_b_id'] if row['pair__entity_a_id'] == entity_id else row['pair__entity_a_id'],
+             row['total'], row['pair__last_seen'])
+            for row in rows
+        ]
+    else:
+        results = [
+            (b if a == entity_id else a, count, last_seen)
+            for a, b, count, last_seen in pairs.order_by('-count').values_list(
+                'entity_a_id', 'entity_b_id', 'count', 'last_seen'
+            )[:k]
+        ]
+
+    entities = {row['id']: row for row in Entity.objects.filter(id__in=[r[0] for r in results]).values(*ENTITY_FIELDS)}
+    return [
+        {'entity': entities[partner_id], 'count': count, 'last_seen': last_seen}
+        for partner_id, count, last_seen in results if partner_id in entities
+    ]
+
+
+def rising_pairs(k=20, days=7, min_count=2):
+    """
+    Pairs whose co-occurrence in the last `days` days grew most against the
+    preceding window of the same length. Score is (recent + 1) / (previous + 1).
+    """
+    recent_start = _window_start(days)
+    previous_start = recent_start - timedelta(days=days)
+
+    recent = dict(
+        EntityCooccurrenceBucket.objects.filter(day__gte=recent_start)
+        .values_list('pair_id').annotate(total=Sum('count')).filter(total__gte=min_count)
+    )
+    if not recent:
+        return []
+    previous = dict(
+        EntityCooccurrenceBucket.objects.filter(
+            pair_id__in=list(recent), day__gte=previous_start, day__lt=recent_start
+        ).values_list('pair_id').annotate(total=Sum('count'))
+    )
+
+    scored = sorted(
+        ((pair_id, count, previous.get(pair_id, 0)) for pair_id, count in recent.items()),
+        key=lambda item: ((item[1] + 1) / (item[2] + 1), item[1]),
+        reverse=True,
+    )[:k]
+
+    pairs = EntityCooccurrence.objects.in_bulk([pair_id for pair_id, _, _ in scored])
+    entity_ids = {p.entity_a_id for p in pairs.values()} | {p.entity_b_id for p in pairs.values()}
+    entities = {row['id']: row for row in Entity.objects.filter(id__in=entity_ids).values(*ENTITY_FIELDS)}
+    return [
+        {
+            'entity_a': entities[pairs[pair_id].entity_a_id],
+            'entity_b': entities[pairs[pair_id].entity_b_id],
+            'recent': count,
+            'previous': prev,
+            'score': round((count + 1) / (prev + 1), 2),
+            'total': pairs[pair_id].count,
+        }
+        for pair_id, count, prev in scored
+    ]
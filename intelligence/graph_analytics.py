@@ -0,0 +1,102 @@
+import logging
+from core.cache import graph_cache
+from .models import Entity
+from . import graph_snapshot
+from .graph_snapshot import np
+
+logger = logging.getLogger(__name__)
+
+CENTRAL_CACHE_KEY = 'central_entities:{generation}:{k}'
+CENTRAL_CACHE_TTL = 3600
+
+
+def degree(snapshot):
+    """Number of neighbours of every node."""
+    return np.diff(np.asarray(snapshot.indptr))
+
+
+def pagerank(snapshot, damping=0.85, max_iter=100, tol=1e-6):
+    """
+    Power-iteration PageRank over the undirected snapshot. Rank of isolated
+    nodes is spread uniformly so the vector keeps summing to one.
+    """
+    n = snapshot.num_nodes
+    if n == 0:
+        return np.zeros(0)
+    deg = degree(snapshot).astype(np.float64)
+    indices = np.asarray(snapshot.indices)
+    dangling = deg == 0
+    safe_deg = np.where(dangling, 1.0, deg)
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        share = np.repeat(rank / safe_deg, deg.astype(np.int64))
+        incoming = np.bincount(indices, weights=share, minlength=n)
+        new_rank = (1 - damping) / n + damping * (incoming + rank[dangling].sum() / n)
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            break
+    return rank
+
+
+def connected_components(snapshot):
+    """
+    Labels every node with the smallest node index of its component
+    (min-label propagation with pointer jumping). Returns the label array.
+    """
+    n = snapshot.num_nodes
+    labels = np.arange(n, dtype=np.int64)
+    if n == 0:
+        return labels
+    rows = snapshot.rows()
+    indices = np.asarray(snapshot.indices)
+    while True:
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, rows, labels[indices])
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def component_sizes(labels):
+    """Sizes of the components, largest first."""
+    if len(labels) == 0:
+        return []
+    return sorted(np.bincount(labels)[np.unique(labels)].tolist(), reverse=True)
+
+
+def central_entities(k=10):
+    """
+    Top-k entities by PageRank from the current snapshot, as dicts
+    (id, name, entity_type, degree, score). Empty when no snapshot is available.
+    Cached per snapshot generation.
+    """
+    snapshot = graph_snapshot.load_snapshot()
+    if snapshot is None or len(snapshot.entity_ids) == 0:
+        return []
+
+    cache_key = CENTRAL_CACHE_KEY.format(generation=snapshot.generation, k=k)
+    return graph_cache.get_or_set(cache_key, lambda: _central_entities(snapshot, k), CENTRAL_CACHE_TTL)
+
+
+def _central_entities(snapshot, k):
+    ranks = pagerank(snapshot)[snapshot.num_reports:]
+    degrees = degree(snapshot)[snapshot.num_reports:]
+    top = np.argsort(-ranks, kind='stable')[:k]
+    top = top[degrees[top] > 0]
+    entity_ids = [int(snapshot.entity_ids[i]) for i in top]
+    entities = Entity.objects.in_bulk(entity_ids)
+
+    return [
+        {
+            'id': entity_id,
+            'node': f"ent_{entity_id}",
+            'name': entities[entity_id].name,
+            'entity_type': entities[entity_id].entity_type,
+            'degree': int(degrees[i]),
+            'score': round(float(ranks[i]), 6),
+        }
+        for i, entity_id in zip(top, entity_ids) if entity_id in entities
+    ]
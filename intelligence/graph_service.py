@@ -0,0 +1,304 @@
+from django.conf import settings
+from django.db.models import Subquery
+from core.cache import graph_cache
+from .models import IntelligenceReport, Entity
+
+EntityReport = Entity.reports.through
+RelatedReport = IntelligenceReport.related_reports.through
+
+ADJACENCY_TTL = int(getattr(settings, 'GRAPH_ADJACENCY_TTL', 600))
+# Hub entities can touch thousands of reports; keep only the most recent neighbours
+MAX_FANOUT = int(getattr(settings, 'GRAPH_MAX_FANOUT', 200))
+CACHE_PREFIX = 'adj:'
+
+REPORT_FIELDS = ('id', 'title', 'translated_title', 'classification', 'published_at')
+ENTITY_FIELDS = ('id', 'name', 'entity_type')
+
+
+def report_key(report_id):
+    return f"rep_{report_id}"
+
+
+def entity_key(entity_id):
+    return f"ent_{entity_id}"
+
+
+def parse_key(node_key):
+    """Splits 'rep_12' / 'ent_7' into (kind, id); raises ValueError for anything else."""
+    kind, _, raw_id = node_key.partition('_')
+    if kind not in ('rep', 'ent') or not raw_id.isdigit():
+        raise ValueError(f"Invalid node id: {node_key}")
+    return kind, int(raw_id)
+
+
+def report_node(row):
+    display_title = row['translated_title'] or row['title']
+    return {
+        'id': report_key(row['id']),
+        'label': display_title[:20] + "...",
+        'fullLabel': display_title,
+        'group': 'report',
+        'classification': row['classification'],
+        'published_at': row['published_at'].isoformat() if row['published_at'] else None,
+        'value': 20,
+    }
+
+
+def entity_node(row):
+    return {
+        'id': entity_key(row['id']),
+        'label': row['name'],
+        'group': 'entity',
+        'type': row['entity_type'],
+        'value': 10,
+    }
+
+
+def entity_edge(report_id, entity_id):
+    return {
+        'from': report_key(report_id),
+        'to': entity_key(entity_id),
+        'arrows': 'to',
+        'color': {'color': '#64748b'},  # Slate 500
+    }
+
+
+def related_edge(report_id, related_id):
+    low, high = sorted((report_id, related_id))
+    return {
+        'from': report_key(low),
+        'to': report_key(high),
+        'arrows': {'to': {'enabled': False}},  # Undirected for similarity
+        'color': {'color': '#ef4444', 'opacity': 0.6},  # Red for relation
+        'dashes': True,
+    }
+
+
+def invalidate_nodes(node_keys):
+    """Drops cached adjacency lists; called when report/entity links change."""
+    graph_cache.delete_many([CACHE_PREFIX + key for key in node_keys])
+
+
+def _load_adjacency(node_keys):
+    """Reads adjacency lists for the given nodes from the link tables (one query per link type)."""
+    report_ids = []
+    entity_ids = []
+    for key in node_keys:
+        kind, node_id = parse_key(key)
+        (report_ids if kind == 'rep' else entity_ids).append(node_id)
+
+    adjacency = {key: [] for key in node_keys}
+    if report_ids:
+        for report_id, entity_id in EntityReport.objects.filter(
+            intelligencereport_id__in=report_ids
+        ).values_list('intelligencereport_id', 'entity_id'):
+            adjacency[report_key(report_id)].append(entity_key(entity_id))
+        # Symmetrical M2M: each relation is stored in both directions
+        for report_id, related_id in RelatedReport.objects.filter(
+            from_intelligencereport_id__in=report_ids
+        ).values_list('from_intelligencereport_id', 'to_intelligencereport_id'):
+            adjacency[report_key(report_id)].append(report_key(related_id))
+    if entity_ids:
+        for entity_id, report_id in EntityReport.objects.filter(
+            entity_id__in=entity_ids
+        ).order_by('-intelligencereport_id').values_list('entity_id', 'intelligencereport_id'):
+            neighbours = adjacency[entity_key(entity_id)]
+            if len(neighbours) < MAX_FANOUT:
+                neighbours.append(report_key(report_id))
+    return adjacency
+
+
+def get_adjacency(node_keys):
+    """Adjacency lists for many nodes, served from the cache and filled in bulk on misses."""
+    node_keys = list(node_keys)
+    cached = graph_cache.get_many([CACHE_PREFIX + key for key in node_keys])
+    adjacency = {key[len(CACHE_PREFIX):]: value for key, value in cached.items()}
+    missing = [key for key in node_keys if key not in adjacency]
+    if missing:
+        loaded = _load_adjacency(missing)
+        graph_cache.set_many({CACHE_PREFIX + key: value for key, value in loaded.items()}, ADJACENCY_TTL)
+        adjacency.update(loaded)
+    return adjacency
+
+
+def _report_rows(report_ids, since=None, until=None):
+    reports = IntelligenceReport.objects.filter(id__in=report_ids)
+    if since:
+        reports = reports.filter(published_at__gte=since)
+    if until:
+        reports = reports.filter(published_at__lte=until)
+    return {row['id']: row for row in reports.order_by().values(*REPORT_FIELDS)}
+
+
+def neighbourhood(center, depth=1, since=None, until=None, types=None, max_nodes=300):
+    """
+    Breadth-first expansion around a node up to `depth` hops.
+    Reports outside the [since, until] window and entities whose type is not in `types`
+    are neither returned nor expanded. Stops once `max_nodes` nodes were collected.
+    """
+    types = set(types) if types else None
+    kind, center_id = parse_key(center)
+
+    report_rows = {}
+    entity_rows = {}
+    if kind == 'rep':
+        report_rows.update(_report_rows([center_id]))
+        if center_id not in report_rows:
+            return None
+    else:
+        entity_rows.update({row['id']: row for row in Entity.objects.filter(id=center_id).values(*ENTITY_FIELDS)})
+        if center_id not in entity_rows:
+            return None
+
+    visited = {center}
+    frontier = [center]
+    edges = {}
+    truncated = False
+
+    for _ in range(depth):
+        if not frontier or truncated:
+            break
+        adjacency = get_adjacency(frontier)
+        candidates = {n for neighbours in adjacency.values() for n in neighbours} - visited
+
+        # Resolve and filter the next level in bulk
+        new_reports = _report_rows(
+            [parse_key(n)[1] for n in candidates if n.startswith('rep_')], since, until
+        ) if (types is None or 'report' in types) else {}
+        entity_ids = [parse_key(n)[1] for n in candidates if n.startswith('ent_')]
+        entities = Entity.objects.filter(id__in=entity_ids)
+        if types is not None:
+            entities = entities.filter(entity_type__in=types)
+        new_entities = {row['id']: row for row in entities.values(*ENTITY_FIELDS)}
+
+        accepted = {report_key(i) for i in new_reports} | {entity_key(i) for i in new_entities}
+        next_frontier = []
+        for node in frontier:
+            for neighbour in adjacency.get(node, []):
+                if neighbour not in accepted and neighbour not in visited:
+                    continue
+                if neighbour not in visited:
+                    if len(visited) >= max_nodes:
+                        truncated = True
+                        continue
+                    visited.add(neighbour)
+                    next_frontier.append(neighbour)
+                    neighbour_kind, neighbour_id = parse_key(neighbour)
+                    if neighbour_kind == 'rep':
+                        report_rows[neighbour_id] = new_reports[neighbour_id]
+                    else:
+                        entity_rows[neighbour_id] = new_entities[neighbour_id]
+                edges[tuple(sorted((node, neighbour)))] = (node, neighbour)
+        frontier = next_frontier
+
+    return {
+        'center': center,
+        'depth': depth,
+        'truncated': truncated,
+        'nodes': [report_node(row) for row in report_rows.values()] + [entity_node(row) for row in entity_rows.values()],
+        'edges': [_edge(a, b) for a, b in edges.values()],
+    }
+
+
+def _edge(a, b):
+    kind_a, id_a = parse_key(a)
+    kind_b, id_b = parse_key(b)
+    if kind_a == 'rep' and kind_b == 'rep':
+        return related_edge(id_a, id_b)
+    if kind_a == 'rep':
+        return entity_edge(id_a, id_b)
+    return entity_edge(id_b, id_a)
+
+
+def _watermarks():
+    """Highest report, entity link and related link ids, read in one query."""
+    latest = (
+        IntelligenceReport.objects.order_by('-id')
+        .annotate(
+            link_id=Subquery(EntityReport.objects.order_by('-id').values('id')[:1]),
+            related_id=Subquery(RelatedReport.objects.order_by('-id').values('id')[:1]),
+        )
+        .values_list('id', 'link_id', 'related_id').first()
+    )
+    # Links always point at reports, so no report means no links either
+    return tuple(mark or 0 for mark in latest) if latest else (0, 0, 0)
+
+
+def format_cursor(report_id, link_id, related_id):
+    return f"{report_id}.{link_id}.{related_id}"
+
+
+def parse_cursor(value):
+    """Splits a delta cursor into its (report, entity link, related link) watermarks."""
+    parts = value.split('.')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Invalid cursor: {value}")
+    return tuple(int(part) for part in parts)
+
+
+def _edges(links, related):
+    edges = [entity_edge(report_id, entity_id) for report_id, entity_id in links]
+    seen_pairs = set()
+    for report_id, related_id in related:
+        pair = tuple(sorted((report_id, related_id)))
+        if pair not in seen_pairs:
+            seen_pairs.add(pair)
+            edges.append(related_edge(report_id, related_id))
+    return edges
+
+
+def delta(cursor=None, limit=150):
+    """
+    Changes since `cursor`: reports added after its report watermark, plus entity and
+    related-report links added after its link-table watermarks (also those touching
+    reports that were already sent), each with the nodes they connect.
+    Without a cursor, returns the latest `limit` reports and their links.
+    The returned `cursor` is passed back to fetch the next delta.
+    """
+    if cursor is None:
+        # Watermarks first, so links written while this runs arrive with the next delta
+        next_cursor = _watermarks()
+        rows = list(
+            IntelligenceReport.objects.filter(id__lte=next_cursor[0])
+            .order_by('-published_at').values(*REPORT_FIELDS)[:limit]
+        )
+        report_ids = [row['id'] for row in rows]
+        links = list(EntityReport.objects.filter(intelligencereport_id__in=report_ids, id__lte=next_cursor[1])
+                     .values_list('intelligencereport_id', 'entity_id'))
+        related = list(RelatedReport.objects.filter(
+            from_intelligencereport_id__in=report_ids, id__lte=next_cursor[2],
+        ).values_list('from_intelligencereport_id', 'to_intelligencereport_id'))
+        has_more = False
+    else:
+        report_mark, link_mark, related_mark = cursor
+        rows = list(IntelligenceReport.objects.filter(id__gt=report_mark).order_by('id').values(*REPORT_FIELDS)[:limit])
+        report_ids = [row['id'] for row in rows]
+        link_rows = list(EntityReport.objects.filter(id__gt=link_mark).order_by('id')
+                         .values_list('id', 'intelligencereport_id', 'entity_id')[:limit])
+        related_rows = list(RelatedReport.objects.filter(id__gt=related_mark).order_by('id').values_list(
+            'id', 'from_intelligencereport_id', 'to_intelligencereport_id'
+        )[:limit])
+        links = [(report_id, entity_id) for _, report_id, entity_id in link_rows]
+        related = [(report_id, related_id) for _, report_id, related_id in related_rows]
+        next_cursor = (
+            max(report_ids, default=report_mark),
+            link_rows[-1][0] if link_rows else link_mark,
+            related_rows[-1][0] if related_rows else related_mark,
+        )
+        has_more = limit > 0 and limit in (len(report_ids), len(link_rows), len(related_rows))
+
+    # Nodes at both ends of every link; the client merges nodes it already has
+    linked_ids = set().union(
+        (report_id for report_id, _ in links),
+        (report_id for pair in related for report_id in pair),
+    ) - set(report_ids)
+    if linked_ids:
+        rows += IntelligenceReport.objects.filter(id__in=linked_ids).order_by('id').values(*REPORT_FIELDS)
+    entities = Entity.objects.filter(id__in={entity_id for _, entity_id in links}).values(*ENTITY_FIELDS)
+
+    return {
+        'nodes': [report_node(row) for row in rows] + [entity_node(row) for row in entities],
+        'edges': _edges(links, related),
+        'cursor': format_cursor(*next_cursor),
+        'has_more': has_more,
+    }
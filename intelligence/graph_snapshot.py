@@ -0,0 +1,229 @@
+"""
+Compact on-disk snapshot of the report/entity graph in CSR form.
+
+Nodes are all reports followed by all entities (each block sorted by primary key);
+edges are report<->entity links and report<->report relations, stored undirected.
+Arrays are written as .npy files and memory-mapped on load, so analytics never
+walk the ORM hop by hop. `run_scheduler` queues a build_graph_snapshot job every
+GRAPH_SNAPSHOT_INTERVAL seconds.
+"""
+import json
+import logging
+import os
+import threading
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .models import IntelligenceReport, Entity
+
+logger = logging.getLogger(__name__)
+
+EntityReport = Entity.reports.through
+RelatedReport = IntelligenceReport.related_reports.through
+
+ARRAYS = ('report_ids', 'entity_ids', 'indptr', 'indices')
+META_FILE = 'meta.json'
+
+_lock = threading.Lock()
+_loaded = None
+
+
+def snapshot_dir():
+    return str(getattr(settings, 'GRAPH_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'var', 'graph_snapshot')))
+
+
+class GraphSnapshot:
+    """Read-only view over the snapshot arrays."""
+
+    def __init__(self, report_ids, entity_ids, indptr, indices, meta):
+        self.report_ids = report_ids
+        self.entity_ids = entity_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.meta = meta
+
+    @property
+    def generation(self):
+        return self.meta.get('generation', 0)
+
+    @property
+    def num_reports(self):
+        return len(self.report_ids)
+
+    @property
+    def num_nodes(self):
+        return len(self.report_ids) + len(self.entity_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.indices) // 2
+
+    def rows(self):
+        """Source node of every stored (directed) edge, aligned with `indices`."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+
+    def node_key(self, index):
+        """Maps a node index back to the rep_/ent_ ids used by the graph API."""
+        if index < self.num_reports:
+            return f"rep_{int(self.report_ids[index])}"
+        return f"ent_{int(self.entity_ids[index - self.num_reports])}"
+
+
+def _read_links(marks, link_watermark=0, related_watermark=0):
+    """
+    Loads the link rows between the old watermarks and `marks` as arrays
+    (report_id, entity_id) / (report_id, report_id).
+    """
+    links = np.array(
+        list(EntityReport.objects.filter(id__gt=link_watermark, id__lte=marks['link_watermark'])
+             .order_by().values_list('intelligencereport_id', 'entity_id')),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    related = np.array(
+        list(RelatedReport.objects.filter(id__gt=related_watermark, id__lte=marks['related_watermark'])
+             .order_by().values_list('from_intelligencereport_id', 'to_intelligencereport_id')),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return links, related
+
+
+def _watermarks():
+    """Highest link ids, and how many rows exist up to them."""
+    link_watermark = EntityReport.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    related_watermark = RelatedReport.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    return {
+        'link_watermark': link_watermark,
+        'related_watermark': related_watermark,
+        'link_count': EntityReport.objects.filter(id__lte=link_watermark).count(),
+        'related_count': RelatedReport.objects.filter(id__lte=related_watermark).count(),
+    }
+
+
+def _to_csr(num_nodes, rows, cols):
+    """Builds deduplicated, undirected CSR arrays from an edge list."""
+    rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+    keys = np.unique(rows * num_nodes + cols)
+    rows, cols = keys // num_nodes, keys % num_nodes
+    keep = rows != cols
+    rows, cols = rows[keep], cols[keep]
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+    return indptr, cols.astype(np.int64)
+
+
+def _edge_lists(report_ids, entity_ids, links, related):
+    """Translates id pairs into node-index pairs, dropping links to unknown nodes."""
+    num_reports = len(report_ids)
+
+    def lookup(sorted_ids, values):
+        positions = np.searchsorted(sorted_ids, values)
+        positions = np.minimum(positions, max(len(sorted_ids) - 1, 0))
+        found = (sorted_ids[positions] == values) if len(sorted_ids) else np.zeros(len(values), dtype=bool)
+        return positions, found
+
+    rep_pos, rep_ok = lookup(report_ids, links[:, 0])
+    ent_pos, ent_ok = lookup(entity_ids, links[:, 1])
+    ok = rep_ok & ent_ok
+    rows = [rep_pos[ok]]
+    cols = [ent_pos[ok] + num_reports]
+
+    a_pos, a_ok = lookup(report_ids, related[:, 0])
+    b_pos, b_ok = lookup(report_ids, related[:, 1])
+    ok = a_ok & b_ok
+    rows.append(a_pos[ok])
+    cols.append(b_pos[ok])
+    return np.concatenate(rows).astype(np.int64), np.concatenate(cols).astype(np.int64)
+
+
+def build_snapshot(full=False):
+    """
+    Refreshes the snapshot on disk and returns it. Incremental by default: only link rows
+    added since the last build are read. Falls back to a full rebuild when no snapshot
+    exists yet or links were deleted, i.e. the rows up to the old watermark are no
+    longer all there (ids only grow, so a deletion cannot hide behind new rows).
+    """
+    with _lock:
+        previous = load_snapshot()
+        current = None if full else previous
+        marks = _watermarks()
+        report_ids = np.array(sorted(IntelligenceReport.objects.values_list('id', flat=True)), dtype=np.int64)
+        entity_ids = np.array(sorted(Entity.objects.values_list('id', flat=True)), dtype=np.int64)
+
+        incremental = False
+        if current is not None:
+            links, related = _read_links(marks, current.meta['link_watermark'], current.meta['related_watermark'])
+            incremental = (
+                marks['link_count'] - len(links) == current.meta.get('link_count')
+                and marks['related_count'] - len(related) == current.meta.get('related_count')
+            )
+        if incremental:
+            # Re-express the existing edges by id so node indices can shift when nodes are added
+            old_rows, old_cols = current.rows(), np.asarray(current.indices)
+            new_index = np.empty(current.num_nodes, dtype=np.int64)
+            rep_keep = np.isin(current.report_ids, report_ids)
+            ent_keep = np.isin(current.entity_ids, entity_ids)
+            new_index[:current.num_reports] = np.where(rep_keep, np.searchsorted(report_ids, current.report_ids), -1)
+            new_index[current.num_reports:] = np.where(
+                ent_keep, np.searchsorted(entity_ids, current.entity_ids) + len(report_ids), -1
+            )
+            old_rows, old_cols = new_index[old_rows], new_index[old_cols]
+            keep = (old_rows >= 0) & (old_cols >= 0)
+            rows, cols = _edge_lists(report_ids, entity_ids, links, related)
+            rows = np.concatenate([old_rows[keep], rows])
+            cols = np.concatenate([old_cols[keep], cols])
+        else:
+            links, related = _read_links(marks)
+            rows, cols = _edge_lists(report_ids, entity_ids, links, related)
+
+        indptr, indices = _to_csr(len(report_ids) + len(entity_ids), rows, cols)
+        # Never reuse a generation number: readers may still have its files mapped
+        generation = (previous.generation if previous else 0) + 1
+        meta = dict(marks, generation=generation, built_at=timezone.now().isoformat(), incremental=incremental)
+        _write(generation, {'report_ids': report_ids, 'entity_ids': entity_ids, 'indptr': indptr, 'indices': indices}, meta)
+
+    logger.info(
+        f"Graph snapshot generation {generation} built ({'incremental' if incremental else 'full'}): "
+        f"{len(report_ids) + len(entity_ids)} nodes, {len(indices) // 2} edges"
+    )
+    return load_snapshot()
+
+
+def _write(generation, arrays, meta):
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.{generation}.npy"), array)
+    # Swap the metadata last so readers never see a half-written generation
+    tmp_path = os.path.join(directory, META_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(directory, META_FILE))
+
+    for filename in os.listdir(directory):
+        parts = filename.split('.')
+        if len(parts) == 3 and parts[0] in ARRAYS and parts[1].isdigit() and int(parts[1]) < generation - 1:
+            os.remove(os.path.join(directory, filename))
+
+
+def load_snapshot():
+    """Returns the latest snapshot (memory-mapped), or None if none was built yet."""
+    global _loaded
+    meta_path = os.path.join(snapshot_dir(), META_FILE)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if _loaded is not None and _loaded.meta == meta:
+        return _loaded
+    try:
+        arrays = {
+            name: np.load(os.path.join(snapshot_dir(), f"{name}.{meta['generation']}.npy"), mmap_mode='r')
+            for name in ARRAYS
+        }
+    except (OSError, ValueError) as e:
+        logger.warning(f"Graph snapshot generation {meta.get('generation')} unreadable: {e}")
+        return None
+    _loaded = GraphSnapshot(meta=meta, **arrays)
+    return _loaded
@@ -1,76 +1,117 @@
+from datetime import datetime, time
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
-from .models import IntelligenceReport, Entity
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.shortcuts import get_object_or_404
+from .models import Entity
+from . import graph_service, cooccurrence
+from .graph_analytics import central_entities
+
+MAX_DEPTH = 3
+MAX_NODES = 1000
+
+
+def _int_param(request, name, default, maximum=None):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        value = default
+    value = max(value, 0)
+    return min(value, maximum) if maximum is not None else value
+
+
+def _datetime_param(request, name, end_of_day=False):
+    """Accepts an ISO datetime or a plain date (start/end of day)."""
+    raw = request.GET.get(name)
+    if not raw:
+        return None
+    value = parse_datetime(raw)
+    if value is None:
+        day = parse_date(raw)
+        if day is None:
+            raise ValueError(f"Invalid {name}: {raw}")
+        value = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
 
 @login_required
 def graph_data_api(request):
     """
-    Returns nodes and edges for the intelligence graph.
+    Returns nodes and edges for the latest reports, a cursor for graph_delta_api
+    and the most central entities from the graph snapshot (empty if none was built).
+    """
+    limit = _int_param(request, 'limit', 150, maximum=MAX_NODES)
+    data = graph_service.delta(limit=limit)
+    data['central'] = central_entities(k=_int_param(request, 'central', 10, maximum=100))
+    return JsonResponse(data)
+
+
+@login_required
+def graph_delta_api(request):
+    """
+    Incremental load: reports and links added after `cursor` with the nodes they connect.
+    """
+    limit = _int_param(request, 'limit', 100, maximum=MAX_NODES)
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        try:
+            cursor = graph_service.parse_cursor(cursor)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse(graph_service.delta(cursor=cursor, limit=limit))
+
+
+@login_required
+def graph_neighbourhood_api(request):
+    """
+    Neighbourhood of a node (e.g. rep_12 / ent_7) up to `depth` hops,
+    optionally restricted to a time window (since/until) and node types.
     """
-    nodes = []
-    edges = []
-    
-    # Track added nodes to avoid duplicates
-    added_nodes = set()
-    
-    # 1. Add Reports
     try:
-        limit = int(request.GET.get('limit', '150'))
-    except ValueError:
-        limit = 150
-    reports = IntelligenceReport.objects.all().order_by('-published_at')[:limit]
-    reports = reports.prefetch_related('entities', 'related_reports', 'source')
-    
-    for report in reports:
-        # Report Node
-        # Use translated title if available
-        display_title = report.translated_title if report.translated_title else report.title
-        
-        if f"rep_{report.id}" not in added_nodes:
-            nodes.append({
-                'id': f"rep_{report.id}",
-                'label': display_title[:20] + "...",
-                'fullLabel': display_title,
-                'group': 'report',
-                'classification': report.classification,
-                'value': 20 # Size
-            })
-            added_nodes.add(f"rep_{report.id}")
-        
-        # 2. Link Report to Source (Optional: Source Node)
-        # For now, let's stick to Report-Entity and Report-Report
-        
-        # 3. Entities
-        for entity in report.entities.all():
-            if f"ent_{entity.id}" not in added_nodes:
-                nodes.append({
-                    'id': f"ent_{entity.id}",
-                    'label': entity.name,
-                    'group': 'entity',
-                    'type': entity.entity_type,
-                    'value': 10
-                })
-                added_nodes.add(f"ent_{entity.id}")
-            
-            # Edge: Report -> Entity
-            edges.append({
-                'from': f"rep_{report.id}",
-                'to': f"ent_{entity.id}",
-                'arrows': 'to',
-                'color': {'color': '#64748b'} # Slate 500
-            })
-            
-        # 4. Related Reports
-        for related in report.related_reports.all():
-            # Only add if the other node exists (or will exist) - simpler to just add edge
-            # We assume bidirectional, so we might duplicate edges, but vis.js handles this or we can filter
-            if report.id < related.id: # Avoid double edges
-                edges.append({
-                    'from': f"rep_{report.id}",
-                    'to': f"rep_{related.id}",
-                    'arrows': {'to': {'enabled': False}}, # Undirected for similarity
-                    'color': {'color': '#ef4444', 'opacity': 0.6}, # Red for relation
-                    'dashes': True
-                })
-
-    return JsonResponse({'nodes': nodes, 'edges': edges})
+        since = _datetime_param(request, 'since')
+        until = _datetime_param(request, 'until', end_of_day=True)
+        graph_service.parse_key(request.GET.get('node', ''))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    types = [t for t in request.GET.get('types', '').split(',') if t] or None
+    result = graph_service.neighbourhood(
+        request.GET['node'],
+        depth=max(_int_param(request, 'depth', 1, maximum=MAX_DEPTH), 1),
+        since=since,
+        until=until,
+        types=types,
+        max_nodes=max(_int_param(request, 'max_nodes', 300, maximum=MAX_NODES), 1),
+    )
+    if result is None:
+        return JsonResponse({'error': 'Node not found'}, status=404)
+    return JsonResponse(result)
+
+
+@login_required
+def entity_cooccurrence_api(request, entity_id):
+    """
+    Top-k entities co-occurring with an entity, overall or within the last `days` days.
+    """
+    entity = get_object_or_404(Entity, id=entity_id)
+    k = max(_int_param(request, 'k', 10, maximum=100), 1)
+    days = _int_param(request, 'days', 0, maximum=365) or None
+    return JsonResponse({
+        'entity': {'id': entity.id, 'name': entity.name, 'entity_type': entity.entity_type},
+        'days': days,
+        'results': cooccurrence.top_cooccurring(entity.id, k=k, days=days),
+    })
+
+
+@login_required
+def rising_pairs_api(request):
+    """
+    Entity pairs whose co-occurrence grew most in the last `days` days.
+    """
+    k = max(_int_param(request, 'k', 20, maximum=100), 1)
+    days = max(_int_param(request, 'days', 7, maximum=90), 1)
+    min_count = max(_int_param(request, 'min_count', 2), 1)
+    return JsonResponse({'days': days, 'results': cooccurrence.rising_pairs(k=k, days=days, min_count=min_count)})
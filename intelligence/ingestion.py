@@ -1,14 +1,53 @@
-import feedparser
 import sys
+import time
+import logging
+import functools
+import http.client
+import urllib.request
+import feedparser
+from django.conf import settings
 from django.utils import timezone
 from .models import Source, IntelligenceReport
 from .analysis import ContentAnalyzer
+from . import scheduler
+from .trends import record_report
+from .context_processors import refresh_global_status
 from datetime import datetime
 from time import mktime
 
-from bs4 import BeautifulSoup
+from .utils import html_extract
 from .utils.translation_engine import translator
 from intelligence_agent.services import GroqClient
+from core import metrics
+from core.metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# feedparser downloads through urllib, which waits forever on a stalled server by default
+FEED_TIMEOUT = float(getattr(settings, 'FEED_FETCH_TIMEOUT', 20))
+
+
+metrics.describe('iims_ingest_stage_seconds', 'histogram', 'Time per ingestion stage (fetch, parse, dedup, clean, translate, insert, analyze, alert)')
+metrics.describe('iims_ingest_stage_seconds_total', 'counter', 'Seconds spent per ingestion stage and source')
+metrics.describe('iims_ingest_stage_calls_total', 'counter', 'Times an ingestion stage ran, per source')
+metrics.describe('iims_ingest_runs_total', 'counter', 'Feed ingestions per source and outcome')
+metrics.describe('iims_ingest_run_seconds', 'histogram', 'Duration of one feed ingestion')
+metrics.describe('iims_ingest_entries_total', 'counter', 'Feed entries seen per source')
+metrics.describe('iims_ingest_reports_total', 'counter', 'New reports stored per source')
+metrics.describe('iims_ingest_duplicates_total', 'counter', 'Entries skipped as already stored, per source')
+metrics.describe('iims_ingest_ignored_total', 'counter', 'Entries dropped by the ignored-keyword filter, per source')
+metrics.describe('iims_ingest_errors_total', 'counter', 'Non-fatal errors during ingestion, per source')
+
+
+class _TimeoutHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(functools.partial(http.client.HTTPConnection, timeout=FEED_TIMEOUT), req)
+
+
+class _TimeoutHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(functools.partial(http.client.HTTPSConnection, timeout=FEED_TIMEOUT), req, context=self._context)
+
 
 class IngestionEngine:
     def __init__(self):
@@ -22,30 +61,11 @@ class IngestionEngine:
         """
         Removes HTML tags, normalizes whitespace, and fixes encoding issues.
         """
-        if not raw_html:
-            return ""
-        
-        # 1. Parse HTML
-        soup = BeautifulSoup(raw_html, "html.parser")
-        
-        # 2. Extract Text with smart separator
-        text = soup.get_text(separator=" ")
-        
-        # 3. Normalize Whitespace (remove excessive newlines/tabs)
-        import re
-        import unicodedata
-        
-        # Replace multiple whitespace with single space
-        text = re.sub(r'\s+', ' ', text)
-        
-        # 4. Normalize Unicode (NFKC handles compatibility characters)
-        text = unicodedata.normalize('NFKC', text)
-        
-        # 5. Remove common garbage symbols often found in RSS
-        text = text.replace('â€™', "'").replace('â€œ', '"').replace('â€', '"')
-        text = text.replace('&nbsp;', ' ')
-        
-        return text.strip()
+        return html_extract.clean_html(raw_html)
+
+    def fetch_feed(self, source):
+        """Downloads and parses the source's feed; the offline benchmark replays fixtures instead."""
+        return feedparser.parse(source.url, handlers=[_TimeoutHTTPHandler(), _TimeoutHTTPSHandler()])
 
     def _get_ignored_keywords(self):
         """Loads ignored keywords from DB (Sovereign Configuration)"""
@@ -56,30 +76,70 @@ class IngestionEngine:
                 keywords = IgnoredSource.objects.filter(is_active=True).values_list('keyword', flat=True)
                 self._ignored_keywords_cache = [k.lower() for k in keywords]
             except Exception as e:
-                print(f"Error loading ignored sources: {e}")
+                logger.error(f"Error loading ignored sources: {e}")
                 # Fallback to empty if DB fails
                 self._ignored_keywords_cache = []
         return self._ignored_keywords_cache
 
-    def fetch_all(self):
-        sources = Source.objects.filter(is_active=True, source_type=Source.SourceType.RSS)
-        results = {'success': 0, 'failed': 0}
+    def fetch_all(self, include_quarantined=False):
+        """Fetches every active RSS source; quarantined ones are skipped unless asked for."""
+        now = timezone.now()
+        sources = scheduler.polled_sources() if include_quarantined else scheduler.fetchable_sources(now)
+        results = self._fetch_sources(sources)
+        results['skipped_quarantined'] = 0 if include_quarantined else (
+            scheduler.polled_sources().filter(quarantined_until__gt=now).count()
+        )
+        return results
+
+    def fetch_due(self, limit=None):
+        """Fetches only the sources whose adaptive poll interval has elapsed."""
+        sources = scheduler.due_sources()
+        if limit:
+            sources = sources[:limit]
+        return self._fetch_sources(sources, due_only=True)
+
+    def _fetch_sources(self, sources, due_only=False):
+        results = {'success': 0, 'failed': 0, 'new_reports': 0}
         
         # Refresh cache once per batch run
         self._ignored_keywords_cache = None 
         
         for source in sources:
             try:
-                self.process_rss_source(source)
+                results['new_reports'] += self.process_rss_source(source, due_only=due_only)
                 results['success'] += 1
-            except Exception as e:
-                print(f"Error fetching {source.name}: {e}")
+            except Exception:
+                # Feed errors are recorded in _ingest_feed; anything reaching here is our own bug
+                # (or a database error), so it must not push a healthy source into quarantine
+                logger.exception(f"Error fetching {source.name}")
                 results['failed'] += 1
+                try:
+                    scheduler.release(source)
+                except Exception:
+                    logger.exception(f"Could not release the claim on {source.name}")
+        # Push fresh counts to the cached sidebar indicators, once per batch
+        refresh_global_status()
+        metrics.registry.publish()
         return results
 
-    def process_rss_source(self, source):
+    def process_rss_source(self, source, due_only=False):
+        """
+        Ingests new entries of an RSS source and schedules its next poll. Returns the number
+        of new reports, 0 when another worker is already fetching the source (see scheduler.claim).
+        """
+        if not scheduler.claim(source, due_only=due_only):
+            logger.info(f"Skipping {source.name}: already claimed by another fetch")
+            return 0
+        try:
+            return self._poll_source(source)
+        except Exception:
+            scheduler.release(source)
+            raise
+
+    def _poll_source(self, source):
         if not source.url:
-            return
+            scheduler.defer(source)
+            return 0
 
         ignored_keywords = self._get_ignored_keywords()
         
@@ -87,81 +147,130 @@ class IngestionEngine:
         source_identity = (source.name + " " + source.url).lower()
         if any(keyword in source_identity for keyword in ignored_keywords):
             # Log skipped source if needed, but for now just return
-            return
+            scheduler.defer(source)
+            return 0
 
         # --- Content Validation (Sovereign Guard) ---
         # 1. Check for valid URL scheme
         if not source.url.startswith(('http://', 'https://')):
-             print(f"Skipping invalid URL scheme: {source.url}")
-             return
+             logger.warning(f"Skipping invalid URL scheme: {source.url}")
+             scheduler.defer(source)
+             return 0
 
+        run = StageTimer('iims_ingest', 'ingest_source', source=source.name)
+        outcome = 'error'
         try:
-            feed = feedparser.parse(source.url)
+            new_reports = self._ingest_feed(source, ignored_keywords, run)
+            outcome = 'ok' if new_reports is not None else 'fetch_failed'
+            return new_reports or 0
+        finally:
+            run.finish(outcome)
+
+    def _ingest_feed(self, source, ignored_keywords, run):
+        """Fetches and ingests one feed, timing each stage. Returns None when the fetch failed."""
+        started = time.monotonic()
+        try:
+            with run.stage('fetch'):
+                feed = self.fetch_feed(source)
         except Exception as e:
-            print(f"Feed parsing error for {source.name}: {e}")
-            return
-        
+            logger.warning(f"Feed parsing error for {source.name}: {e}")
+            scheduler.record_poll(source, error=str(e), duration=time.monotonic() - started)
+            return None
+        fetch_seconds = time.monotonic() - started
+
+        if getattr(feed, 'bozo', False) and not feed.entries:
+            # Network error or unreadable document: nothing was parsed
+            error = str(getattr(feed, 'bozo_exception', 'unreadable feed'))
+            logger.warning(f"Feed fetch failed for {source.name}: {error}")
+            scheduler.record_poll(source, error=error, duration=fetch_seconds)
+            return None
+
+        run.count('entries', len(feed.entries))
+        new_reports = 0
         for entry in feed.entries:
-            # --- Content Filter: Double Check Entry ---
-            entry_text = (entry.title + " " + getattr(entry, 'link', '')).lower()
-            if any(keyword in entry_text for keyword in ignored_keywords):
+            with run.stage('parse'):
+                # --- Content Filter: Double Check Entry ---
+                entry_text = (entry.title + " " + getattr(entry, 'link', '')).lower()
+                ignored = any(keyword in entry_text for keyword in ignored_keywords)
+
+                published_time = timezone.now()
+
+                if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                    published_time = datetime.fromtimestamp(mktime(entry.published_parsed))
+                    published_time = timezone.make_aware(published_time)
+
+                # Basic Reliability Logic:
+                # Source Reliability (50%) + Freshness (20%) + ...
+                # For now, inherit source reliability as base credibility
+                credibility = source.reliability_score
+
+                raw_summary = getattr(entry, 'summary', '') or getattr(entry, 'description', '')
+            if ignored:
+                run.count('ignored')
                 continue
                 
             # Check if exists
-            if IntelligenceReport.objects.filter(original_url=entry.link).exists():
+            with run.stage('dedup'):
+                duplicate = IntelligenceReport.objects.filter(original_url=entry.link).exists()
+            if duplicate:
+                run.count('duplicates')
                 continue
 
-            published_time = timezone.now()
-
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                published_time = datetime.fromtimestamp(mktime(entry.published_parsed))
-                published_time = timezone.make_aware(published_time)
-
-            # Basic Reliability Logic:
-            # Source Reliability (50%) + Freshness (20%) + ...
-            # For now, inherit source reliability as base credibility
-            credibility = source.reliability_score
-
-            raw_summary = getattr(entry, 'summary', '') or getattr(entry, 'description', '')
-            clean_content = self.clean_html(raw_summary)
+            with run.stage('clean'):
+                clean_content = self.clean_html(raw_summary)
 
             # --- Sovereign AI Translation (Groq) ---
             # Priority: LLM -> Dictionary Fallback -> Original
             title_ar_val = None
             content_ar_val = None
 
-            if self.groq_client:
-                # 1. Title Translation
-                title_ar_val = self.groq_client.translate_with_chunking(entry.title, is_title=True)
-                
-                # 2. Content Translation (Chunked)
-                if clean_content:
-                    content_ar_val = self.groq_client.translate_with_chunking(clean_content)
-
-            # Fallback to Dictionary if LLM fails or is offline
-            if not title_ar_val:
-                title_ar_val = translator.translate_text(entry.title)
-            if not content_ar_val:
-                content_ar_val = translator.translate_text(clean_content)
-
-            report = IntelligenceReport.objects.create(
-                title=entry.title,
-                content=clean_content,
-                source=source,
-                original_url=entry.link,
-                published_at=published_time,
-                credibility_score=credibility,
-                # Store in Arabic Fields (Mission D)
-                title_ar=title_ar_val,
-                content_ar=content_ar_val,
-                # Keep legacy fields synced for now
-                translated_title=title_ar_val,
-                translated_content=content_ar_val,
-                processing_status='COMPLETED' if title_ar_val else 'PENDING'
-            )
+            with run.stage('translate'):
+                if self.groq_client:
+                    # 1. Title Translation
+                    title_ar_val = self.groq_client.translate_with_chunking(entry.title, is_title=True)
+                    
+                    # 2. Content Translation (Chunked)
+                    if clean_content:
+                        content_ar_val = self.groq_client.translate_with_chunking(clean_content)
+
+                # Fallback to Dictionary if LLM fails or is offline
+                if not title_ar_val:
+                    title_ar_val = translator.translate_text(entry.title)
+                if not content_ar_val:
+                    content_ar_val = translator.translate_text(clean_content)
+
+            # Includes the post_save handlers (critical alert rules)
+            with run.stage('insert'):
+                report = IntelligenceReport.objects.create(
+                    title=entry.title,
+                    content=clean_content,
+                    source=source,
+                    original_url=entry.link,
+                    published_at=published_time,
+                    credibility_score=credibility,
+                    # Store in Arabic Fields (Mission D)
+                    title_ar=title_ar_val,
+                    content_ar=content_ar_val,
+                    # Keep legacy fields synced for now
+                    translated_title=title_ar_val,
+                    translated_content=content_ar_val,
+                    processing_status='COMPLETED' if title_ar_val else 'PENDING'
+                )
             
+            new_reports += 1
+            run.count('reports')
+
             # Analyze content immediately after ingestion
-            self.analyzer.analyze_report(report)
+            with run.stage('analyze'):
+                self.analyzer.analyze_report(report)
+
+            # Feed the hourly/daily rollups and spike detector
+            with run.stage('alert'):
+                try:
+                    record_report(report)
+                except Exception as e:
+                    run.count('errors')
+                    logger.error(f"Trend rollup error for report {report.id}: {e}")
         
-        source.last_fetched_at = timezone.now()
-        source.save()
+        scheduler.record_poll(source, feed.entries, new_reports, duration=fetch_seconds)
+        return new_reports
@@ -0,0 +1,339 @@
+"""
+DB-backed background jobs.
+
+Views call `enqueue()` instead of starting threads. `manage.py run_jobs` claims queued
+jobs (a conditional UPDATE, so two workers never run the same job), runs them on a
+bounded thread pool and records the outcome:
+  - a job type never has more than JOB_CONCURRENCY[type] jobs running, which the
+    claiming UPDATE checks as well;
+  - a unique_key allows one queued or running job per key, so repeated clicks
+    return the job that is already pending;
+  - failures are retried with exponential backoff up to max_attempts, except
+    JobFailed which fails at once;
+  - a running job whose worker stops heart-beating for STALE_AFTER seconds is
+    requeued (or failed when out of attempts).
+With JOBS_ASYNC off (tests) jobs run inline inside enqueue().
+"""
+import os
+import socket
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThan
+from django.utils import timezone
+from core.cache import dashboard_cache
+from .models import BackgroundJob, Source, IntelligenceReport
+from .context_processors import STATUS_LOCK_KEY, refresh_global_status
+
+logger = logging.getLogger(__name__)
+
+JobType = BackgroundJob.JobType
+Status = BackgroundJob.Status
+ACTIVE = (Status.QUEUED, Status.RUNNING)
+
+CONCURRENCY = {
+    JobType.FETCH_SOURCE: 4,
+    JobType.FETCH_ALL: 1,
+    JobType.REANALYZE: 1,
+    JobType.TRANSLATE: 1,
+    JobType.PROCESS_DOCUMENT: 2,
+    JobType.FETCH_URLS: 2,
+    JobType.REFRESH_STATUS: 1,
+    JobType.BUILD_GRAPH_SNAPSHOT: 1,
+    JobType.SUMMARIZE_SESSION: 2,
+    **getattr(settings, 'JOB_CONCURRENCY', {}),
+}
+RETRY_DELAY = int(getattr(settings, 'JOB_RETRY_DELAY', 30))
+STALE_AFTER = int(getattr(settings, 'JOB_STALE_AFTER', 300))
+KEEP_FINISHED_DAYS = int(getattr(settings, 'JOB_KEEP_FINISHED_DAYS', 7))
+
+
+class JobFailed(Exception):
+    """Raised by a handler when retrying cannot help."""
+
+
+# -- handlers ----------------------------------------------------------------------
+
+def _fetch_source(params, progress):
+    from .ingestion import IngestionEngine
+    source = Source.objects.get(pk=params['source_id'])
+    if source.source_type != Source.SourceType.RSS:
+        return {'new_reports': 0, 'skipped': f"{source.get_source_type_display()} sources are not polled"}
+    new_reports = IngestionEngine().process_rss_source(source)
+    refresh_global_status()
+    return {'new_reports': new_reports}
+
+
+def _fetch_all(params, progress):
+    from .ingestion import IngestionEngine
+    return IngestionEngine().fetch_all()
+
+
+
+def _refresh_status(params, progress):
+    """Recomputes the sidebar indicators once their cached copy went stale."""
+    try:
+        status = refresh_global_status()
+    finally:
+        dashboard_cache.delete(STATUS_LOCK_KEY)
+    if status is None:
+        raise JobFailed("Global status could not be computed")
+    return status
+
+def _build_graph_snapshot(params, progress):
+    from .graph_snapshot import build_snapshot
+    snapshot = build_snapshot(full=params.get('full', False))
+    return {
+        'generation': snapshot.generation,
+        'incremental': snapshot.meta['incremental'],
+        'nodes': snapshot.num_nodes,
+        'edges': snapshot.num_edges,
+    }
+
+
+def _reports(params):
+    reports = IntelligenceReport.objects.select_related('source')
+    if params.get('report_ids'):
+        reports = reports.filter(pk__in=params['report_ids'])
+    if params.get('source_id'):
+        reports = reports.filter(source_id=params['source_id'])
+    return reports.order_by('-id')
+
+
+def _reanalyze(params, progress):
+    from .analysis import ContentAnalyzer
+    analyzer = ContentAnalyzer()
+    count = 0
+    for report in _reports(params).iterator(chunk_size=200):
+        analyzer.analyze_report(report)
+        count += 1
+    return {'reanalyzed': count}
+
+
+def _translate(params, progress):
+    """Fills title_ar/content_ar for reports that have no Arabic title yet."""
+    from intelligence_agent.services import GroqClient
+    client = GroqClient()
+    if not client.client:
+        raise JobFailed("AI Service Unavailable (No API Key)")
+    reports = _reports(params).filter(Q(title_ar__isnull=True) | Q(title_ar=''))
+    translated = skipped = 0
+    for report in reports[:int(params.get('limit', 200))]:
+        title_ar = client.translate_with_chunking(report.title, is_title=True)
+        if not title_ar:
+            skipped += 1
+            continue
+        content_ar = client.translate_with_chunking(report.content) if report.content else ""
+        report.title_ar = report.translated_title = title_ar
+        report.content_ar = report.translated_content = content_ar
+        report.save(update_fields=['title_ar', 'content_ar', 'translated_title', 'translated_content'])
+        translated += 1
+    return {'translated': translated, 'skipped': skipped}
+
+
+def _process_document(params, progress):
+    from intelligence_agent.documents import process_document
+    from intelligence_agent.models import AgentDocument
+    try:
+        document = process_document(params['document_id'])
+    except AgentDocument.DoesNotExist:
+        raise JobFailed(f"Document {params['document_id']} no longer exists")
+    return {'status': document.status, 'pages': document.pages_total, 'error': document.error_message}
+
+
+def _summarize_session(params, progress):
+    from intelligence_agent.memory import summarize_session
+    from intelligence_agent.models import AgentSession
+    try:
+        return {'summarized': summarize_session(params['session_id'])}
+    except AgentSession.DoesNotExist:
+        raise JobFailed(f"Session {params['session_id']} no longer exists")
+
+
+def _fetch_urls(params, progress):
+    """Manual URL fetch; the counters are stored on the job after every URL for the polling page."""
+    from .url_fetcher import URLFetcher
+    urls = params['urls']
+    state = {'total': len(urls), 'processed': 0, 'success': 0, 'failed': 0, 'errors': [], 'report_ids': []}
+
+    def on_progress(url, results):
+        state.update(
+            processed=results['processed'],
+            success=results['success'],
+            failed=results['failed'],
+            errors=results['errors'],
+            report_ids=[report.id for report in results['reports']],
+        )
+        progress(state)
+
+    on_progress(None, URLFetcher().fetch_and_process_urls(urls, query=params.get('query', ''), progress=on_progress))
+    return state
+
+
+# Handlers take the job params and a progress(result) callback that stores a partial
+# result on the running job
+HANDLERS = {
+    JobType.FETCH_SOURCE: _fetch_source,
+    JobType.FETCH_ALL: _fetch_all,
+    JobType.REANALYZE: _reanalyze,
+    JobType.TRANSLATE: _translate,
+    JobType.PROCESS_DOCUMENT: _process_document,
+    JobType.FETCH_URLS: _fetch_urls,
+    JobType.REFRESH_STATUS: _refresh_status,
+    JobType.BUILD_GRAPH_SNAPSHOT: _build_graph_snapshot,
+    JobType.SUMMARIZE_SESSION: _summarize_session,
+}
+
+
+# -- queue -------------------------------------------------------------------------
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(job_type, params=None, user=None, unique_key=None, max_attempts=3):
+    """
+    Queues a job and returns (job, created). With a unique_key, the queued or running
+    job for that key is returned instead of a new one.
+    """
+    for _ in range(2):
+        if unique_key:
+            existing = BackgroundJob.objects.filter(unique_key=unique_key, status__in=ACTIVE).first()
+            if existing:
+                return existing, False
+        try:
+            with transaction.atomic():
+                job = BackgroundJob.objects.create(
+                    job_type=job_type,
+                    params=params or {},
+                    unique_key=unique_key,
+                    max_attempts=max_attempts,
+                    created_by=user if user is not None and user.is_authenticated else None,
+                )
+            break
+        except IntegrityError:
+            # Lost a race with another request for the same key; return that job
+            continue
+    else:
+        raise RuntimeError(f"Could not enqueue {job_type} job {unique_key}")
+
+    if not getattr(settings, 'JOBS_ASYNC', True):
+        if _claim(job, 'inline'):
+            job.refresh_from_db()
+            run_job(job)
+    return job, True
+
+
+def _claim(job, worker):
+    """
+    Starts a queued job if its type is still below its concurrency cap; the cap is
+    checked by the claiming UPDATE itself, so concurrent claims cannot overshoot it.
+    """
+    now = timezone.now()
+    running = (
+        BackgroundJob.objects.filter(status=Status.RUNNING, job_type=job.job_type)
+        .order_by().values('job_type').annotate(n=Count('id')).values('n')
+    )
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            # Claims of one type queue up on its active rows, so each count below sees
+            # the jobs the others started (SQLite's write lock already does this)
+            list(BackgroundJob.objects.select_for_update().filter(job_type=job.job_type, status__in=ACTIVE)
+                 .order_by('id').values_list('id', flat=True))
+        return BackgroundJob.objects.filter(
+            LessThan(Coalesce(Subquery(running), 0), CONCURRENCY.get(job.job_type, 1)),
+            pk=job.pk, status=Status.QUEUED,
+        ).update(
+            status=Status.RUNNING, locked_by=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        ) == 1
+
+
+def claim_next(worker):
+    """Claims the oldest due job whose type is below its concurrency cap, or returns None."""
+    # Cheap pre-filter; _claim() enforces the cap
+    running = dict(
+        BackgroundJob.objects.filter(status=Status.RUNNING)
+        .values_list('job_type').annotate(n=Count('id'))
+    )
+    open_types = [job_type for job_type in JobType.values if running.get(job_type, 0) < CONCURRENCY.get(job_type, 1)]
+    if not open_types:
+        return None
+    candidates = BackgroundJob.objects.filter(
+        status=Status.QUEUED, run_after__lte=timezone.now(), job_type__in=open_types,
+    ).order_by('run_after', 'id')[:10]
+    for job in candidates:
+        if _claim(job, worker):
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def _progress(job, result):
+    job.result = result
+    BackgroundJob.objects.filter(pk=job.pk).update(result=result, heartbeat_at=timezone.now())
+
+
+def run_job(job):
+    """Runs a claimed job and records success, a scheduled retry or the failure."""
+    try:
+        handler = HANDLERS[job.job_type]
+        result = handler(job.params, lambda partial: _progress(job, partial))
+    except Exception as e:
+        logger.warning(f"Job {job.pk} ({job.job_type}) attempt {job.attempts} failed: {e}")
+        job.error = str(e)[:2000]
+        if isinstance(e, (JobFailed, KeyError, Source.DoesNotExist)) or job.attempts >= job.max_attempts:
+            job.status = Status.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+        job.save(update_fields=['status', 'error', 'finished_at', 'run_after'])
+        return job
+
+    job.status = Status.SUCCEEDED
+    job.result = result
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def heartbeat(job_ids):
+    if job_ids:
+        BackgroundJob.objects.filter(pk__in=job_ids, status=Status.RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale():
+    """Requeues running jobs whose worker has gone quiet; returns how many were touched."""
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    stale = BackgroundJob.objects.filter(status=Status.RUNNING, heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Status.FAILED, error="Worker stopped responding", finished_at=timezone.now(),
+    )
+    return failed + stale.update(status=Status.QUEUED, run_after=timezone.now(), locked_by='')
+
+
+def purge_finished():
+    cutoff = timezone.now() - timedelta(days=KEEP_FINISHED_DAYS)
+    return BackgroundJob.objects.filter(status__in=(Status.SUCCEEDED, Status.FAILED), finished_at__lt=cutoff).delete()[0]
+
+
+def job_payload(job):
+    return {
+        'id': job.pk,
+        'type': job.job_type,
+        'type_display': job.get_job_type_display(),
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'run_after': job.run_after.isoformat() if job.status == Status.QUEUED else None,
+    }
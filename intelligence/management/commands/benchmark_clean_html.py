@@ -0,0 +1,81 @@
+import re
+import json
+import time
+import unicodedata
+from pathlib import Path
+import feedparser
+from django.core.management.base import BaseCommand, CommandError
+from intelligence.utils import html_extract
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / 'fixtures' / 'feeds'
+
+
+def _legacy(raw_html):
+    """The previous IngestionEngine.clean_html: an html.parser tree for every summary."""
+    from bs4 import BeautifulSoup
+    if not raw_html:
+        return ""
+    text = BeautifulSoup(raw_html, "html.parser").get_text(separator=" ")
+    text = re.sub(r'\s+', ' ', text)
+    text = unicodedata.normalize('NFKC', text)
+    text = text.replace('â€™', "'").replace('â€œ', '"').replace('â€', '"')
+    text = text.replace('&nbsp;', ' ')
+    return text.strip()
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks feed summary cleaning (tokenizer vs BeautifulSoup) on the recorded fixture feeds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Passes over the summary corpus per cleaner')
+        parser.add_argument('--feeds', default=str(FIXTURE_DIR), help='Directory with recorded RSS/Atom files')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        feeds = sorted(Path(options['feeds']).glob('*.xml'))
+        if not feeds:
+            raise CommandError(f"No .xml feeds in {options['feeds']}")
+        summaries = [
+            entry.get('summary', '') or entry.get('description', '')
+            for path in feeds for entry in feedparser.parse(str(path)).entries
+        ]
+        iterations = options['iterations']
+
+        cleaners = {'tokenizer': html_extract.clean_html}
+        if html_extract.HAS_BS4:
+            cleaners['beautifulsoup (legacy)'] = _legacy
+
+        results = {
+            'feeds': len(feeds),
+            'summaries': len(summaries),
+            'markup_free': sum('<' not in s and '&' not in s for s in summaries),
+            'iterations': iterations,
+            'cleaners': {},
+        }
+        for name, cleaner in cleaners.items():
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for summary in summaries:
+                    cleaner(summary)
+            elapsed = time.perf_counter() - started
+            count = len(summaries) * iterations
+            results['cleaners'][name] = {
+                'seconds': round(elapsed, 4),
+                'reports_per_sec': round(count / elapsed, 1),
+                'us_per_report': round(elapsed * 1e6 / count, 2),
+            }
+        if html_extract.HAS_BS4:
+            results['mismatches'] = sum(html_extract.clean_html(s) != _legacy(s) for s in summaries)
+
+        self.stdout.write(
+            f"{results['summaries']} summaries from {len(feeds)} feeds "
+            f"({results['markup_free']} without markup), {iterations} iterations"
+        )
+        for name, row in results['cleaners'].items():
+            self.stdout.write(f"  {name:<24} {row['reports_per_sec']:>10.1f} reports/s  {row['us_per_report']:>8.2f} us/report")
+        if 'mismatches' in results:
+            self.stdout.write(f"  outputs differing from the legacy cleaner: {results['mismatches']}")
+
+        if options['json_path']:
+            Path(options['json_path']).write_text(json.dumps(results, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
@@ -0,0 +1,329 @@
+import re
+import json
+import time
+import logging
+import random
+import platform
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import django
+import feedparser
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from core import metrics
+from core.profiling import percentile
+from intelligence.ingestion import IngestionEngine
+from intelligence.models import Source
+from intelligence.context_processors import refresh_global_status
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / 'fixtures' / 'feeds'
+STAGES = ('fetch', 'parse', 'dedup', 'clean', 'translate', 'insert', 'analyze', 'alert')
+_NOT_COUNTED = ('SAVEPOINT', 'RELEASE', 'ROLLBACK')
+_WRITE = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE)\b(?:\s+OR\s+\w+)?(?:\s+INTO|\s+FROM)?\s+"?(\w+)"?', re.I)
+
+
+class StubLLM:
+    """
+    Stands in for GroqClient: every call waits `latency` seconds (+/- jitter) and fails
+    with probability `error_rate`, returning None like GroqClient does on API errors.
+    Long texts are split into the same 4000-character chunks, one call per chunk.
+    """
+    CHUNK = 4000
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _call(self, text):
+        self.calls += 1
+        if self.latency:
+            time.sleep(max(self.latency * (1 + self.random.uniform(-self.jitter, self.jitter)), 0))
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            return None
+        return f"[ar] {text}"
+
+    def translate_with_chunking(self, text, is_title=False):
+        if not text:
+            return ""
+        if is_title or len(text) < self.CHUNK:
+            return self._call(text)
+        chunks = [self._call(text[i:i + self.CHUNK]) for i in range(0, len(text), self.CHUNK)]
+        return None if any(chunk is None for chunk in chunks) else "\n".join(chunks)
+
+
+class ReplayEngine(IngestionEngine):
+    """IngestionEngine that parses recorded feed files instead of downloading them."""
+
+    def __init__(self, feeds, llm):
+        super().__init__()
+        self.groq_client = llm
+        self.feeds = feeds
+        self.round = 0
+
+    def fetch_feed(self, source):
+        feed = feedparser.parse(self.feeds[source.url])
+        # Fresh links every round, so each round ingests the feed again instead of deduplicating it
+        for entry in feed.entries:
+            entry['link'] = f"{entry.get('link', source.url)}#round-{self.round}"
+        return feed
+
+
+class QueryCounter:
+    """DB execute wrapper counting reads and writes (by table); savepoints are not counted."""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        match = _WRITE.match(sql)
+        if match:
+            self.writes[match.group(2)] += 1
+        elif not sql.lstrip().upper().startswith(_NOT_COUNTED):
+            self.reads += 1
+        return execute(sql, params, many, context)
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Points the default connection at a freshly migrated test database for the block and
+    destroys it afterwards. On SQLite it is a temporary file rather than the in-memory
+    test default, so writes cost what they cost on disk.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_name, old_test_name = connection.settings_dict['NAME'], test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as tmp:
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = str(Path(tmp) / 'benchmark.sqlite3')
+        try:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            test_settings['NAME'] = old_test_name
+
+
+class Command(BaseCommand):
+    help = 'Replays the recorded fixture feeds through IngestionEngine with a stub LLM and reports throughput per stage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feeds', default=str(FIXTURE_DIR), help='Directory with recorded RSS/Atom files')
+        parser.add_argument('--rounds', type=int, default=3, help='Times every feed is replayed')
+        parser.add_argument('--llm-latency', type=float, default=50, help='Stub LLM latency per call in ms')
+        parser.add_argument('--llm-jitter', type=float, default=0.2, help='Latency jitter as a fraction of --llm-latency')
+        parser.add_argument('--llm-error-rate', type=float, default=0.0, help='Fraction of stub LLM calls that fail')
+        parser.add_argument('--no-llm', action='store_true', help='Dictionary translation only, as without a GROQ_API_KEY')
+        parser.add_argument('--seed', type=int, default=1, help='Seed for the stub LLM jitter and errors')
+        parser.add_argument(
+            '--live-db', action='store_true',
+            help='Run against the configured database in one transaction that is rolled back, '
+                 'instead of a throwaway test database (holds the SQLite write lock for the whole run)',
+        )
+        parser.add_argument('--keep', action='store_true', help='With --live-db, commit the ingested reports instead of rolling them back')
+        parser.add_argument('--json', dest='json_path', help='Results file (default: var/benchmarks/ingestion_<time>_<commit>.json)')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+
+    def handle(self, *args, **options):
+        paths = sorted(Path(options['feeds']).glob('*.xml'))
+        if not paths:
+            raise CommandError(f"No .xml feeds in {options['feeds']}")
+        if not 0 <= options['llm_error_rate'] <= 1:
+            raise CommandError("--llm-error-rate must be between 0 and 1")
+        if options['keep'] and not options['live_db']:
+            raise CommandError("--keep only applies with --live-db")
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        llm = None if options['no_llm'] else StubLLM(
+            latency=options['llm_latency'] / 1000,
+            jitter=options['llm_jitter'],
+            error_rate=options['llm_error_rate'],
+            seed=options['seed'],
+        )
+        feeds = {f'http://bench.invalid/{path.name}': path.read_bytes() for path in paths}
+
+        # Keep benchmark numbers out of the live /health/metrics/ totals
+        metrics.registry.shared.enabled = False
+        metrics.registry.reset()
+        metrics.registry.trace = []
+        queries = QueryCounter()
+        # One JSON line per replayed feed is noise here unless asked for
+        metrics_logger = logging.getLogger('iims.metrics')
+        log_level = metrics_logger.level
+        if options['verbosity'] < 2:
+            metrics_logger.setLevel(logging.WARNING)
+
+        try:
+            with nullcontext() if options['live_db'] else throwaway_database():
+                new_reports, elapsed = self.replay(paths, feeds, llm, queries, options)
+        finally:
+            trace, metrics.registry.trace = metrics.registry.trace, None
+            metrics.registry.shared.enabled = True
+            metrics_logger.setLevel(log_level)
+        # The sidebar status may have been refreshed from the benchmark data; recompute it
+        refresh_global_status()
+
+        results = self.summarize(options, paths, llm, trace, queries, new_reports, elapsed)
+        self.print_results(results, baseline)
+
+        json_path = Path(options['json_path'] or Path(settings.BASE_DIR, 'var', 'benchmarks',
+                         f"ingestion_{timezone.now():%Y%m%d_%H%M%S}_{results['meta']['commit'] or 'nogit'}.json"))
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        json_path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f"Results written to {json_path}"))
+
+    def replay(self, paths, feeds, llm, queries, options):
+        """Ingests every feed `rounds` times; returns (new reports, seconds)."""
+        new_reports = 0
+        try:
+            # A throwaway database commits as production does; the live one is rolled back
+            with transaction.atomic() if options['live_db'] else nullcontext():
+                sources = [
+                    Source.objects.create(name=f'benchmark: {path.stem}', url=url, source_type=Source.SourceType.RSS)
+                    for path, url in zip(paths, feeds)
+                ]
+                engine = ReplayEngine(feeds, llm)
+                with connection.execute_wrapper(queries):
+                    started = time.perf_counter()
+                    for round_number in range(options['rounds']):
+                        engine.round = round_number
+                        for source in sources:
+                            new_reports += engine.process_rss_source(source)
+                    elapsed = time.perf_counter() - started
+                if options['live_db']:
+                    if not options['keep']:
+                        raise _Rollback
+                    # Kept reports stay, but the scheduler must not poll the fixture URLs
+                    Source.objects.filter(pk__in=[source.pk for source in sources]).update(is_active=False)
+        except _Rollback:
+            pass
+        return new_reports, elapsed
+
+    def summarize(self, options, paths, llm, trace, queries, new_reports, elapsed):
+        counters = defaultdict(float)
+        for name, labels, value in metrics.registry.snapshot()['counters']:
+            counters[name] += value
+
+        durations = defaultdict(list)
+        for name, labels, seconds in trace:
+            if name == 'iims_ingest_stage_seconds':
+                durations[labels['stage']].append(seconds)
+        stage_total = sum(sum(values) for values in durations.values()) or 1
+        stages = {}
+        for stage in sorted(durations, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            values = durations[stage]
+            stages[stage] = {
+                'calls': len(values),
+                'total_s': round(sum(values), 4),
+                'mean_ms': _ms(sum(values) / len(values)),
+                'p50_ms': _ms(percentile(values, 50)),
+                'p95_ms': _ms(percentile(values, 95)),
+                'max_ms': _ms(max(values)),
+                'ms_per_report': _ms(sum(values) / new_reports) if new_reports else None,
+                'share': round(sum(values) / stage_total, 4),
+            }
+
+        writes = sum(queries.writes.values())
+        per_report = (lambda n: round(n / new_reports, 2) if new_reports else None)
+        return {
+            'meta': {
+                'commit': _commit(),
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'config': {
+                'feeds': [path.name for path in paths],
+                'rounds': options['rounds'],
+                'llm': None if llm is None else {
+                    'latency_ms': options['llm_latency'],
+                    'jitter': options['llm_jitter'],
+                    'error_rate': options['llm_error_rate'],
+                    'seed': options['seed'],
+                },
+                'live_db': options['live_db'],
+                'kept': options['keep'],
+            },
+            'totals': {
+                'entries': int(counters['iims_ingest_entries_total']),
+                'new_reports': new_reports,
+                'duplicates': int(counters['iims_ingest_duplicates_total']),
+                'ignored': int(counters['iims_ingest_ignored_total']),
+                'seconds': round(elapsed, 4),
+                'reports_per_sec': round(new_reports / elapsed, 2) if elapsed else None,
+                'ms_per_report': _ms(elapsed / new_reports) if new_reports else None,
+            },
+            'db': {
+                'reads': queries.reads,
+                'writes': writes,
+                'reads_per_report': per_report(queries.reads),
+                'writes_per_report': per_report(writes),
+                'writes_by_table': dict(queries.writes.most_common()),
+            },
+            'llm': None if llm is None else {'calls': llm.calls, 'errors': llm.errors},
+            'stages': stages,
+        }
+
+    def print_results(self, results, baseline=None):
+        totals, db = results['totals'], results['db']
+        base_totals = (baseline or {}).get('totals', {})
+        base_db = (baseline or {}).get('db', {})
+        base_stages = (baseline or {}).get('stages', {})
+
+        def delta(value, old):
+            if baseline is None or value is None or not old:
+                return ''
+            return f"  ({(value - old) / old:+.1%} vs {baseline['meta'].get('commit') or 'baseline'})"
+
+        self.stdout.write(
+            f"{totals['new_reports']} reports from {totals['entries']} entries "
+            f"({len(results['config']['feeds'])} feeds x {results['config']['rounds']} rounds) in {totals['seconds']:.2f}s"
+        )
+        self.stdout.write(f"  throughput       {totals['reports_per_sec']:>10} reports/s{delta(totals['reports_per_sec'], base_totals.get('reports_per_sec'))}")
+        self.stdout.write(f"  db writes        {db['writes_per_report']:>10} per report{delta(db['writes_per_report'], base_db.get('writes_per_report'))}")
+        self.stdout.write(f"  db reads         {db['reads_per_report']:>10} per report{delta(db['reads_per_report'], base_db.get('reads_per_report'))}")
+        if results['llm']:
+            self.stdout.write(f"  stub llm         {results['llm']['calls']:>10} calls, {results['llm']['errors']} failed")
+        self.stdout.write(f"  {'stage':<10} {'calls':>7} {'mean ms':>9} {'p95 ms':>9} {'ms/report':>10} {'share':>7}")
+        for stage, row in results['stages'].items():
+            old = base_stages.get(stage, {}).get('ms_per_report')
+            self.stdout.write(
+                f"  {stage:<10} {row['calls']:>7} {row['mean_ms']:>9.3f} {row['p95_ms']:>9.3f} "
+                f"{row['ms_per_report'] or 0:>10.3f} {row['share']:>7.1%}{delta(row['ms_per_report'], old)}"
+            )
@@ -0,0 +1,79 @@
+import json
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from intelligence.utils import html_extract
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / 'fixtures' / 'pages'
+
+
+def _legacy(raw, content_type):
+    """The previous pipeline: whole-body charset sniff, then html.parser and every <p>."""
+    from bs4 import BeautifulSoup
+    best = html_extract.sniff_charset(raw).best()
+    soup = BeautifulSoup(raw.decode(best.encoding if best else 'utf-8', errors='replace'), 'html.parser')
+    return "\n\n".join(p.get_text() for p in soup.find_all('p'))
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks charset detection and content extraction backends on the saved fixture pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Passes over the fixture corpus per backend')
+        parser.add_argument('--pages', default=str(FIXTURE_DIR), help='Directory with the pages and manifest.json')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        pages_dir = Path(options['pages'])
+        try:
+            manifest = json.loads((pages_dir / 'manifest.json').read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            raise CommandError(f"No manifest.json in {pages_dir}")
+        corpus = [((pages_dir / name).read_bytes(), meta) for name, meta in manifest.items()]
+        corpus_bytes = sum(len(raw) for raw, _ in corpus)
+        iterations = options['iterations']
+
+        backends = [b for b in html_extract.BACKENDS if b != 'lxml' or html_extract.HAS_LXML]
+        if not html_extract.HAS_BS4:
+            backends = [b for b in backends if b != 'html.parser']
+
+        results = {'pages': len(corpus), 'corpus_bytes': corpus_bytes, 'iterations': iterations, 'backends': {}}
+        for backend in backends:
+            correct = 0
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for raw, meta in corpus:
+                    title, content = html_extract.extract(html_extract.decode_body(raw, meta['content_type']), '', backend)
+                    correct += meta['title'] in title and meta['expect'] in content and not any(r in content for r in meta['reject'])
+            results['backends'][backend] = self._summary(time.perf_counter() - started, len(corpus) * iterations, corpus_bytes * iterations, correct)
+
+        if html_extract.HAS_BS4 and html_extract.sniff_charset is not None:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                for raw, meta in corpus:
+                    _legacy(raw, meta['content_type'])
+            results['backends']['legacy (sniff + html.parser)'] = self._summary(
+                time.perf_counter() - started, len(corpus) * iterations, corpus_bytes * iterations, None
+            )
+
+        self.stdout.write(f"{len(corpus)} pages, {corpus_bytes / 1024:.0f} KiB, {iterations} iterations")
+        for backend, row in results['backends'].items():
+            accuracy = f"{row['accuracy']:.0%}" if row['accuracy'] is not None else '-'
+            self.stdout.write(
+                f"  {backend:<30} {row['pages_per_sec']:>9.1f} pages/s  {row['mib_per_sec']:>7.2f} MiB/s  "
+                f"{row['ms_per_page']:>7.2f} ms/page  main-content {accuracy}"
+            )
+
+        if options['json_path']:
+            Path(options['json_path']).write_text(json.dumps(results, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+
+    @staticmethod
+    def _summary(elapsed, pages, size, correct):
+        return {
+            'seconds': round(elapsed, 4),
+            'pages_per_sec': round(pages / elapsed, 1),
+            'mib_per_sec': round(size / elapsed / (1024 * 1024), 2),
+            'ms_per_page': round(elapsed * 1000 / pages, 3),
+            'accuracy': round(correct / pages, 3) if correct is not None else None,
+        }
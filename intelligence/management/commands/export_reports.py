@@ -0,0 +1,55 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from intelligence.search_views import filter_reports
+from intelligence import report_export
+
+
+class Command(BaseCommand):
+    help = 'Streams reports matching the search filters to a JSONL or CSV file (audited per chunk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username the export is audited under')
+        parser.add_argument('--format', choices=report_export.FORMATS, default='jsonl')
+        parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+        parser.add_argument('--q', default='', help='Search term (title, content or entity)')
+        parser.add_argument('--classification', default='')
+        parser.add_argument('--source', default='', help='Source id')
+        parser.add_argument('--date-from', default='')
+        parser.add_argument('--date-to', default='')
+        parser.add_argument('--chunk-size', type=int, help=f'Rows read per batch (default {report_export.CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User '{options['user']}' not found")
+
+        filters = {
+            'q': options['q'],
+            'classification': options['classification'],
+            'source': options['source'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+        }
+        lines = report_export.stream_export(
+            filter_reports(filters),
+            options['format'],
+            user=user,
+            label=f"Command export, filters: { {k: v for k, v in filters.items() if v} }",
+            chunk_size=options['chunk_size'],
+        )
+
+        out = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        count = 0
+        try:
+            for line in lines:
+                out.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['format'] == 'csv':
+            count -= 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} reports"))
@@ -1,10 +1,15 @@
 from django.core.management.base import BaseCommand
+from intelligence import scheduler
 from intelligence.ingestion import IngestionEngine
 from intelligence.models import Source
 
 class Command(BaseCommand):
     help = 'Ingest news from active sources'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--due', action='store_true', help='Only fetch sources whose next poll is due')
+        parser.add_argument('--include-quarantined', action='store_true', help='Also probe quarantined sources now')
+
     def handle(self, *args, **options):
         # Seed some default sources if none exist
         if not Source.objects.exists():
@@ -30,5 +35,29 @@ class Command(BaseCommand):
 
         self.stdout.write("Starting ingestion...")
         engine = IngestionEngine()
-        results = engine.fetch_all()
+        if options['due']:
+            results = engine.fetch_due()
+        else:
+            results = engine.fetch_all(include_quarantined=options['include_quarantined'])
         self.stdout.write(self.style.SUCCESS(f"Ingestion Complete. Success: {results['success']}, Failed: {results['failed']}"))
+        if results.get('skipped_quarantined'):
+            self.stdout.write(self.style.WARNING(f"Skipped {results['skipped_quarantined']} quarantined sources"))
+        self.report_health()
+
+    def report_health(self):
+        unhealthy = list(scheduler.health_report())
+        if not unhealthy:
+            self.stdout.write("All sources healthy.")
+            return
+        self.stdout.write(f"{len(unhealthy)} sources failing:")
+        for source in unhealthy:
+            state = (
+                f"quarantined until {source.quarantined_until:%Y-%m-%d %H:%M}"
+                if source.health == 'quarantined' else source.health
+            )
+            avg = f"{source.avg_fetch_seconds:.1f}s" if source.avg_fetch_seconds is not None else '-'
+            self.stdout.write(
+                f"  {source.name[:40]:<40} {state:<32} failures {source.consecutive_failures} "
+                f"({source.failure_count}/{source.fetch_count} total), avg fetch {avg}, "
+                f"{source.avg_yield:.1f} items/fetch | {source.last_error[:80]}"
+            )
@@ -0,0 +1,42 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from intelligence.models import IntelligenceReport, Entity, EntityCooccurrence
+from intelligence.cooccurrence import record_cooccurrences
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the entity co-occurrence table from existing report/entity links'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Reports read per batch')
+
+    def handle(self, *args, **options):
+        EntityCooccurrence.objects.all().delete()
+        chunk_size = options['chunk_size']
+        links = Entity.reports.through.objects
+
+        reports = IntelligenceReport.objects.order_by('id').only('id', 'published_at', 'created_at')
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(reports.filter(id__gt=last_id)[:chunk_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            entities_by_report = defaultdict(set)
+            for report_id, entity_id in links.filter(
+                intelligencereport_id__in=[r.id for r in batch]
+            ).values_list('intelligencereport_id', 'entity_id'):
+                entities_by_report[report_id].add(entity_id)
+
+            for report in batch:
+                entity_ids = entities_by_report.get(report.id)
+                if entity_ids and len(entity_ids) > 1:
+                    record_cooccurrences(report, entity_ids, entity_ids)
+                    total += 1
+            self.stdout.write(f"Processed reports up to id {last_id}...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt co-occurrence table from {total} reports ({EntityCooccurrence.objects.count()} pairs)"
+        ))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from intelligence.models import IntelligenceReport, Entity, TrendCounter, TrendBaseline
+from intelligence.trends import record_report
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds trend rollups and baselines by replaying existing reports in publication order (no alerts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Reports read per batch')
+
+    def handle(self, *args, **options):
+        TrendCounter.objects.all().delete()
+        TrendBaseline.objects.all().delete()
+        links = Entity.reports.through.objects
+
+        reports = IntelligenceReport.objects.order_by(F('published_at').asc(nulls_first=True), 'id').only(
+            'id', 'topic', 'severity', 'source_id', 'classification', 'published_at', 'created_at'
+        )
+        total = 0
+        for offset in range(0, reports.count(), options['chunk_size']):
+            batch = list(reports[offset:offset + options['chunk_size']])
+            entity_ids = {}
+            for report_id, entity_id in links.filter(
+                intelligencereport_id__in=[r.id for r in batch]
+            ).values_list('intelligencereport_id', 'entity_id'):
+                entity_ids.setdefault(report_id, []).append(entity_id)
+            for report in batch:
+                record_report(report, entity_ids.get(report.id, []), detect=False)
+                total += 1
+            self.stdout.write(f"Replayed {total} reports...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {TrendCounter.objects.count()} rollup rows and {TrendBaseline.objects.count()} baselines"
+        ))
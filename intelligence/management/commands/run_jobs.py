@@ -0,0 +1,75 @@
+import time
+import signal
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from intelligence import jobs
+
+logger = logging.getLogger(__name__)
+
+PURGE_EVERY = 3600
+
+
+def _run(job):
+    try:
+        jobs.run_job(job)
+    finally:
+        # Worker threads hold their own database connection
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (source and URL fetches, reanalysis, translation, document extraction, chat summaries, status refreshes, graph snapshots) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=int(getattr(settings, 'JOB_WORKERS', 2)),
+                            help='Jobs run at the same time by this process')
+        parser.add_argument('--poll-interval', type=float, default=2, help='Seconds between queue checks')
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due now, then exit')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        worker = jobs.worker_name()
+        executor = ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='job')
+        running = {}
+        last_purge = 0
+        self.stdout.write(f"Job worker {worker} started with {options['workers']} slots")
+
+        while not stop.is_set():
+            claimed = 0
+            try:
+                if time.monotonic() - last_purge > PURGE_EVERY:
+                    jobs.purge_finished()
+                    last_purge = time.monotonic()
+                jobs.requeue_stale()
+                while len(running) < options['workers']:
+                    job = jobs.claim_next(worker)
+                    if job is None:
+                        break
+                    claimed += 1
+                    self.stdout.write(f"Running {job}")
+                    running[executor.submit(_run, job)] = job.pk
+                jobs.heartbeat(list(running.values()))
+            except Exception as e:
+                logger.error(f"Job worker loop error: {e}")
+            finally:
+                close_old_connections()
+
+            if options['once'] and not running and not claimed:
+                break
+            if running:
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+            else:
+                stop.wait(options['poll_interval'])
+
+        # Running jobs finish; unclaimed ones stay queued for the next worker
+        executor.shutdown(wait=True)
+        self.stdout.write("Job worker stopped.")
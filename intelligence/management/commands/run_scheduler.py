@@ -0,0 +1,63 @@
+import time
+import signal
+import logging
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from intelligence import jobs, scheduler
+from intelligence.ingestion import IngestionEngine
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Polls RSS sources as they fall due on their adaptive schedule and queues graph snapshot '
+        'builds every GRAPH_SNAPSHOT_INTERVAL seconds; runs until stopped'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Queue a snapshot build and fetch the sources that are due now, then exit')
+        parser.add_argument('--batch', type=int, default=20, help='Sources fetched before the schedule is re-read')
+        parser.add_argument('--max-sleep', type=float, default=60, help='Longest wait between schedule checks (seconds)')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        engine = IngestionEngine()
+        self.stdout.write(
+            f"Scheduler started: {scheduler.polled_sources().count()} active RSS sources, "
+            f"~{scheduler.expected_daily_fetches():.0f} fetches/day at the current intervals"
+        )
+        snapshot_interval = int(getattr(settings, 'GRAPH_SNAPSHOT_INTERVAL', 900))
+        next_snapshot = time.monotonic()
+        while not stop.is_set():
+            results = {'success': 0, 'failed': 0, 'new_reports': 0}
+            try:
+                if time.monotonic() >= next_snapshot:
+                    next_snapshot = time.monotonic() + snapshot_interval
+                    jobs.enqueue(jobs.JobType.BUILD_GRAPH_SNAPSHOT, unique_key='build_graph_snapshot')
+                results = engine.fetch_due(limit=options['batch'])
+                if results['success'] or results['failed']:
+                    self.stdout.write(
+                        f"Fetched {results['success'] + results['failed']} due sources "
+                        f"({results['failed']} failed), {results['new_reports']} new reports"
+                    )
+                wait = scheduler.seconds_until_due()
+            except Exception as e:
+                logger.error(f"Scheduler pass failed: {e}")
+                wait = None
+            finally:
+                close_old_connections()
+
+            if options['once']:
+                break
+            if results['success'] + results['failed'] >= options['batch']:
+                # A full batch: more sources are probably due already
+                continue
+            wait = min(options['max_sleep'] if wait is None else max(wait, 1), options['max_sleep'])
+            stop.wait(min(wait, max(next_snapshot - time.monotonic(), 1)))
+        self.stdout.write("Scheduler stopped.")
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0013_searchconstraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='عدد مرات الظهور المشترك')),
+                ('first_seen', models.DateTimeField(verbose_name='أول ظهور')),
+                ('last_seen', models.DateTimeField(verbose_name='آخر ظهور')),
+                ('entity_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='intelligence.entity', verbose_name='الكيان الأول')),
+                ('entity_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='intelligence.entity', verbose_name='الكيان الثاني')),
+            ],
+            options={
+                'verbose_name': 'ظهور مشترك للكيانات',
+                'verbose_name_plural': 'الظهور المشترك للكيانات',
+            },
+        ),
+        migrations.CreateModel(
+            name='EntityCooccurrenceBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('pair', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='intelligence.entitycooccurrence')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='entitycooccurrence',
+            index=models.Index(fields=['entity_a', '-count'], name='cooc_entity_a_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entitycooccurrence',
+            index=models.Index(fields=['entity_b', '-count'], name='cooc_entity_b_count_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='entitycooccurrence',
+            unique_together={('entity_a', 'entity_b')},
+        ),
+        migrations.AddIndex(
+            model_name='entitycooccurrencebucket',
+            index=models.Index(fields=['day'], name='cooc_bucket_day_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='entitycooccurrencebucket',
+            unique_together={('pair', 'day')},
+        ),
+    ]
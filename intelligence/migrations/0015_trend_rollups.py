@@ -0,0 +1,46 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0014_entity_cooccurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('topic', 'الموضوع'), ('severity', 'الخطورة'), ('source', 'المصدر'), ('classification', 'التصنيف'), ('entity', 'الكيان')], max_length=20)),
+                ('key', models.CharField(max_length=64)),
+                ('mean', models.FloatField(default=0.0)),
+                ('variance', models.FloatField(default=0.0)),
+                ('observations', models.PositiveIntegerField(default=0)),
+                ('current_bucket', models.DateTimeField(blank=True, null=True)),
+                ('alerted_bucket', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('dimension', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('H', 'ساعة'), ('D', 'يوم')], max_length=1, verbose_name='الدقة الزمنية')),
+                ('dimension', models.CharField(choices=[('topic', 'الموضوع'), ('severity', 'الخطورة'), ('source', 'المصدر'), ('classification', 'التصنيف'), ('entity', 'الكيان')], max_length=20, verbose_name='البعد')),
+                ('key', models.CharField(max_length=64, verbose_name='القيمة')),
+                ('bucket_start', models.DateTimeField(verbose_name='بداية الفترة')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'عداد اتجاه',
+                'verbose_name_plural': 'عدادات الاتجاهات',
+                'indexes': [models.Index(fields=['granularity', 'dimension', 'bucket_start'], name='trend_dim_bucket_idx')],
+                'unique_together': {('granularity', 'dimension', 'key', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0015_trend_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='avg_yield',
+            field=models.FloatField(default=0.0, verbose_name='متوسط الأخبار الجديدة لكل تحديث'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0, verbose_name='إخفاقات متتالية'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='next_fetch_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='موعد التحديث القادم'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='poll_interval',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='فترة التحديث (ثانية)'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='publish_interval',
+            field=models.FloatField(blank=True, null=True, verbose_name='متوسط الفاصل بين الأخبار (ثانية)'),
+        ),
+    ]
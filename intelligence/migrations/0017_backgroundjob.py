@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0016_source_polling'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('fetch_source', 'تحديث مصدر'), ('fetch_all', 'تحديث كل المصادر'), ('reanalyze', 'إعادة التحليل'), ('translate', 'ترجمة')], max_length=20, verbose_name='نوع المهمة')),
+                ('status', models.CharField(choices=[('QUEUED', 'في الانتظار'), ('RUNNING', 'قيد التنفيذ'), ('SUCCEEDED', 'مكتمل'), ('FAILED', 'فشل')], default='QUEUED', max_length=10, verbose_name='الحالة')),
+                ('unique_key', models.CharField(blank=True, max_length=100, null=True, verbose_name='مفتاح التفرد')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='المعاملات')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='النتيجة')),
+                ('error', models.TextField(blank=True, verbose_name='الخطأ')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='المحاولات')),
+                ('max_attempts', models.PositiveIntegerField(default=3, verbose_name='الحد الأقصى للمحاولات')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='التنفيذ بعد')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='العامل')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='بواسطة')),
+            ],
+            options={
+                'verbose_name': 'مهمة خلفية',
+                'verbose_name_plural': 'المهام الخلفية',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['QUEUED', 'RUNNING'])), fields=('unique_key',), name='job_unique_active_key'),
+        ),
+    ]
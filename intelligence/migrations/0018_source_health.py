@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0017_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='avg_fetch_seconds',
+            field=models.FloatField(blank=True, null=True, verbose_name='متوسط زمن الجلب (ثانية)'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='failure_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد الإخفاقات'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='fetch_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='عدد مرات الجلب'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='آخر خطأ'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_error_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='وقت آخر خطأ'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='quarantined_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='معزول حتى'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0019_backgroundjob_process_document'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='job_type',
+            field=models.CharField(choices=[('fetch_source', 'تحديث مصدر'), ('fetch_all', 'تحديث كل المصادر'), ('reanalyze', 'إعادة التحليل'), ('translate', 'ترجمة'), ('process_document', 'معالجة مستند'), ('fetch_urls', 'جلب روابط')], max_length=20, verbose_name='نوع المهمة'),
+        ),
+    ]
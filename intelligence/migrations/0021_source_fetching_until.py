@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0020_backgroundjob_fetch_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='fetching_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='قيد الجلب حتى'),
+        ),
+    ]
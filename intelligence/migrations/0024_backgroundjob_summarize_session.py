@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence', '0023_backgroundjob_build_graph_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='job_type',
+            field=models.CharField(choices=[('fetch_source', 'تحديث مصدر'), ('fetch_all', 'تحديث كل المصادر'), ('reanalyze', 'إعادة التحليل'), ('translate', 'ترجمة'), ('process_document', 'معالجة مستند'), ('fetch_urls', 'جلب روابط'), ('refresh_status', 'تحديث مؤشرات الحالة'), ('build_graph_snapshot', 'بناء لقطة الشبكة'), ('summarize_session', 'تلخيص محادثة')], max_length=20, verbose_name='نوع المهمة'),
+        ),
+    ]
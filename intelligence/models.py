@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 
 from django.conf import settings
 
@@ -20,6 +21,23 @@ class Source(models.Model):
     is_active = models.BooleanField(_("نشط"), default=True)
     last_fetched_at = models.DateTimeField(_("آخر تحديث"), null=True, blank=True)
 
+    # Adaptive polling state (intelligence.scheduler)
+    next_fetch_at = models.DateTimeField(_("موعد التحديث القادم"), null=True, blank=True, db_index=True)
+    poll_interval = models.PositiveIntegerField(_("فترة التحديث (ثانية)"), null=True, blank=True)
+    publish_interval = models.FloatField(_("متوسط الفاصل بين الأخبار (ثانية)"), null=True, blank=True)
+    avg_yield = models.FloatField(_("متوسط الأخبار الجديدة لكل تحديث"), default=0.0)
+    consecutive_failures = models.PositiveIntegerField(_("إخفاقات متتالية"), default=0)
+
+    # Fetch health: failing feeds are quarantined and re-probed at growing intervals
+    fetch_count = models.PositiveIntegerField(_("عدد مرات الجلب"), default=0)
+    failure_count = models.PositiveIntegerField(_("عدد الإخفاقات"), default=0)
+    avg_fetch_seconds = models.FloatField(_("متوسط زمن الجلب (ثانية)"), null=True, blank=True)
+    last_error = models.TextField(_("آخر خطأ"), blank=True)
+    last_error_at = models.DateTimeField(_("وقت آخر خطأ"), null=True, blank=True)
+    quarantined_until = models.DateTimeField(_("معزول حتى"), null=True, blank=True, db_index=True)
+    # Claim held while one worker fetches the source (see scheduler.claim)
+    fetching_until = models.DateTimeField(_("قيد الجلب حتى"), null=True, blank=True)
+
     class Meta:
         verbose_name = _("مصدر")
         verbose_name_plural = _("المصادر")
@@ -27,6 +45,13 @@ class Source(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_source_type_display()})"
 
+    @property
+    def health(self):
+        """healthy, failing, quarantined, or probing (quarantine over, next fetch is a probe)."""
+        if self.quarantined_until:
+            return 'quarantined' if self.quarantined_until > timezone.now() else 'probing'
+        return 'failing' if self.consecutive_failures else 'healthy'
+
 
 class IntelligenceReport(models.Model):
     class Classification(models.TextChoices):
@@ -111,6 +136,41 @@ class Entity(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_entity_type_display()})"
 
+
+class EntityCooccurrence(models.Model):
+    """
+    Number of reports in which two entities appear together.
+    Pairs are stored once, with entity_a holding the lower id.
+    """
+    entity_a = models.ForeignKey(Entity, on_delete=models.CASCADE, related_name='+', verbose_name=_("الكيان الأول"))
+    entity_b = models.ForeignKey(Entity, on_delete=models.CASCADE, related_name='+', verbose_name=_("الكيان الثاني"))
+    count = models.PositiveIntegerField(_("عدد مرات الظهور المشترك"), default=0)
+    first_seen = models.DateTimeField(_("أول ظهور"))
+    last_seen = models.DateTimeField(_("آخر ظهور"))
+
+    class Meta:
+        verbose_name = _("ظهور مشترك للكيانات")
+        verbose_name_plural = _("الظهور المشترك للكيانات")
+        unique_together = ('entity_a', 'entity_b')
+        indexes = [
+            models.Index(fields=['entity_a', '-count'], name='cooc_entity_a_count_idx'),
+            models.Index(fields=['entity_b', '-count'], name='cooc_entity_b_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_a_id} <-> {self.entity_b_id} ({self.count})"
+
+
+class EntityCooccurrenceBucket(models.Model):
+    """Daily co-occurrence counts for a pair, used for time windows and trend detection."""
+    pair = models.ForeignKey(EntityCooccurrence, on_delete=models.CASCADE, related_name='buckets')
+    day = models.DateField(_("اليوم"))
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('pair', 'day')
+        indexes = [models.Index(fields=['day'], name='cooc_bucket_day_idx')]
+
 class CriticalAlertRule(models.Model):
     class Severity(models.TextChoices):
         HIGH = 'HIGH', _('عالي')
@@ -155,6 +215,60 @@ class IntelligenceNotification(models.Model):
     def __str__(self):
         return f"{self.level} - {self.title}"
 
+class TrendCounter(models.Model):
+    """
+    Number of ingested reports per time bucket for one value of a dimension
+    (e.g. topic=MILITARY, source=12, entity=7), at hourly or daily granularity.
+    """
+    class Granularity(models.TextChoices):
+        HOUR = 'H', _('ساعة')
+        DAY = 'D', _('يوم')
+
+    class Dimension(models.TextChoices):
+        TOPIC = 'topic', _('الموضوع')
+        SEVERITY = 'severity', _('الخطورة')
+        SOURCE = 'source', _('المصدر')
+        CLASSIFICATION = 'classification', _('التصنيف')
+        ENTITY = 'entity', _('الكيان')
+
+    granularity = models.CharField(_("الدقة الزمنية"), max_length=1, choices=Granularity.choices)
+    dimension = models.CharField(_("البعد"), max_length=20, choices=Dimension.choices)
+    key = models.CharField(_("القيمة"), max_length=64)
+    bucket_start = models.DateTimeField(_("بداية الفترة"))
+    count = models.PositiveIntegerField(_("العدد"), default=0)
+
+    class Meta:
+        verbose_name = _("عداد اتجاه")
+        verbose_name_plural = _("عدادات الاتجاهات")
+        unique_together = ('granularity', 'dimension', 'key', 'bucket_start')
+        indexes = [
+            models.Index(fields=['granularity', 'dimension', 'bucket_start'], name='trend_dim_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.key} @ {self.bucket_start} ({self.count})"
+
+
+class TrendBaseline(models.Model):
+    """
+    Streaming EWMA mean/variance of hourly counts for one dimension value,
+    used to flag spikes in the bucket currently being filled.
+    """
+    dimension = models.CharField(max_length=20, choices=TrendCounter.Dimension.choices)
+    key = models.CharField(max_length=64)
+    mean = models.FloatField(default=0.0)
+    variance = models.FloatField(default=0.0)
+    observations = models.PositiveIntegerField(default=0)
+    current_bucket = models.DateTimeField(null=True, blank=True)
+    alerted_bucket = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('dimension', 'key')
+
+    def __str__(self):
+        return f"{self.dimension}={self.key} (mean={self.mean:.2f})"
+
+
 class SovereignTerm(models.Model):
     class TermCategory(models.TextChoices):
         MILITARY = 'MILITARY', _('عسكري')
@@ -239,3 +353,60 @@ class EntityExtractionPattern(models.Model):
 
     def __str__(self):
         return f"{self.pattern} -> {self.get_entity_type_display()}"
+
+
+class BackgroundJob(models.Model):
+    """
+    A unit of background work run by `manage.py run_jobs` (see intelligence.jobs).
+    At most one queued or running job exists per unique_key.
+    """
+    class JobType(models.TextChoices):
+        FETCH_SOURCE = 'fetch_source', _('تحديث مصدر')
+        FETCH_ALL = 'fetch_all', _('تحديث كل المصادر')
+        REANALYZE = 'reanalyze', _('إعادة التحليل')
+        TRANSLATE = 'translate', _('ترجمة')
+        PROCESS_DOCUMENT = 'process_document', _('معالجة مستند')
+        FETCH_URLS = 'fetch_urls', _('جلب روابط')
+        REFRESH_STATUS = 'refresh_status', _('تحديث مؤشرات الحالة')
+        BUILD_GRAPH_SNAPSHOT = 'build_graph_snapshot', _('بناء لقطة الشبكة')
+        SUMMARIZE_SESSION = 'summarize_session', _('تلخيص محادثة')
+
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', _('في الانتظار')
+        RUNNING = 'RUNNING', _('قيد التنفيذ')
+        SUCCEEDED = 'SUCCEEDED', _('مكتمل')
+        FAILED = 'FAILED', _('فشل')
+
+    job_type = models.CharField(_("نوع المهمة"), max_length=20, choices=JobType.choices)
+    status = models.CharField(_("الحالة"), max_length=10, choices=Status.choices, default=Status.QUEUED)
+    unique_key = models.CharField(_("مفتاح التفرد"), max_length=100, null=True, blank=True)
+    params = models.JSONField(_("المعاملات"), default=dict, blank=True)
+    result = models.JSONField(_("النتيجة"), null=True, blank=True)
+    error = models.TextField(_("الخطأ"), blank=True)
+    attempts = models.PositiveIntegerField(_("المحاولات"), default=0)
+    max_attempts = models.PositiveIntegerField(_("الحد الأقصى للمحاولات"), default=3)
+    run_after = models.DateTimeField(_("التنفيذ بعد"), default=timezone.now)
+    locked_by = models.CharField(_("العامل"), max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("بواسطة"))
+    created_at = models.DateTimeField(_("تاريخ الإنشاء"), auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("مهمة خلفية")
+        verbose_name_plural = _("المهام الخلفية")
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=models.Q(status__in=['QUEUED', 'RUNNING']),
+                name='job_unique_active_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} #{self.pk} ({self.status})"
@@ -0,0 +1,81 @@
+"""
+Bulk export of filtered report sets as JSONL or CSV.
+
+Rows are read as values() through a chunked iterator (a server-side cursor on
+PostgreSQL) and entity names are fetched once per chunk, so memory use stays flat
+however many reports match. Each chunk is recorded as one audit entry listing the
+exported report ids.
+"""
+import json
+from itertools import islice
+from core.models import UserActionLog
+from core.audit import record_action
+from core.csv_export import StreamingCSVWriter
+from .models import Entity
+
+CHUNK_SIZE = 2000
+
+FIELDS = [
+    'id', 'title', 'title_ar', 'source__name', 'classification', 'severity', 'topic',
+    'credibility_score', 'sentiment_score', 'original_language', 'original_url',
+    'published_at', 'created_at', 'content',
+]
+COLUMNS = [
+    'id', 'title', 'title_ar', 'source', 'classification', 'severity', 'topic',
+    'credibility_score', 'sentiment_score', 'original_language', 'original_url',
+    'published_at', 'created_at', 'content', 'entities',
+]
+FORMATS = ('jsonl', 'csv')
+
+
+def iter_chunks(reports, chunk_size=None):
+    """Yields lists of export rows (dicts keyed by COLUMNS) from a report queryset."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    rows = reports.order_by('-published_at', '-id').values_list(*FIELDS).iterator(chunk_size=chunk_size)
+    EntityReport = Entity.reports.through
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        entity_names = {}
+        for report_id, name in EntityReport.objects.filter(
+            intelligencereport_id__in=[row[0] for row in chunk]
+        ).values_list('intelligencereport_id', 'entity__name').iterator():
+            entity_names.setdefault(report_id, []).append(name)
+
+        yield [
+            dict(zip(COLUMNS, row + (entity_names.get(row[0], []),)))
+            for row in chunk
+        ]
+
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def stream_export(reports, export_format, user=None, ip_address=None, label='', chunk_size=None):
+    """
+    Yields the export as text lines (CSV starts with a header row). When a user is
+    given, one audit record is written per chunk after it has been produced.
+    """
+    writer = StreamingCSVWriter()
+    if export_format == 'csv':
+        # BOM so spreadsheet tools open the Arabic text as UTF-8
+        yield '\ufeff' + writer.writerow(COLUMNS)
+
+    for number, chunk in enumerate(iter_chunks(reports, chunk_size), 1):
+        for row in chunk:
+            if export_format == 'csv':
+                row['entities'] = '; '.join(row['entities'])
+                yield writer.writerow([_plain(row[column]) for column in COLUMNS])
+            else:
+                yield json.dumps({key: _plain(value) for key, value in row.items()}, ensure_ascii=False) + '\n'
+
+        if user is not None:
+            record_action(
+                user=user,
+                action=UserActionLog.ActionType.EXPORT,
+                target_object=f"Bulk Export {export_format} #{number} ({len(chunk)} reports)",
+                details=f"{label} | Report IDs: {','.join(str(row['id']) for row in chunk)}",
+                ip_address=ip_address,
+            )
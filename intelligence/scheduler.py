@@ -0,0 +1,205 @@
+"""
+Adaptive per-source polling.
+
+Every fetch records what the feed looked like: its cadence (the median gap between
+the publish times of its entries, or the time per new item when entries are undated)
+and its yield (new items per fetch), both smoothed with an EWMA. The next poll is
+then scheduled
+  - after a fetch with new items: ITEMS_PER_POLL publish intervals ahead, so busy
+    feeds are polled often and each poll picks up a couple of items;
+  - after a quiet fetch: the previous interval times QUIET_BACKOFF;
+  - after a failure: DEFAULT_INTERVAL doubled per consecutive failure;
+clamped to [MIN_INTERVAL, MAX_INTERVAL] and jittered so that sources added together
+drift apart. `manage.py run_scheduler` fetches the sources that are due.
+
+Fetch health works like a per-source circuit breaker: QUARANTINE_AFTER consecutive
+failures quarantine the source, and neither the scheduler nor fetch_all touches it
+until quarantined_until. The next fetch after that is a probe. If it fails, the
+quarantine doubles, up to QUARANTINE_MAX. One success clears it.
+
+Before a source is fetched it is claimed with a conditional UPDATE on fetching_until,
+so schedulers, fetch_all and fetch_source jobs in any process never fetch the same
+source at once. record_poll() and defer() release the claim; a worker that dies keeps
+it only for CLAIM_SECONDS.
+"""
+import random
+import logging
+import calendar
+import statistics
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Q, Min
+from django.utils import timezone
+from .models import Source
+
+logger = logging.getLogger(__name__)
+
+MIN_INTERVAL = int(getattr(settings, 'SOURCE_POLL_MIN_INTERVAL', 300))
+MAX_INTERVAL = int(getattr(settings, 'SOURCE_POLL_MAX_INTERVAL', 6 * 3600))
+DEFAULT_INTERVAL = int(getattr(settings, 'SOURCE_POLL_DEFAULT_INTERVAL', 1800))
+# New items a poll should find on average; higher polls less often
+ITEMS_PER_POLL = float(getattr(settings, 'SOURCE_POLL_ITEMS_PER_POLL', 2))
+QUIET_BACKOFF = 1.5
+ALPHA = 0.3
+JITTER = 0.1
+
+QUARANTINE_AFTER = int(getattr(settings, 'SOURCE_QUARANTINE_AFTER', 3))
+QUARANTINE_BASE = int(getattr(settings, 'SOURCE_QUARANTINE_BASE', 1800))
+QUARANTINE_MAX = int(getattr(settings, 'SOURCE_QUARANTINE_MAX', 24 * 3600))
+CLAIM_SECONDS = int(getattr(settings, 'SOURCE_FETCH_CLAIM_SECONDS', 1800))
+
+# Source columns written by record_poll() and defer(); saving only these does not
+# change what the sidebar status shows
+POLL_FIELDS = frozenset({
+    'next_fetch_at', 'poll_interval', 'publish_interval', 'avg_yield', 'last_fetched_at',
+    'consecutive_failures', 'fetch_count', 'failure_count', 'avg_fetch_seconds',
+    'last_error', 'last_error_at', 'quarantined_until', 'fetching_until',
+})
+
+
+def polled_sources():
+    return Source.objects.filter(is_active=True, source_type=Source.SourceType.RSS)
+
+
+def fetchable_sources(now=None):
+    """Active RSS sources that are not in quarantine."""
+    return polled_sources().exclude(quarantined_until__gt=now or timezone.now())
+
+
+def due_sources(now=None):
+    """Active RSS sources whose next poll is due, never-polled ones first."""
+    now = now or timezone.now()
+    return polled_sources().filter(
+        Q(next_fetch_at__isnull=True) | Q(next_fetch_at__lte=now)
+    ).order_by(F('next_fetch_at').asc(nulls_first=True), 'id')
+
+
+def seconds_until_due(now=None):
+    """Seconds until the next source falls due (0 if one already is), None without sources."""
+    now = now or timezone.now()
+    sources = polled_sources()
+    if sources.filter(next_fetch_at__isnull=True).exists():
+        return 0
+    earliest = sources.aggregate(earliest=Min('next_fetch_at'))['earliest']
+    if earliest is None:
+        return None
+    return max((earliest - now).total_seconds(), 0)
+
+
+def expected_daily_fetches():
+    """Polls per day at the sources' current intervals."""
+    return sum(86400 / (interval or DEFAULT_INTERVAL) for interval in polled_sources().values_list('poll_interval', flat=True))
+
+
+def feed_cadence(entries):
+    """Median gap in seconds between the publish times of feed entries, None if undated."""
+    times = sorted(
+        calendar.timegm(entry.published_parsed)
+        for entry in entries if getattr(entry, 'published_parsed', None)
+    )
+    if len(times) < 2:
+        return None
+    return float(statistics.median(later - earlier for earlier, later in zip(times, times[1:])))
+
+
+def _ewma(previous, value):
+    return value if previous is None else ALPHA * value + (1 - ALPHA) * previous
+
+
+def _clamp(seconds):
+    return int(min(max(seconds, MIN_INTERVAL), MAX_INTERVAL))
+
+
+def next_interval(source, new_items, failed=False):
+    previous = source.poll_interval or DEFAULT_INTERVAL
+    if failed:
+        return _clamp(DEFAULT_INTERVAL * 2 ** (source.consecutive_failures - 1))
+    if new_items and source.publish_interval:
+        return _clamp(source.publish_interval * ITEMS_PER_POLL)
+    if new_items:
+        return _clamp(previous / 2)
+    return _clamp(previous * QUIET_BACKOFF)
+
+
+def _schedule(source, interval, now):
+    source.poll_interval = interval
+    source.next_fetch_at = now + timedelta(seconds=interval * random.uniform(1 - JITTER, 1 + JITTER))
+
+
+def claim(source, due_only=False, now=None):
+    """
+    Claims the source for one fetch; False when another worker holds the claim or, with
+    due_only, when the source is no longer due because it was polled in the meantime.
+    """
+    now = now or timezone.now()
+    sources = Source.objects.filter(pk=source.pk).filter(Q(fetching_until__isnull=True) | Q(fetching_until__lte=now))
+    if due_only:
+        sources = sources.filter(Q(next_fetch_at__isnull=True) | Q(next_fetch_at__lte=now))
+    fetching_until = now + timedelta(seconds=CLAIM_SECONDS)
+    if sources.update(fetching_until=fetching_until) != 1:
+        return False
+    source.fetching_until = fetching_until
+    return True
+
+
+def release(source):
+    source.fetching_until = None
+    Source.objects.filter(pk=source.pk).update(fetching_until=None)
+
+
+def quarantine_seconds(consecutive_failures):
+    return min(QUARANTINE_BASE * 2 ** (consecutive_failures - QUARANTINE_AFTER), QUARANTINE_MAX)
+
+
+def record_poll(source, entries=(), new_items=0, error=None, now=None, duration=None):
+    """
+    Updates the source's cadence, yield and health statistics and schedules its next
+    poll; `duration` is the fetch time in seconds.
+    """
+    now = now or timezone.now()
+    fields = ['next_fetch_at', 'poll_interval', 'consecutive_failures', 'fetch_count', 'quarantined_until', 'fetching_until']
+    source.fetching_until = None
+    source.fetch_count += 1
+    if duration is not None:
+        source.avg_fetch_seconds = _ewma(source.avg_fetch_seconds, duration)
+        fields.append('avg_fetch_seconds')
+    if error is not None:
+        source.consecutive_failures += 1
+        source.failure_count += 1
+        source.last_error = str(error)[:1000]
+        source.last_error_at = now
+        fields += ['failure_count', 'last_error', 'last_error_at']
+        _schedule(source, next_interval(source, 0, failed=True), now)
+        if source.consecutive_failures >= QUARANTINE_AFTER:
+            source.quarantined_until = now + timedelta(seconds=quarantine_seconds(source.consecutive_failures))
+            source.next_fetch_at = source.quarantined_until
+            logger.warning(
+                f"Source {source.name} quarantined until {source.quarantined_until:%Y-%m-%d %H:%M} "
+                f"after {source.consecutive_failures} failures: {source.last_error}"
+            )
+    else:
+        source.quarantined_until = None
+        cadence = feed_cadence(entries)
+        if cadence is None and new_items and source.last_fetched_at:
+            cadence = (now - source.last_fetched_at).total_seconds() / new_items
+        if cadence is not None:
+            source.publish_interval = _ewma(source.publish_interval, cadence)
+        source.avg_yield = _ewma(source.avg_yield if source.last_fetched_at else None, new_items)
+        source.consecutive_failures = 0
+        source.last_fetched_at = now
+        _schedule(source, next_interval(source, new_items), now)
+        fields += ['publish_interval', 'avg_yield', 'last_fetched_at']
+    source.save(update_fields=fields)
+    return source.poll_interval
+
+
+def defer(source, now=None):
+    """Pushes a source that cannot be polled (filtered or invalid URL) to the longest interval."""
+    _schedule(source, MAX_INTERVAL, now or timezone.now())
+    source.fetching_until = None
+    source.save(update_fields=['next_fetch_at', 'poll_interval', 'fetching_until'])
+
+
+def health_report():
+    """Polled sources that are failing or quarantined, worst first."""
+    return polled_sources().filter(consecutive_failures__gt=0).order_by('-consecutive_failures', 'name')
@@ -1,20 +1,26 @@
 from django.db.models import Q
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib import messages
-from .models import IntelligenceReport, Source, Entity, SearchConstraint
+from .models import IntelligenceReport, Source, Entity, SearchConstraint, BackgroundJob
 from django.utils import timezone
 from datetime import timedelta
 from core.models import UserActionLog
-from .url_fetcher import URLFetcher
-
-from django.http import JsonResponse
+from core.audit import record_action
+from . import jobs
+from .url_fetcher import normalize_urls
+from core.cache import search_cache
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.contrib.auth.decorators import login_required
+from . import report_export
 import json
+from urllib.parse import urlencode
 
+@login_required
 def fetch_urls_view(request):
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json'
     if request.method == 'POST':
-        # Check if it's a JSON request (AJAX)
-        is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json'
-        
         urls_text = ""
         fetch_query = ""
         
@@ -36,41 +42,37 @@ def fetch_urls_view(request):
             else:
                 urls_list = [url.strip() for url in urls_text.splitlines() if url.strip()]
             
+            urls_list = normalize_urls(urls_list)
             if urls_list:
-                fetcher = URLFetcher()
-                # Pass the optional query to the fetcher
-                results = fetcher.fetch_and_process_urls(urls_list, query=fetch_query)
-                
-                msg = f"تمت العملية: {results['success']} نجاح, {results['failed']} فشل."
+                # Fetched by the job worker; the caller polls the job's progress URL
+                job, _ = jobs.enqueue(
+                    BackgroundJob.JobType.FETCH_URLS, {'urls': urls_list, 'query': fetch_query},
+                    user=request.user, max_attempts=1,
+                )
+
+                # Log action
+                record_action(
+                    user=request.user,
+                    action=UserActionLog.ActionType.OTHER,
+                    target_object=f"Manual URL Fetch ({len(urls_list)} URLs)",
+                    details=f"Query: {fetch_query} | Job: {job.pk}",
+                    ip_address=request.META.get('REMOTE_ADDR')
+                )
+
+                msg = f"بدأت معالجة {len(urls_list)} رابط في الخلفية."
                 if fetch_query:
                     msg += f" (تركيز البحث: {fetch_query})"
-                
-                if results['errors']:
-                    # Show first few errors if any
-                    msg += f" أخطاء: {'; '.join(results['errors'][:2])}..."
-                
-                # Log action
-                if request.user.is_authenticated:
-                    UserActionLog.objects.create(
-                        user=request.user,
-                        action=UserActionLog.ActionType.OTHER,
-                        target_object=f"Manual URL Fetch ({len(urls_list)} URLs)",
-                        details=f"Query: {fetch_query} | Success: {results['success']}",
-                        ip_address=request.META.get('REMOTE_ADDR')
-                    )
 
                 if is_ajax:
                     return JsonResponse({
-                        'status': 'success', 
+                        'status': 'accepted',
                         'message': msg,
-                        'results': results
-                    })
-                
-                if results['success'] > 0:
-                    messages.success(request, msg)
-                else:
-                    messages.error(request, msg)
-                
+                        'job_id': job.pk,
+                        'progress_url': reverse('fetch_job_status', args=[job.pk]),
+                    }, status=202)
+
+                messages.info(request, msg)
+
             else:
                 if is_ajax:
                     return JsonResponse({'status': 'warning', 'message': "لم يتم إدخال روابط صالحة."}, status=400)
@@ -84,29 +86,42 @@ def fetch_urls_view(request):
         return JsonResponse({'status': 'error', 'message': 'Invalid Method'}, status=405)
     return redirect('search')
 
-from django.core.paginator import Paginator
 
-def search_view(request):
-    query = request.GET.get('q', '')
-    classification = request.GET.get('classification', '')
-    source_id = request.GET.get('source', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-
-    # Audit Log for Search
-    if request.user.is_authenticated and query:
-        UserActionLog.objects.create(
-            user=request.user,
-            action=UserActionLog.ActionType.SEARCH,
-            target_object=f"Query: {query}",
-            details=f"Filters - Class: {classification}, Source: {source_id}, Date: {date_from}-{date_to}",
-            ip_address=request.META.get('REMOTE_ADDR')
-        )
+@login_required
+def fetch_job_status_view(request, job_id):
+    """Progress of a background URL fetch job, polled by the search page."""
+    job = BackgroundJob.objects.filter(pk=job_id, job_type=BackgroundJob.JobType.FETCH_URLS).first()
+    if job is None or (job.created_by_id != request.user.pk and not request.user.is_staff):
+        return JsonResponse({'status': 'error', 'message': 'Job not found'}, status=404)
+    payload = jobs.job_payload(job)
+    # Counters of the last progress update (zeros until the worker picks the job up)
+    payload.update(job.result or {
+        'total': len(job.params.get('urls', [])), 'processed': 0, 'success': 0, 'failed': 0,
+        'errors': [], 'report_ids': [],
+    })
+    if job.error:
+        payload['errors'] = payload['errors'] + [job.error]
+    return JsonResponse(payload)
 
-    # Optimization: Select Related & Prefetch Related to avoid N+1 queries
-    reports = IntelligenceReport.objects.select_related('source').prefetch_related('entities').all().order_by('-published_at')
+from django.core.paginator import Paginator
 
-    constraints = list(SearchConstraint.objects.filter(is_active=True).values_list('term', flat=True))
+def filter_reports(params):
+    """
+    Reports matching the search filters (q, classification, source, date_from, date_to)
+    and the active search constraints. Shared by the search page and the bulk export.
+    """
+    query = params.get('q', '')
+    classification = params.get('classification', '')
+    source_id = params.get('source', '')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+
+    reports = IntelligenceReport.objects.all()
+
+    constraints = search_cache.get_or_set(
+        'active_constraints',
+        lambda: list(SearchConstraint.objects.filter(is_active=True).values_list('term', flat=True)),
+    )
     if constraints:
         constraints_q = Q()
         for term in constraints:
@@ -132,6 +147,28 @@ def search_view(request):
     if date_to:
         reports = reports.filter(published_at__lte=date_to)
 
+    return reports
+
+def search_view(request):
+    query = request.GET.get('q', '')
+    classification = request.GET.get('classification', '')
+    source_id = request.GET.get('source', '')
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+
+    # Audit Log for Search (once per search, not for every results page)
+    if request.user.is_authenticated and query and request.GET.get('page', '1') in ('', '1'):
+        record_action(
+            user=request.user,
+            action=UserActionLog.ActionType.SEARCH,
+            target_object=f"Query: {query}",
+            details=f"Filters - Class: {classification}, Source: {source_id}, Date: {date_from}-{date_to}",
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+
+    # Optimization: Select Related & Prefetch Related to avoid N+1 queries
+    reports = filter_reports(request.GET).select_related('source').prefetch_related('entities').order_by('-published_at')
+
     # Pagination
     paginator = Paginator(reports, 20) # Show 20 reports per page
     page_number = request.GET.get('page')
@@ -142,5 +179,29 @@ def search_view(request):
         'query': query,
         'sources': Source.objects.filter(is_active=True),
         'classifications': IntelligenceReport.Classification.choices,
+        'export_query': urlencode({key: request.GET[key] for key in ('q', 'classification', 'source', 'date_from', 'date_to') if request.GET.get(key)}),
     }
     return render(request, 'intelligence/search.html', context)
+
+@login_required
+def search_export_view(request):
+    """
+    Streams every report matching the search filters as JSONL or CSV (`format`).
+    Audit records are written per chunk of exported reports.
+    """
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in report_export.FORMATS:
+        return JsonResponse({'status': 'error', 'message': 'Unsupported format'}, status=400)
+
+    filters = {key: request.GET.get(key) for key in ('q', 'classification', 'source', 'date_from', 'date_to') if request.GET.get(key)}
+    lines = report_export.stream_export(
+        filter_reports(request.GET),
+        export_format,
+        user=request.user,
+        ip_address=request.META.get('REMOTE_ADDR'),
+        label=f"Filters: {json.dumps(filters, ensure_ascii=False)}",
+    )
+    content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="reports_{timezone.now():%Y%m%d_%H%M}.{export_format}"'
+    return response
@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.db.models import Q
-from .models import IntelligenceReport, CriticalAlertRule, IntelligenceNotification
+from .models import (
+    IntelligenceReport, CriticalAlertRule, IntelligenceNotification, Entity, Source,
+    ClassificationRule, EntityExtractionPattern, SearchConstraint, SovereignTerm,
+)
+from core.cache import rules_cache, search_cache, translation_cache
+from . import graph_service, scheduler
 
 @receiver(post_save, sender=IntelligenceReport)
 def auto_translate_report(sender, instance, created, **kwargs):
@@ -110,3 +115,56 @@ def check_critical_alerts(sender, instance, created, **kwargs):
             report=instance,
             alert_rule=rule
         )
+
+
+@receiver(m2m_changed, sender=Entity.reports.through)
+@receiver(m2m_changed, sender=IntelligenceReport.related_reports.through)
+def invalidate_graph_adjacency(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Drops cached graph adjacency for both ends of changed report/entity links.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    own_key = graph_service.entity_key(instance.pk) if isinstance(instance, Entity) else graph_service.report_key(instance.pk)
+    keys = [own_key]
+    if action == 'pre_clear':
+        # Neighbours are unknown after the clear, so read them from the adjacency first
+        keys.extend(graph_service.get_adjacency([own_key])[own_key])
+    else:
+        to_key = graph_service.entity_key if model is Entity else graph_service.report_key
+        keys.extend(to_key(pk) for pk in pk_set or ())
+    graph_service.invalidate_nodes(keys)
+
+
+@receiver(post_save, sender=Source)
+@receiver(post_delete, sender=Source)
+def refresh_status_on_source_change(sender, instance, **kwargs):
+    """
+    Keeps the cached sidebar indicators in step when sources are added, toggled or removed.
+    """
+    if kwargs.get('update_fields') and set(kwargs['update_fields']) <= scheduler.POLL_FIELDS:
+        # Poll bookkeeping; ingestion refreshes the status once per batch
+        return
+    from .context_processors import refresh_global_status
+    refresh_global_status()
+
+
+@receiver(post_save, sender=ClassificationRule)
+@receiver(post_delete, sender=ClassificationRule)
+@receiver(post_save, sender=EntityExtractionPattern)
+@receiver(post_delete, sender=EntityExtractionPattern)
+def invalidate_rules_cache(sender, **kwargs):
+    rules_cache.invalidate()
+
+
+@receiver(post_save, sender=SearchConstraint)
+@receiver(post_delete, sender=SearchConstraint)
+def invalidate_search_cache(sender, **kwargs):
+    search_cache.invalidate()
+
+
+@receiver(post_save, sender=SovereignTerm)
+@receiver(post_delete, sender=SovereignTerm)
+def invalidate_translation_cache(sender, **kwargs):
+    translation_cache.invalidate()
@@ -1,20 +1,24 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.contrib import messages
-from .models import Source
+from django.http import JsonResponse
+from django.utils import timezone
+from .models import Source, BackgroundJob
 from core.models import UserActionLog
+from core.audit import record_action
 
-from .ingestion import IngestionEngine
-import threading
+from . import jobs
 
-def fetch_source_in_background(source_id):
-    try:
-        source = Source.objects.get(pk=source_id)
-        engine = IngestionEngine()
-        if source.source_type == Source.SourceType.RSS:
-            engine.process_rss_source(source)
-    except Exception as e:
-        print(f"Background fetch failed for source {source_id}: {e}")
+RECENT_JOBS = 15
+
+
+def _enqueue(request, job_type, unique_key, params=None, label=''):
+    job, created = jobs.enqueue(job_type, params=params, user=request.user, unique_key=unique_key)
+    if created:
+        messages.success(request, f"تمت جدولة المهمة: {label or job.get_job_type_display()} (#{job.pk})")
+    else:
+        messages.info(request, f"المهمة قيد التنفيذ بالفعل: {label or job.get_job_type_display()} (#{job.pk})")
+    return job
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -43,7 +47,7 @@ def source_manager_view(request):
                 messages.success(request, f"تم إضافة المصدر: {name}")
                 
                 # Log action
-                UserActionLog.objects.create(
+                record_action(
                     user=request.user,
                     action=UserActionLog.ActionType.OTHER,
                     target_object=f"Source: {name}",
@@ -51,8 +55,10 @@ def source_manager_view(request):
                     ip_address=request.META.get('REMOTE_ADDR')
                 )
 
-                # Trigger immediate fetch in background thread
-                threading.Thread(target=fetch_source_in_background, args=(source.id,)).start()
+                # First fetch runs on the job worker
+                if source.source_type == Source.SourceType.RSS:
+                    _enqueue(request, BackgroundJob.JobType.FETCH_SOURCE, f"fetch_source:{source.pk}",
+                             {'source_id': source.pk}, label=f"تحديث {name}")
 
             else:
                 messages.error(request, "الاسم والرابط حقول مطلوبة.")
@@ -72,9 +78,21 @@ def source_manager_view(request):
             status = "نشط" if source.is_active else "غير نشط"
             messages.success(request, f"تم تغيير حالة {source.name} إلى {status}")
 
+        elif action == 'fetch':
+            source = get_object_or_404(Source, pk=request.POST.get('source_id'))
+            _enqueue(request, BackgroundJob.JobType.FETCH_SOURCE, f"fetch_source:{source.pk}",
+                     {'source_id': source.pk}, label=f"تحديث {source.name}")
+
+        elif action == 'reanalyze':
+            source = get_object_or_404(Source, pk=request.POST.get('source_id'))
+            _enqueue(request, BackgroundJob.JobType.REANALYZE, f"reanalyze:{source.pk}",
+                     {'source_id': source.pk}, label=f"إعادة تحليل {source.name}")
+
+        elif action == 'translate_pending':
+            _enqueue(request, BackgroundJob.JobType.TRANSLATE, "translate:pending", {'limit': 200})
+
         elif action == 'refresh_all':
-            threading.Thread(target=IngestionEngine().fetch_all).start()
-            messages.success(request, "تم بدء عملية تحديث المصادر في الخلفية.")
+            _enqueue(request, BackgroundJob.JobType.FETCH_ALL, "fetch_all")
 
         return redirect('source_manager')
 
@@ -84,9 +102,34 @@ def source_manager_view(request):
     # Get unique categories for filter or display
     categories = Source.objects.values_list('category', flat=True).distinct()
     
+    now = timezone.now()
     context = {
         'sources': sources,
+        'failing_count': Source.objects.filter(consecutive_failures__gt=0).exclude(quarantined_until__gt=now).count(),
+        'quarantined_count': Source.objects.filter(quarantined_until__gt=now).count(),
         'categories': categories,
-        'source_types': Source.SourceType.choices
+        'source_types': Source.SourceType.choices,
+        'recent_jobs': BackgroundJob.objects.all()[:RECENT_JOBS],
     }
     return render(request, 'intelligence/source_manager.html', context)
+
+
+@login_required
+def job_status_api(request, job_id):
+    """Status of a background job, for its creator or staff."""
+    job = get_object_or_404(BackgroundJob, pk=job_id)
+    if not request.user.is_staff and job.created_by_id != request.user.pk:
+        return JsonResponse({'status': 'error', 'message': 'Not allowed'}, status=403)
+    return JsonResponse(jobs.job_payload(job))
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def job_list_api(request):
+    """Recent background jobs, optionally filtered by ?status= and ?type=."""
+    queryset = BackgroundJob.objects.all()
+    if request.GET.get('status'):
+        queryset = queryset.filter(status=request.GET['status'].upper())
+    if request.GET.get('type'):
+        queryset = queryset.filter(job_type=request.GET['type'])
+    return JsonResponse({'jobs': [jobs.job_payload(job) for job in queryset[:100]]})
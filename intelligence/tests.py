@@ -1,8 +1,23 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from django.test import TestCase, RequestFactory, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from core.cache import dashboard_cache
 from .models import Source, IntelligenceReport
 from .ingestion import IngestionEngine
+from .context_processors import compute_global_status, global_status_context, STATUS_CACHE_KEY, STATUS_LOCK_KEY
 from unittest.mock import MagicMock, patch
 
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
 class IngestionTest(TestCase):
     def setUp(self):
         self.source = Source.objects.create(
@@ -25,9 +40,11 @@ class IngestionTest(TestCase):
         mock_feed.entries = [mock_entry]
         mock_parse.return_value = mock_feed
 
-        # Run Ingestion
+        # Run Ingestion; the poll bookkeeping saves do not each recompute the status
         engine = IngestionEngine()
-        engine.process_rss_source(self.source)
+        with patch('intelligence.context_processors.compute_global_status', wraps=compute_global_status) as compute:
+            engine.fetch_all()
+        self.assertEqual(compute.call_count, 1)
 
         # Verify
         self.assertEqual(IntelligenceReport.objects.count(), 1)
@@ -35,3 +52,496 @@ class IngestionTest(TestCase):
         self.assertEqual(report.title, "Test News Title")
         self.assertEqual(report.credibility_score, 80) # Should inherit source score
         print("\n[TEST] Ingestion Engine Logic Verified.")
+
+        # Each ingestion batch refreshes the cached sidebar indicators
+        self.assertEqual(dashboard_cache.get(STATUS_CACHE_KEY)['status']['recent_reports_count'], 1)
+
+
+class GlobalStatusCacheTest(TestCase):
+    def setUp(self):
+        from . import context_processors
+        cache.clear()
+        context_processors._last_status = None
+        self.request = RequestFactory().get('/')
+
+    def test_warm_cache_issues_no_queries(self):
+        Source.objects.create(name='Active Source', is_active=True)
+        status = global_status_context(self.request)
+        self.assertTrue(status['ingestion_online'])
+        with self.assertNumQueries(0):
+            self.assertEqual(global_status_context(self.request), status)
+
+    def test_cold_cache_while_refreshing_serves_defaults(self):
+        dashboard_cache.add(STATUS_LOCK_KEY, True, 30)
+        with self.assertNumQueries(0):
+            status = global_status_context(self.request)
+        self.assertFalse(status['ingestion_online'])
+
+    def test_stale_status_is_refreshed_by_a_job(self):
+        from .models import BackgroundJob
+        stale = {'recent_reports_count': 5, 'ingestion_online': False, 'analysis_online': False}
+        Source.objects.create(name='Active Source', is_active=True)
+        dashboard_cache.set(STATUS_CACHE_KEY, {'status': stale, 'refresh_after': 0}, 60)
+        self.assertEqual(global_status_context(self.request), stale)
+
+        job = BackgroundJob.objects.get()
+        self.assertEqual((job.job_type, job.status), (BackgroundJob.JobType.REFRESH_STATUS, BackgroundJob.Status.SUCCEEDED))
+        self.assertTrue(dashboard_cache.get(STATUS_CACHE_KEY)['status']['ingestion_online'])
+        self.assertIsNone(dashboard_cache.get(STATUS_LOCK_KEY))
+
+    def test_unreachable_cache_serves_the_last_status(self):
+        Source.objects.create(name='Active Source', is_active=True)
+        status = global_status_context(self.request)
+        with patch.object(dashboard_cache, 'get', side_effect=ConnectionError('cache down')), self.assertNumQueries(0):
+            self.assertEqual(global_status_context(self.request), status)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkExportTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from .models import Entity
+        self.user = get_user_model().objects.create_user(username='exporter', password='password')
+        self.client.login(username='exporter', password='password')
+        source = Source.objects.create(name='Export Source', url='http://export.test/rss', source_type=Source.SourceType.RSS)
+        IntelligenceReport.objects.bulk_create([
+            IntelligenceReport(
+                title=f"Harbor report {i}" if i % 2 else f"Desert report {i}",
+                content="Line one\nLine two, with comma",
+                source=source,
+                classification='S' if i % 3 == 0 else 'U',
+            )
+            for i in range(25)
+        ])
+        entity = Entity.objects.create(name='Harbor Authority', entity_type='ORG')
+        entity.reports.add(*IntelligenceReport.objects.filter(title__startswith='Harbor'))
+
+    def test_jsonl_export_uses_search_filters_and_audits_per_chunk(self):
+        import json
+        from unittest import mock
+        from core.models import UserActionLog
+        from . import report_export
+        with mock.patch.object(report_export, 'CHUNK_SIZE', 5):
+            response = self.client.get(reverse('search_export') + '?q=harbor&format=jsonl')
+            rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(len(rows), 12)
+        self.assertTrue(all(row['entities'] == ['Harbor Authority'] for row in rows))
+        audits = UserActionLog.objects.filter(user=self.user, action=UserActionLog.ActionType.EXPORT)
+        self.assertEqual(audits.count(), 3)
+        exported = {int(i) for log in audits for i in log.details.split('Report IDs: ')[1].split(',')}
+        self.assertEqual(exported, {row['id'] for row in rows})
+
+    def test_csv_export_and_command(self):
+        import csv, io, os, tempfile
+        from django.core.management import call_command
+        response = self.client.get(reverse('search_export') + '?classification=S&format=csv')
+        text = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows[0]['content'], "Line one\nLine two, with comma")
+
+        path = os.path.join(tempfile.mkdtemp(), 'out.jsonl')
+        call_command('export_reports', user='exporter', q='desert', output=path, stderr=io.StringIO())
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 13)
+
+        IntelligenceReport.objects.filter(pk=rows[0]['id']).update(title='=cmd|"/c calc"!A1', content='-2+3')
+        response = self.client.get(reverse('search_export') + '?classification=S&format=csv')
+        row = next(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual((row['title'], row['content']), ('\'=cmd|"/c calc"!A1', "'-2+3"))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ConcurrentURLFetchTest(TestCase):
+    def setUp(self):
+        import threading
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+
+    def fake_download(self, url, timeout):
+        import time
+        from urllib.parse import urlsplit
+        host = urlsplit(url).netloc
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        time.sleep(1.0 if 'slow' in url else 0.05)
+        with self.lock:
+            self.active[host] -= 1
+        return f"<html><title>Page {url}</title><body><p>Harbor news from {host}</p></body></html>"
+
+    def test_per_host_limit_and_deadline(self):
+        from .url_fetcher import URLFetcher
+        urls = [f"http://a.test/{i}" for i in range(6)] + [f"http://b.test/{i}" for i in range(3)] + ["http://c.test/slow"]
+        with patch.object(URLFetcher, '_download', side_effect=self.fake_download):
+            fetcher = URLFetcher(max_workers=8, per_host=2, deadline=0.5)
+            results = fetcher.fetch_and_process_urls(urls)
+
+        self.assertEqual(results['success'], 9)
+        self.assertEqual(results['failed'], 1)
+        self.assertIn("Timed out (deadline): http://c.test/slow", results['errors'])
+        self.assertLessEqual(max(self.peak.values()), 2)
+        self.assertEqual(IntelligenceReport.objects.filter(original_url__startswith='http://a.test/').count(), 6)
+
+    def test_fetch_view_returns_job_and_progress(self):
+        from django.contrib.auth import get_user_model
+        from .url_fetcher import URLFetcher
+        get_user_model().objects.create_user(username='fetcher', password='password')
+        self.client.login(username='fetcher', password='password')
+        with patch.object(URLFetcher, '_download', side_effect=self.fake_download):
+            response = self.client.post(
+                reverse('fetch_urls'), data='{"urls": ["http://a.test/1", "http://a.test/1", "http://b.test/2"]}',
+                content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            )
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(response.json()['progress_url']).json()
+        self.assertEqual((job['type'], job['status']), ('fetch_urls', 'SUCCEEDED'))
+        self.assertEqual((job['total'], job['processed'], job['success']), (2, 2, 2))
+        self.assertEqual(len(job['report_ids']), 2)
+
+        get_user_model().objects.create_user(username='other', password='password')
+        self.client.login(username='other', password='password')
+        self.assertEqual(self.client.get(response.json()['progress_url']).status_code, 404)
+
+
+class PageExtractionTest(TestCase):
+    def fake_response(self, body, content_type):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.headers = {'Content-Type': content_type} if content_type else {}
+        response.iter_content.side_effect = lambda chunk_size: (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+        return response
+
+    def test_download_gates_content_type_caps_size_and_decodes_meta_charset(self):
+        from .url_fetcher import URLFetcher
+        fetcher = URLFetcher()
+        fetcher.max_bytes = 100 * 1024
+        page = '<html><head><meta charset="windows-1256"><title>خبر</title></head><body><p>نص</p></body></html>'
+        body = page.encode('cp1256') + b' ' * (300 * 1024)
+
+        with patch.object(fetcher.session, 'get', return_value=self.fake_response(body, 'text/html')):
+            text = fetcher._download('http://a.test/', timeout=5)
+        self.assertEqual(len(text), 100 * 1024)
+        self.assertIn('<title>خبر</title>', text)
+
+        with patch.object(fetcher.session, 'get', return_value=self.fake_response(b'%PDF-1.7', 'application/pdf')):
+            with self.assertRaisesMessage(ValueError, 'Unsupported content type'):
+                fetcher._download('http://a.test/doc.pdf', timeout=5)
+
+    def test_fixture_pages_main_content(self):
+        import codecs
+        import json
+        from pathlib import Path
+        from .utils import html_extract
+        pages = Path(__file__).parent / 'fixtures' / 'pages'
+        manifest = json.loads((pages / 'manifest.json').read_text(encoding='utf-8'))
+        backends = [b for b in ('lxml', 'html.parser') if b != 'lxml' or html_extract.HAS_LXML]
+        for name, meta in manifest.items():
+            raw = (pages / name).read_bytes()
+            self.assertEqual(html_extract.detect_charset(raw, meta['content_type']), codecs.lookup(meta['charset']).name)
+            for backend in backends:
+                with self.subTest(page=name, backend=backend):
+                    title, content = html_extract.extract(html_extract.decode_body(raw, meta['content_type']), '', backend)
+                    self.assertIn(meta['title'], title)
+                    self.assertIn(meta['expect'], content)
+                    for boilerplate in meta['reject']:
+                        self.assertNotIn(boilerplate, content)
+
+
+class CleanHtmlTest(TestCase):
+    def test_matches_beautifulsoup_on_fixture_feeds_and_edge_cases(self):
+        import feedparser
+        from pathlib import Path
+        from .utils import html_extract
+        from .management.commands.benchmark_clean_html import _legacy
+        feeds = Path(__file__).parent / 'fixtures' / 'feeds'
+        samples = [
+            entry.summary for path in sorted(feeds.glob('*.xml'))
+            for entry in feedparser.parse(str(path)).entries
+        ]
+        self.assertGreater(len(samples), 100)
+        samples += [
+            '<p>a<script>var x=1</script>b</p>', 'x < y and y > z', '&amp;nbsp; x', '&lt;b&gt;bold&lt;/b&gt;',
+            '<![CDATA[hi]]> there', '<b>unterminated <i', 'A&B co', '<a href="x>y" title=\'q\'>link</a> t',
+            '<!-- note --> visible', 'it’s ﬁne ①', 'â€œquoteâ€\x9d', '&#8211; &#x2014; &hellip; &copy 2026',
+        ]
+        for raw in samples:
+            with self.subTest(raw=raw[:60]):
+                self.assertEqual(html_extract.clean_html(raw), _legacy(raw))
+
+    def test_markup_free_summary_skips_tokenizer(self):
+        from .utils import html_extract
+        with patch.object(html_extract, '_MARKUP') as markup:
+            self.assertEqual(html_extract.clean_html("  Plain\n summary\ttext "), "Plain summary text")
+        markup.sub.assert_not_called()
+
+
+class PollingSchedulerTest(TestCase):
+    def setUp(self):
+        self.busy = Source.objects.create(name='Wire', url='http://wire.test/rss', source_type=Source.SourceType.RSS)
+        self.quiet = Source.objects.create(name='Weekly', url='http://weekly.test/rss', source_type=Source.SourceType.RSS)
+
+    def entries(self, count, gap_minutes):
+        import time
+        start = time.time() - count * gap_minutes * 60
+        return [
+            MagicMock(published_parsed=time.gmtime(start + i * gap_minutes * 60))
+            for i in range(count)
+        ]
+
+    def test_interval_follows_cadence_and_backs_off(self):
+        from . import scheduler
+        # Busy feed: an item every 2 minutes is polled at the minimum interval
+        self.assertEqual(scheduler.record_poll(self.busy, self.entries(20, 2), new_items=20), scheduler.MIN_INTERVAL)
+        self.assertIsNotNone(Source.objects.get(pk=self.busy.pk).next_fetch_at)
+
+        # Daily feed with nothing new backs off towards the maximum
+        interval = scheduler.record_poll(self.quiet, self.entries(10, 24 * 60), new_items=0)
+        self.assertEqual(interval, int(scheduler.DEFAULT_INTERVAL * scheduler.QUIET_BACKOFF))
+        for _ in range(10):
+            interval = scheduler.record_poll(self.quiet, self.entries(10, 24 * 60), new_items=0)
+        self.assertEqual(interval, scheduler.MAX_INTERVAL)
+
+        # Failures double the interval from the default
+        first = scheduler.record_poll(self.busy, error='timeout')
+        second = scheduler.record_poll(self.busy, error='timeout')
+        self.assertEqual((first, second), (scheduler.DEFAULT_INTERVAL, scheduler.DEFAULT_INTERVAL * 2))
+        self.assertEqual(Source.objects.get(pk=self.busy.pk).consecutive_failures, 2)
+
+    @patch('feedparser.parse')
+    def test_fetch_due_skips_sources_not_due(self, mock_parse):
+        from datetime import timedelta
+        from django.utils import timezone
+        mock_parse.return_value = MagicMock(entries=[], bozo=0)
+        Source.objects.filter(pk=self.quiet.pk).update(next_fetch_at=timezone.now() + timedelta(hours=1))
+
+        results = IngestionEngine().fetch_due()
+        self.assertEqual(results['success'], 1)
+        self.assertEqual([c.args[0] for c in mock_parse.call_args_list], ['http://wire.test/rss'])
+        self.assertGreater(Source.objects.get(pk=self.busy.pk).next_fetch_at, timezone.now())
+        self.assertEqual(IngestionEngine().fetch_due()['success'], 0)
+
+    @patch('feedparser.parse')
+    def test_sources_are_claimed_before_fetching(self, mock_parse):
+        from . import scheduler
+        mock_parse.return_value = MagicMock(entries=[], bozo=0)
+        # A scheduler in another process read both sources as due, then the wire was polled
+        stale = list(scheduler.due_sources())
+        IngestionEngine().process_rss_source(self.busy)
+        self.assertIsNone(Source.objects.get(pk=self.busy.pk).fetching_until)
+
+        # The stale copy of the wire is no longer due; a source being fetched is skipped
+        self.assertTrue(scheduler.claim(self.quiet))
+        mock_parse.reset_mock()
+        IngestionEngine()._fetch_sources(stale, due_only=True)
+        mock_parse.assert_not_called()
+
+        # An explicit fetch does not wait for the schedule, only for the claim
+        self.assertFalse(scheduler.claim(self.quiet))
+        scheduler.release(self.quiet)
+        self.assertTrue(scheduler.claim(self.busy))
+
+
+    def test_internal_errors_do_not_count_against_source_health(self):
+        with patch.object(IngestionEngine, '_ingest_feed', side_effect=RuntimeError("bug")), \
+                self.assertLogs('intelligence.ingestion', level='ERROR'):
+            results = IngestionEngine().fetch_all()
+        self.assertEqual(results['failed'], 2)
+        busy = Source.objects.get(pk=self.busy.pk)
+        self.assertEqual((busy.consecutive_failures, busy.fetch_count), (0, 0))
+        self.assertIsNone(busy.fetching_until)
+        self.assertIsNone(busy.quarantined_until)
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BackgroundJobTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.staff = get_user_model().objects.create_user(username='ops', password='password', is_staff=True)
+        self.client.login(username='ops', password='password')
+        self.source = Source.objects.create(name='Wire', url='http://wire.test/rss', source_type=Source.SourceType.RSS)
+
+    def test_unique_key_deduplicates_and_concurrency_is_capped(self):
+        from . import jobs
+        from .models import BackgroundJob
+        with self.settings(JOBS_ASYNC=True):
+            first, created = jobs.enqueue(BackgroundJob.JobType.FETCH_ALL, unique_key='fetch_all')
+            again, created_again = jobs.enqueue(BackgroundJob.JobType.FETCH_ALL, unique_key='fetch_all')
+            jobs.enqueue(BackgroundJob.JobType.FETCH_ALL)
+        self.assertTrue(created)
+        self.assertEqual((again.pk, created_again), (first.pk, False))
+
+        claimed = jobs.claim_next('w1')
+        self.assertEqual(claimed.pk, first.pk)
+        # Only one fetch_all may run at a time
+        self.assertIsNone(jobs.claim_next('w2'))
+        # Even a worker that saw the cap open cannot claim past it
+        third = BackgroundJob.objects.filter(status=BackgroundJob.Status.QUEUED).get()
+        self.assertFalse(jobs._claim(third, 'w2'))
+        self.assertEqual(BackgroundJob.objects.filter(status=BackgroundJob.Status.RUNNING).count(), 1)
+
+    def test_failures_are_retried_then_failed(self):
+        from . import jobs
+        from .models import BackgroundJob
+        with patch.object(IngestionEngine, 'process_rss_source', side_effect=RuntimeError('feed down')):
+            job, _ = jobs.enqueue(BackgroundJob.JobType.FETCH_SOURCE, {'source_id': self.source.pk}, max_attempts=2)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (BackgroundJob.Status.QUEUED, 1))
+            self.assertGreater(job.run_after, job.started_at)
+
+            BackgroundJob.objects.filter(pk=job.pk).update(run_after=job.started_at)
+            jobs.run_job(jobs.claim_next('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (BackgroundJob.Status.FAILED, 2, 'feed down'))
+
+    @patch('feedparser.parse')
+    def test_source_manager_enqueues_and_status_api(self, mock_parse):
+        from .models import BackgroundJob
+        mock_parse.return_value = MagicMock(entries=[], bozo=0)
+        self.client.post(reverse('source_manager'), {'action': 'fetch', 'source_id': self.source.pk})
+        job = BackgroundJob.objects.get()
+        self.assertEqual((job.job_type, job.status), (BackgroundJob.JobType.FETCH_SOURCE, BackgroundJob.Status.SUCCEEDED))
+        self.assertEqual([c.args[0] for c in mock_parse.call_args_list], ['http://wire.test/rss'])
+
+        payload = self.client.get(reverse('job_status', args=[job.pk])).json()
+        self.assertEqual((payload['status'], payload['result']), ('SUCCEEDED', {'new_reports': 0}))
+        self.assertEqual(len(self.client.get(reverse('job_list') + '?status=succeeded').json()['jobs']), 1)
+
+
+class SourceQuarantineTest(TestCase):
+    def setUp(self):
+        self.dead = Source.objects.create(name='Dead', url='http://dead.test/rss', source_type=Source.SourceType.RSS)
+        self.live = Source.objects.create(name='Live', url='http://live.test/rss', source_type=Source.SourceType.RSS)
+
+    def parse(self, url, **kwargs):
+        if 'dead' in url:
+            return MagicMock(entries=[], bozo=1, bozo_exception=TimeoutError('timed out'))
+        return MagicMock(entries=[], bozo=0)
+
+    @patch('feedparser.parse')
+    def test_failing_source_is_quarantined_and_reprobed(self, mock_parse):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import scheduler
+        mock_parse.side_effect = self.parse
+        engine = IngestionEngine()
+        for _ in range(scheduler.QUARANTINE_AFTER):
+            engine.fetch_all()
+        dead = Source.objects.get(pk=self.dead.pk)
+        self.assertEqual(dead.health, 'quarantined')
+        self.assertEqual((dead.consecutive_failures, dead.last_error), (scheduler.QUARANTINE_AFTER, 'timed out'))
+        self.assertIsNotNone(dead.avg_fetch_seconds)
+
+        # Quarantined sources cost nothing on the next runs
+        mock_parse.reset_mock()
+        results = engine.fetch_all()
+        self.assertEqual((results['success'], results['skipped_quarantined']), (1, 1))
+        self.assertEqual([c.args[0] for c in mock_parse.call_args_list], ['http://live.test/rss'])
+
+        # A failed probe doubles the quarantine; a successful one clears it
+        Source.objects.filter(pk=self.dead.pk).update(quarantined_until=timezone.now() - timedelta(seconds=1))
+        engine.fetch_all()
+        dead.refresh_from_db()
+        remaining = (dead.quarantined_until - timezone.now()).total_seconds()
+        self.assertAlmostEqual(remaining, scheduler.QUARANTINE_BASE * 2, delta=5)
+
+        mock_parse.side_effect = lambda url, **kwargs: MagicMock(entries=[], bozo=0)
+        engine.fetch_all(include_quarantined=True)
+        dead.refresh_from_db()
+        self.assertEqual((dead.health, dead.consecutive_failures, dead.failure_count), ('healthy', 0, 4))
+
+
+class IngestionMetricsTest(TestCase):
+    def setUp(self):
+        from core import metrics
+        cache.clear()
+        metrics.registry.reset()
+        self.source = Source.objects.create(name='Wire', url='http://wire.test/rss', source_type=Source.SourceType.RSS)
+
+    def entry(self, n):
+        entry = MagicMock(title=f'Report {n}', link=f'http://wire.test/{n}', summary='<p>Body</p>')
+        entry.published_parsed = None
+        return entry
+
+    @patch('feedparser.parse')
+    def test_stages_are_timed_and_exposed(self, mock_parse):
+        IntelligenceReport.objects.create(title='Old', content='', source=self.source, original_url='http://wire.test/0')
+        mock_parse.return_value = MagicMock(entries=[self.entry(n) for n in range(3)], bozo=0)
+        with self.assertLogs('iims.metrics', 'INFO') as logs:
+            IngestionEngine().fetch_all()
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['event'], line['outcome'], line['source']), ('ingest_source', 'ok', 'Wire'))
+        self.assertEqual(line['counts'], {'entries': 3, 'duplicates': 1, 'reports': 2})
+        self.assertTrue({'fetch', 'parse', 'dedup', 'clean', 'translate', 'insert', 'analyze', 'alert'} <= set(line['stages']))
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        # Parsing is timed once per entry, duplicates included
+        self.assertIn('iims_ingest_stage_seconds_count{stage="parse"} 3', body)
+        self.assertIn('iims_ingest_stage_seconds_count{stage="dedup"} 3', body)
+        self.assertIn('iims_ingest_stage_seconds_count{stage="insert"} 2', body)
+        self.assertIn('iims_ingest_reports_total{source="Wire"} 2', body)
+        self.assertIn('iims_ingest_runs_total{outcome="ok",source="Wire"} 1', body)
+
+    def test_each_process_publishes_to_its_own_slot(self):
+        from core.metrics import ProcessSnapshots
+        processes = [ProcessSnapshots('test', lambda n=n: {'n': n}) for n in range(3)]
+        for pid, process in enumerate(processes, start=100):
+            with patch('os.getpid', return_value=pid):
+                process.publish()
+        self.assertEqual([process._slot for process in processes], [1, 2, 3])
+
+        # The slot of a process that went silent is reused; the others keep theirs
+        cache.delete('test:slot:2')
+        late = ProcessSnapshots('test', lambda: {'n': 9})
+        with patch('os.getpid', return_value=200):
+            late.publish()
+        with patch('os.getpid', return_value=100):
+            snapshots = processes[0].collect()
+        self.assertEqual(late._slot, 2)
+        self.assertEqual(sorted(snapshot['n'] for snapshot in snapshots), [0, 2, 9])
+        for process in processes + [late]:
+            process.enabled = False  # keep the atexit publish away from the test database
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+class IngestionBenchmarkTest(TestCase):
+    def test_replays_fixtures_and_rolls_back(self):
+        import io
+        import tempfile
+        from pathlib import Path
+        from django.core.management import CommandError, call_command
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'run.json'
+            # The test database is already a throwaway one
+            call_command(
+                'benchmark_ingestion', rounds=2, llm_latency=0, llm_error_rate=0.5, live_db=True,
+                json_path=str(path), stdout=io.StringIO(),
+            )
+            results = json.loads(path.read_text(encoding='utf-8'))
+            # A second run compares against the first
+            out = io.StringIO()
+            call_command(
+                'benchmark_ingestion', rounds=1, no_llm=True, live_db=True,
+                json_path=str(path), compare=str(path), stdout=out,
+            )
+            with self.assertRaises(CommandError):
+                call_command('benchmark_ingestion', keep=True, json_path=str(path), stdout=io.StringIO())
+
+        totals = results['totals']
+        self.assertEqual(totals['new_reports'], totals['entries'])
+        self.assertEqual(totals['new_reports'] % 2, 0)
+        self.assertGreater(results['db']['writes_per_report'], 1)
+        self.assertIn('intelligence_intelligencereport', results['db']['writes_by_table'])
+        self.assertGreater(results['llm']['errors'], 0)
+        self.assertTrue({'fetch', 'parse', 'dedup', 'translate', 'insert', 'analyze', 'alert'} <= set(results['stages']))
+        self.assertIn('% vs', out.getvalue())
+        self.assertFalse(Source.objects.exists())
+        self.assertFalse(IntelligenceReport.objects.exists())
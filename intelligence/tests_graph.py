@@ -0,0 +1,223 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from .models import IntelligenceReport, Source, Entity
+from . import graph_service, graph_snapshot
+
+User = get_user_model()
+
+
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GraphServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='analyst', password='password')
+        self.client.force_login(self.user)
+        source = Source.objects.create(name='Source 1')
+        now = timezone.now()
+        self.r1 = IntelligenceReport.objects.create(title="Report one", content="a", source=source, published_at=now)
+        self.r2 = IntelligenceReport.objects.create(title="Report two", content="b", source=source, published_at=now)
+        self.old = IntelligenceReport.objects.create(
+            title="Old report", content="c", source=source, published_at=now - timedelta(days=30)
+        )
+        self.person = Entity.objects.create(name="Person", entity_type=Entity.EntityType.PERSON)
+        self.place = Entity.objects.create(name="Place", entity_type=Entity.EntityType.LOCATION)
+        self.person.reports.add(self.r1, self.old)
+        self.place.reports.add(self.r1)
+        self.r1.related_reports.add(self.r2)
+
+    def _ids(self, data):
+        return {node['id'] for node in data['nodes']}
+
+    def test_neighbourhood_depth(self):
+        data = graph_service.neighbourhood(f"rep_{self.r1.id}", depth=1)
+        self.assertEqual(
+            self._ids(data),
+            {f"rep_{self.r1.id}", f"rep_{self.r2.id}", f"ent_{self.person.id}", f"ent_{self.place.id}"},
+        )
+        self.assertEqual(len(data['edges']), 3)
+
+        data = graph_service.neighbourhood(f"rep_{self.r1.id}", depth=2)
+        self.assertIn(f"rep_{self.old.id}", self._ids(data))
+
+    def test_neighbourhood_filters(self):
+        data = graph_service.neighbourhood(
+            f"rep_{self.r1.id}", depth=2, since=timezone.now() - timedelta(days=1), types=['report', 'PER']
+        )
+        ids = self._ids(data)
+        self.assertNotIn(f"rep_{self.old.id}", ids)
+        self.assertNotIn(f"ent_{self.place.id}", ids)
+        self.assertIn(f"ent_{self.person.id}", ids)
+
+    def test_adjacency_cache_invalidated_on_link_change(self):
+        graph_service.get_adjacency([f"ent_{self.place.id}"])
+        self.place.reports.add(self.r2)
+        adjacency = graph_service.get_adjacency([f"ent_{self.place.id}"])
+        self.assertIn(f"rep_{self.r2.id}", adjacency[f"ent_{self.place.id}"])
+        self.assertIn(f"ent_{self.place.id}", graph_service.get_adjacency([f"rep_{self.r2.id}"])[f"rep_{self.r2.id}"])
+
+    def test_delta_since_cursor(self):
+        initial = self.client.get(reverse('graph_data')).json()
+        report_mark, _, _ = graph_service.parse_cursor(initial['cursor'])
+        self.assertEqual(report_mark, self.old.id)
+        self.assertEqual(len([e for e in initial['edges'] if e.get('dashes')]), 1)
+
+        empty = self.client.get(reverse('graph_delta'), {'cursor': initial['cursor']}).json()
+        self.assertEqual((empty['nodes'], empty['cursor']), ([], initial['cursor']))
+
+        new = IntelligenceReport.objects.create(title="New report", content="d", source=self.r1.source)
+        self.person.reports.add(new)
+        delta = self.client.get(reverse('graph_delta'), {'cursor': initial['cursor']}).json()
+        self.assertEqual(self._ids(delta), {f"rep_{new.id}", f"ent_{self.person.id}"})
+        self.assertEqual(graph_service.parse_cursor(delta['cursor'])[0], new.id)
+
+    def test_delta_includes_links_added_to_sent_reports(self):
+        cursor = self.client.get(reverse('graph_data')).json()['cursor']
+        self.place.reports.add(self.r2)
+        self.r2.related_reports.add(self.old)
+
+        delta = self.client.get(reverse('graph_delta'), {'cursor': cursor}).json()
+        self.assertEqual(
+            {(edge['from'], edge['to']) for edge in delta['edges']},
+            {(f"rep_{self.r2.id}", f"ent_{self.place.id}"), tuple(sorted((f"rep_{self.r2.id}", f"rep_{self.old.id}")))},
+        )
+        self.assertIn(f"ent_{self.place.id}", self._ids(delta))
+        self.assertEqual(self.client.get(reverse('graph_delta'), {'cursor': delta['cursor']}).json()['edges'], [])
+        self.assertEqual(self.client.get(reverse('graph_delta'), {'cursor': '12'}).status_code, 400)
+
+    def test_neighbourhood_api_validation(self):
+        url = reverse('graph_neighbourhood')
+        self.assertEqual(self.client.get(url, {'node': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'node': 'rep_99999'}).status_code, 404)
+        response = self.client.get(url, {'node': f"ent_{self.person.id}", 'since': '2000-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"rep_{self.old.id}", self._ids(response.json()))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CooccurrenceTest(TestCase):
+    def setUp(self):
+        from .models import EntityExtractionPattern
+        self.user = User.objects.create_user(username='analyst', password='password')
+        self.client.force_login(self.user)
+        self.source = Source.objects.create(name='Source 1')
+        for pattern, entity_type in (("Zephyria", 'LOC'), ("Qorvath Group", 'ORG'), ("Ylmora", 'LOC')):
+            EntityExtractionPattern.objects.get_or_create(pattern=pattern, defaults={'entity_type': entity_type})
+
+    def _analyze(self, title, published_at=None):
+        from .analysis import ContentAnalyzer
+        report = IntelligenceReport.objects.create(
+            title=title, content="", source=self.source, published_at=published_at or timezone.now()
+        )
+        ContentAnalyzer().analyze_report(report)
+        return report
+
+    def test_counts_updated_during_analysis(self):
+        from .models import EntityCooccurrence
+        report = self._analyze("Zephyria hosts Qorvath Group")
+        self._analyze("Zephyria and Qorvath Group again")
+        pair = EntityCooccurrence.objects.get()
+        self.assertEqual(pair.count, 2)
+        self.assertEqual(pair.buckets.get().count, 2)
+
+        # Re-analysis must not count the same report twice
+        from .analysis import ContentAnalyzer
+        ContentAnalyzer().analyze_report(report)
+        self.assertEqual(EntityCooccurrence.objects.get().count, 2)
+
+    def test_top_k_and_rising_pairs_api(self):
+        old = timezone.now() - timedelta(days=10)
+        self._analyze("Zephyria and Ylmora", published_at=old)
+        for _ in range(3):
+            self._analyze("Zephyria hosts Qorvath Group")
+        riyadh = Entity.objects.get(name="Zephyria")
+
+        data = self.client.get(reverse('entity_cooccurrence', args=[riyadh.id]), {'k': 1}).json()
+        self.assertEqual([r['entity']['name'] for r in data['results']], ["Qorvath Group"])
+        self.assertEqual(data['results'][0]['count'], 3)
+
+        data = self.client.get(reverse('entity_cooccurrence', args=[riyadh.id]), {'days': 7}).json()
+        self.assertEqual(len(data['results']), 1)
+
+        data = self.client.get(reverse('rising_pairs'), {'days': 7}).json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['results'][0]['recent'], 3)
+
+
+class GraphSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmpdir = tempfile.mkdtemp()
+        self.override = override_settings(GRAPH_SNAPSHOT_DIR=self.tmpdir)
+        self.override.enable()
+        source = Source.objects.create(name='Source 1')
+        self.reports = [
+            IntelligenceReport.objects.create(title=f"Report {i}", content="", source=source) for i in range(4)
+        ]
+        self.hub = Entity.objects.create(name="Hub", entity_type=Entity.EntityType.ORGANIZATION)
+        self.leaf = Entity.objects.create(name="Leaf", entity_type=Entity.EntityType.PERSON)
+        self.hub.reports.add(*self.reports[:3])
+        self.leaf.reports.add(self.reports[0])
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_build_and_analytics(self):
+        from .graph_analytics import degree, pagerank, connected_components, component_sizes, central_entities
+        snapshot = graph_snapshot.build_snapshot()
+        self.assertEqual(snapshot.num_nodes, 6)
+        self.assertEqual(snapshot.num_edges, 4)
+
+        hub_index = snapshot.num_reports + list(snapshot.entity_ids).index(self.hub.id)
+        self.assertEqual(int(degree(snapshot)[hub_index]), 3)
+        self.assertAlmostEqual(float(pagerank(snapshot).sum()), 1.0, places=5)
+        # Reports 0-2 with both entities, plus the isolated report 3
+        self.assertEqual(component_sizes(connected_components(snapshot)), [5, 1])
+        self.assertEqual([e['name'] for e in central_entities(k=2)], ["Hub", "Leaf"])
+
+    def test_incremental_refresh(self):
+        graph_snapshot.build_snapshot()
+        new_entity = Entity.objects.create(name="New", entity_type=Entity.EntityType.LOCATION)
+        new_entity.reports.add(self.reports[3])
+        self.reports[3].related_reports.add(self.reports[0])
+
+        snapshot = graph_snapshot.build_snapshot()
+        self.assertTrue(snapshot.meta['incremental'])
+        self.assertEqual(snapshot.generation, 2)
+        self.assertEqual(snapshot.num_edges, 6)
+
+        # Removing a link forces a full rebuild
+        self.hub.reports.remove(self.reports[2])
+        snapshot = graph_snapshot.build_snapshot()
+        self.assertFalse(snapshot.meta['incremental'])
+        self.assertEqual(snapshot.num_edges, 5)
+
+        # A removal hidden behind an equal number of additions is still noticed
+        self.hub.reports.remove(self.reports[1])
+        self.leaf.reports.add(self.reports[3])
+        snapshot = graph_snapshot.build_snapshot()
+        self.assertFalse(snapshot.meta['incremental'])
+        self.assertEqual(snapshot.num_edges, 5)
+
+    def test_scheduler_queues_snapshot_builds(self):
+        import io
+        from django.core.management import call_command
+        from .models import BackgroundJob
+        call_command('run_scheduler', once=True, stdout=io.StringIO())
+        job = BackgroundJob.objects.get(job_type=BackgroundJob.JobType.BUILD_GRAPH_SNAPSHOT)
+        self.assertEqual(job.status, BackgroundJob.Status.SUCCEEDED)
+        self.assertEqual(graph_snapshot.load_snapshot().num_edges, 4)
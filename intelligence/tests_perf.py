@@ -0,0 +1,181 @@
+"""
+Query-count and wall-time budgets for the hot views.
+
+The dataset is large enough that anything issuing a query per row shows up as
+hundreds of queries, so the budgets below stay flat no matter how much data is
+seeded. Time budgets are generous (slow CI machines) and scale with
+PERF_TIME_FACTOR; the query budgets are the real regression guard.
+"""
+import os
+import time
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import feedparser
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.profiling import fingerprint
+
+from .context_processors import refresh_global_status
+from .ingestion import IngestionEngine
+from .models import Entity, EntityExtractionPattern, IntelligenceNotification, IntelligenceReport, Source
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'feeds'
+TIME_FACTOR = float(os.getenv('PERF_TIME_FACTOR', '1'))
+
+# feedparser.parse is patched in the ingestion test
+_parse = feedparser.parse
+
+REPORTS = 3000
+ENTITIES = 300
+NOTIFICATIONS = 1000
+FAVORITES = 200
+
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PerfTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.user = get_user_model().objects.create_user(username='perf', password='Aa159632@', job_number='PF-001')
+        sources = Source.objects.bulk_create(
+            Source(name=f'Source {n}', url=f'http://source{n}.test/rss', source_type=Source.SourceType.RSS)
+            for n in range(5)
+        )
+        topics = IntelligenceReport.Topic.values
+        severities = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+        IntelligenceReport.objects.bulk_create(
+            IntelligenceReport(
+                title=f'Report {n} on border movements',
+                content=f'Forces observed near checkpoint {n}. ' * 5,
+                title_ar=f'تقرير {n}',
+                source=sources[n % len(sources)],
+                original_url=f'http://source.test/report/{n}',
+                published_at=now - timedelta(minutes=n),
+                topic=topics[n % len(topics)],
+                severity=severities[n % len(severities)],
+                processing_status='COMPLETED',
+            )
+            for n in range(REPORTS)
+        )
+        reports = list(IntelligenceReport.objects.order_by('id'))
+        cls.report = reports[-1]
+
+        entities = Entity.objects.bulk_create(
+            Entity(name=f'Entity {n}', entity_type=Entity.EntityType.values[n % 4]) for n in range(ENTITIES)
+        )
+        Entity.reports.through.objects.bulk_create(
+            Entity.reports.through(entity_id=entities[(n + k * 7) % ENTITIES].id, intelligencereport_id=report.id)
+            for n, report in enumerate(reports) for k in range(3)
+        )
+        cls.report.related_reports.set(reports[:10])
+        cls.report.favorites.set(get_user_model().objects.bulk_create(
+            get_user_model()(username=f'reader{n}', job_number=f'RD-{n:03}') for n in range(50)
+        ))
+        cls.user.favorite_reports.set(reports[:FAVORITES])
+
+        IntelligenceNotification.objects.bulk_create(
+            IntelligenceNotification(
+                user=cls.user,
+                title=f'Alert {n}',
+                message='Critical keyword match',
+                level='CRITICAL' if n % 5 == 0 else 'INFO',
+                is_read=n % 2 == 1,
+                report=reports[n % REPORTS],
+            )
+            for n in range(NOTIFICATIONS)
+        )
+
+    def setUp(self):
+        cache.clear()
+        # Steady state: the sidebar indicators are served from the cache
+        refresh_global_status()
+        self.client.force_login(self.user)
+
+    @contextmanager
+    def budget(self, queries, seconds):
+        """Fails if the block runs more than `queries` queries or takes longer than `seconds`."""
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+        elapsed = time.perf_counter() - started
+        repeated = Counter(fingerprint(query['sql']) for query in captured.captured_queries).most_common(5)
+        self.assertLessEqual(
+            len(captured), queries,
+            f"{len(captured)} queries (budget {queries}), most repeated:\n"
+            + '\n'.join(f"{count}x {sql[:300]}" for sql, count in repeated),
+        )
+        self.assertLessEqual(elapsed, seconds * TIME_FACTOR, f"took {elapsed:.2f}s (budget {seconds}s)")
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+class HotViewBudgetTest(PerfTestCase):
+    def test_dashboard(self):
+        with self.budget(queries=10, seconds=1.5):
+            self.get('dashboard')
+
+    def test_search(self):
+        with self.budget(queries=9, seconds=1.5):
+            response = self.get('search', q='border', page=2)
+        self.assertEqual(len(response.context['reports']), 20)
+
+    def test_graph_data(self):
+        with self.budget(queries=9, seconds=2):
+            data = self.get('graph_data', limit=150).json()
+        self.assertTrue(data['nodes'])
+
+    def test_check_notifications(self):
+        with self.budget(queries=4, seconds=0.5):
+            data = self.get('check_notifications').json()
+        self.assertEqual(data['count'], 100)
+
+    def test_favorites_list(self):
+        with self.budget(queries=4, seconds=1.5):
+            response = self.get('favorites_list')
+        self.assertEqual(len(response.context['favorite_reports']), FAVORITES)
+
+    def test_report_detail(self):
+        with self.budget(queries=10, seconds=0.5):
+            self.get('report_detail', self.report.pk)
+
+
+class IngestionBudgetTest(PerfTestCase):
+    # Insert, analysis, entity links, co-occurrences and trend rollups of one new report
+    QUERIES_PER_REPORT = 30
+
+    @patch('feedparser.parse')
+    def test_fixture_feed_ingestion(self, mock_parse):
+        for pattern, entity_type in (('central bank', 'ORG'), ('ministry', 'ORG'), ('coastal facility', 'LOC')):
+            EntityExtractionPattern.objects.create(pattern=pattern, entity_type=entity_type)
+        mock_parse.return_value = parsed = _parse(str(FIXTURES / 'world_news.xml'))
+        source = Source.objects.create(name='World', url='http://world.test/rss', source_type=Source.SourceType.RSS)
+        entries = len(parsed.entries)
+
+        with self.budget(queries=self.QUERIES_PER_REPORT * entries + 30, seconds=10):
+            self.assertEqual(IngestionEngine().process_rss_source(source), entries)
+
+        # A second poll of the same feed only runs the duplicate checks
+        with self.budget(queries=entries + 10, seconds=2):
+            self.assertEqual(IngestionEngine().process_rss_source(source), 0)
@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from .models import IntelligenceReport, Source, TrendCounter, TrendBaseline, IntelligenceNotification
+from .trends import record_report, bucket_start
+
+User = get_user_model()
+
+
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TrendRollupTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='password', job_number='A1')
+        self.source = Source.objects.create(name='Source 1')
+        self.start = bucket_start(timezone.now(), TrendCounter.Granularity.HOUR) - timedelta(hours=40)
+
+    def _report(self, at, **fields):
+        report = IntelligenceReport.objects.create(
+            title="Report", content="", source=self.source, published_at=at, **fields
+        )
+        record_report(report, entity_ids=[])
+        return report
+
+    def test_hourly_and_daily_counters(self):
+        self._report(self.start, topic='MILITARY')
+        self._report(self.start + timedelta(minutes=10), topic='MILITARY')
+        self._report(self.start + timedelta(hours=1), topic='SECURITY')
+
+        hourly = TrendCounter.objects.get(
+            granularity='H', dimension='topic', key='MILITARY', bucket_start=self.start
+        )
+        self.assertEqual(hourly.count, 2)
+        daily_total = sum(TrendCounter.objects.filter(granularity='D', dimension='source').values_list('count', flat=True))
+        self.assertEqual(daily_total, 3)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('trend_series'), {'dimension': 'topic', 'granularity': 'H', 'window': 72})
+        series = {s['key']: s for s in response.json()['series']}
+        self.assertEqual(series['MILITARY']['points'][0]['count'], 2)
+        self.assertEqual(self.client.get(reverse('trend_series'), {'dimension': 'bogus'}).status_code, 400)
+
+    def test_spike_raises_notification_once(self):
+        # A steady baseline of one report per hour...
+        for hour in range(30):
+            self._report(self.start + timedelta(hours=hour))
+        self.assertEqual(IntelligenceNotification.objects.count(), 0)
+        baseline = TrendBaseline.objects.get(dimension='source', key=str(self.source.id))
+        self.assertGreaterEqual(baseline.observations, 24)
+
+        # ...then a burst within a single hour
+        burst_hour = self.start + timedelta(hours=31)
+        for minute in range(8):
+            self._report(burst_hour + timedelta(minutes=minute))
+
+        alerts = IntelligenceNotification.objects.filter(user=self.admin, level='WARNING')
+        self.assertTrue(alerts.exists())
+        # One alert per dimension value and bucket, not one per report
+        self.assertEqual(alerts.count(), len(set(alerts.values_list('title', flat=True))))
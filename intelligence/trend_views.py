@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.utils import timezone
+from . import trends
+from .models import TrendCounter, TrendBaseline
+
+
+@login_required
+def trend_series_api(request):
+    """
+    Rollup series for a dimension (topic, severity, source, classification, entity).
+    Reads only the pre-aggregated counters, never the reports table.
+    """
+    dimension = request.GET.get('dimension', TrendCounter.Dimension.TOPIC)
+    granularity = request.GET.get('granularity', TrendCounter.Granularity.DAY)
+    if dimension not in TrendCounter.Dimension.values or granularity not in TrendCounter.Granularity.values:
+        return JsonResponse({'error': 'Invalid dimension or granularity'}, status=400)
+
+    try:
+        window = int(request.GET.get('window', 0))
+        top = int(request.GET.get('top', 10))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid window or top'}, status=400)
+    if window > 0:
+        unit = timedelta(hours=1) if granularity == TrendCounter.Granularity.HOUR else timedelta(days=1)
+        since = timezone.now() - unit * min(window, 24 * 90)
+    else:
+        since = trends.default_window(granularity)
+
+    keys = [k for k in request.GET.get('keys', '').split(',') if k] or None
+    data = trends.series(dimension, granularity=granularity, since=since, keys=keys, top=None if keys else max(min(top, 50), 1))
+    return JsonResponse({
+        'dimension': dimension,
+        'granularity': granularity,
+        'since': since,
+        'series': [
+            {
+                'key': key,
+                'label': str(trends.describe_key(dimension, key)),
+                'points': [{'t': bucket, 'count': count} for bucket, count in points],
+            }
+            for key, points in data.items()
+        ],
+    })
+
+
+@login_required
+def trend_baselines_api(request):
+    """Current hourly baselines, highest mean first, to inspect what the spike detector expects."""
+    dimension = request.GET.get('dimension')
+    baselines = TrendBaseline.objects.all()
+    if dimension:
+        baselines = baselines.filter(dimension=dimension)
+    return JsonResponse({'baselines': [
+        {
+            'dimension': b.dimension,
+            'key': b.key,
+            'mean': round(b.mean, 3),
+            'std': round(b.variance ** 0.5, 3),
+            'observations': b.observations,
+            'alerted_bucket': b.alerted_bucket,
+        }
+        for b in baselines.order_by('-mean')[:100]
+    ]})
@@ -0,0 +1,205 @@
+import math
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from .models import TrendCounter, TrendBaseline, IntelligenceNotification
+
+logger = logging.getLogger(__name__)
+
+Granularity = TrendCounter.Granularity
+Dimension = TrendCounter.Dimension
+
+# EWMA smoothing factor for the hourly baseline (~ last 24 hours dominate)
+ALPHA = float(getattr(settings, 'TREND_EWMA_ALPHA', 0.08))
+Z_THRESHOLD = float(getattr(settings, 'TREND_Z_THRESHOLD', 4.0))
+MIN_SPIKE_COUNT = int(getattr(settings, 'TREND_MIN_SPIKE_COUNT', 5))
+# Hours of history needed before a baseline may raise alerts
+WARMUP_HOURS = int(getattr(settings, 'TREND_WARMUP_HOURS', 24))
+# Empty hours folded into the baseline after a quiet gap, beyond this the mean is ~0 anyway
+MAX_GAP_HOURS = 24 * 7
+
+
+def bucket_start(moment, granularity):
+    moment = timezone.localtime(moment) if timezone.is_aware(moment) else moment
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == Granularity.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def report_keys(report, entity_ids=None):
+    """(dimension, key) pairs a report contributes to."""
+    keys = [
+        (Dimension.TOPIC, report.topic),
+        (Dimension.SEVERITY, report.severity),
+        (Dimension.SOURCE, str(report.source_id)),
+        (Dimension.CLASSIFICATION, report.classification),
+    ]
+    if entity_ids is None:
+        entity_ids = report.entities.values_list('id', flat=True)
+    keys.extend((Dimension.ENTITY, str(entity_id)) for entity_id in entity_ids)
+    return keys
+
+
+def _increment(granularity, bucket, keys):
+    """Upserts the counters for one bucket and returns their new counts keyed by (dimension, key)."""
+    TrendCounter.objects.bulk_create(
+        [TrendCounter(granularity=granularity, dimension=d, key=k, bucket_start=bucket) for d, k in keys],
+        ignore_conflicts=True,
+    )
+    match = Q()
+    for dimension in {d for d, _ in keys}:
+        match |= Q(dimension=dimension, key__in=[k for d, k in keys if d == dimension])
+    counters = TrendCounter.objects.filter(match, granularity=granularity, bucket_start=bucket)
+    counters.update(count=F('count') + 1)
+    return {(d, k): count for d, k, count in counters.values_list('dimension', 'key', 'count')}
+
+
+def record_report(report, entity_ids=None, detect=True):
+    """
+    Adds an ingested report to the hourly and daily rollups and, when `detect` is set,
+    checks the hourly counts against their baselines. Returns the list of spikes found.
+    """
+    moment = report.published_at or report.created_at or timezone.now()
+    keys = report_keys(report, entity_ids)
+    hour = bucket_start(moment, Granularity.HOUR)
+
+    with transaction.atomic():
+        hourly = _increment(Granularity.HOUR, hour, keys)
+        _increment(Granularity.DAY, bucket_start(moment, Granularity.DAY), keys)
+        spikes = _update_baselines(hour, hourly)
+
+    if detect and spikes:
+        _notify(spikes, report)
+    return spikes
+
+
+def _fold(baseline, value):
+    diff = value - baseline.mean
+    increment = ALPHA * diff
+    baseline.mean += increment
+    baseline.variance = (1 - ALPHA) * (baseline.variance + diff * increment)
+    baseline.observations += 1
+
+
+def _update_baselines(hour, hourly_counts):
+    """
+    Advances the EWMA baselines and returns the (dimension, key, count, mean, z) spikes
+    for the bucket being filled. Completed buckets (and the empty hours after them) are
+    folded in when a report for a later hour arrives.
+    """
+    match = Q()
+    for dimension, key in hourly_counts:
+        match |= Q(dimension=dimension, key=key)
+    baselines = {(b.dimension, b.key): b for b in TrendBaseline.objects.filter(match)}
+
+    missing = [TrendBaseline(dimension=d, key=k, current_bucket=hour) for d, k in hourly_counts if (d, k) not in baselines]
+    TrendBaseline.objects.bulk_create(missing, ignore_conflicts=True)
+
+    closed = [b for b in baselines.values() if b.current_bucket and b.current_bucket < hour]
+    final_counts = {}
+    if closed:
+        match = Q()
+        for b in closed:
+            match |= Q(dimension=b.dimension, key=b.key, bucket_start=b.current_bucket)
+        final_counts = {
+            (d, k, bucket): count for d, k, bucket, count in TrendCounter.objects.filter(
+                match, granularity=Granularity.HOUR
+            ).values_list('dimension', 'key', 'bucket_start', 'count')
+        }
+
+    spikes = []
+    changed = []
+    for (dimension, key), baseline in baselines.items():
+        if baseline.current_bucket is None or baseline.current_bucket < hour:
+            if baseline.current_bucket is not None:
+                _fold(baseline, final_counts.get((dimension, key, baseline.current_bucket), 0))
+                gap = int((hour - baseline.current_bucket).total_seconds() // 3600) - 1
+                for _ in range(min(max(gap, 0), MAX_GAP_HOURS)):
+                    _fold(baseline, 0)
+            baseline.current_bucket = hour
+            changed.append(baseline)
+        elif baseline.current_bucket > hour:
+            # Late report for an hour already folded into the baseline
+            continue
+
+        count = hourly_counts[(dimension, key)]
+        if baseline.observations < WARMUP_HOURS or count < MIN_SPIKE_COUNT or baseline.alerted_bucket == hour:
+            continue
+        std = max(math.sqrt(baseline.variance), 1.0)
+        z = (count - baseline.mean) / std
+        if z >= Z_THRESHOLD:
+            baseline.alerted_bucket = hour
+            if baseline not in changed:
+                changed.append(baseline)
+            spikes.append((dimension, key, count, baseline.mean, z))
+
+    if changed:
+        TrendBaseline.objects.bulk_update(changed, ['mean', 'variance', 'observations', 'current_bucket', 'alerted_bucket'])
+    return spikes
+
+
+def describe_key(dimension, key):
+    """Human readable label for a dimension value."""
+    from .models import Source, Entity, IntelligenceReport
+    if dimension == Dimension.SOURCE:
+        return Source.objects.filter(id=key).values_list('name', flat=True).first() or key
+    if dimension == Dimension.ENTITY:
+        return Entity.objects.filter(id=key).values_list('name', flat=True).first() or key
+    if dimension == Dimension.TOPIC:
+        return IntelligenceReport.Topic(key).label if key in IntelligenceReport.Topic.values else key
+    if dimension == Dimension.CLASSIFICATION:
+        return IntelligenceReport.Classification(key).label if key in IntelligenceReport.Classification.values else key
+    return key
+
+
+def _notify(spikes, report):
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    recipients = list(User.objects.filter(
+        Q(is_superuser=True) | Q(role__in=[User.Role.ADMIN, User.Role.MANAGER]), is_active=True
+    ))
+    notifications = []
+    for dimension, key, count, mean, z in spikes:
+        label = f"{Dimension(dimension).label}: {describe_key(dimension, key)}"
+        logger.warning(f"Trend spike {dimension}={key}: {count} reports this hour (baseline {mean:.1f}, z={z:.1f})")
+        for user in recipients:
+            notifications.append(IntelligenceNotification(
+                user=user,
+                title=f"📈 تصاعد غير اعتيادي - {label}"[:255],
+                message=f"رصد {count} تقارير خلال الساعة الحالية مقابل معدل {mean:.1f} (z={z:.1f}). آخر تقرير: {report.title}",
+                level=IntelligenceNotification.Level.WARNING,
+                report=report,
+            ))
+    IntelligenceNotification.objects.bulk_create(notifications)
+
+
+def series(dimension, granularity=Granularity.DAY, since=None, until=None, keys=None, top=None):
+    """
+    Rollup time series: {key: [(bucket_start, count), ...]} for a dimension.
+    With `top`, only the keys with the highest totals in the window are returned.
+    """
+    counters = TrendCounter.objects.filter(granularity=granularity, dimension=dimension)
+    if since:
+        counters = counters.filter(bucket_start__gte=since)
+    if until:
+        counters = counters.filter(bucket_start__lte=until)
+    if keys:
+        counters = counters.filter(key__in=keys)
+    if top:
+        top_keys = list(
+            counters.values('key').annotate(total=Sum('count')).order_by('-total').values_list('key', flat=True)[:top]
+        )
+        counters = counters.filter(key__in=top_keys)
+
+    result = {}
+    for key, bucket, count in counters.order_by('bucket_start').values_list('key', 'bucket_start', 'count'):
+        result.setdefault(key, []).append((bucket, count))
+    return result
+
+
+def default_window(granularity):
+    return timezone.now() - (timedelta(hours=48) if granularity == Granularity.HOUR else timedelta(days=30))
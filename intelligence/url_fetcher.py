@@ -1,18 +1,56 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from urllib.parse import urlsplit
 import requests
-import re
+from requests.adapters import HTTPAdapter
+from django.conf import settings
 from django.utils import timezone
 from .models import Source, IntelligenceReport
 from .analysis import ContentAnalyzer
+from .trends import record_report
+from .context_processors import refresh_global_status
+
+from .utils import html_extract
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+MAX_URLS = 50
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests.Session, so connections are pooled and reused across fetches."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            pool_size = int(getattr(settings, 'URL_FETCH_WORKERS', 8))
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _session = session
+    return _session
+
+
+def normalize_urls(urls):
+    """Stripped, de-duplicated URLs in their original order, capped at MAX_URLS."""
+    return list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))[:MAX_URLS]
 
-try:
-    from bs4 import BeautifulSoup
-    HAS_BS4 = True
-except ImportError:
-    HAS_BS4 = False
 
 class URLFetcher:
-    def __init__(self):
+    def __init__(self, max_workers=None, per_host=None, deadline=None, timeout=10):
         self.analyzer = ContentAnalyzer()
+        self.session = get_session()
+        self.max_workers = max_workers or int(getattr(settings, 'URL_FETCH_WORKERS', 8))
+        self.per_host = per_host or int(getattr(settings, 'URL_FETCH_PER_HOST', 2))
+        self.deadline = deadline or float(getattr(settings, 'URL_FETCH_DEADLINE', 90))
+        self.timeout = timeout
+        self.max_bytes = int(getattr(settings, 'URL_FETCH_MAX_BYTES', 2 * 1024 * 1024))
+        self.parser = getattr(settings, 'URL_FETCH_PARSER', '') or html_extract.default_backend()
         # Ensure a generic source exists for manual fetches
         self.source, _ = Source.objects.get_or_create(
             name="Manual Web Fetch",
@@ -24,123 +62,153 @@ class URLFetcher:
             }
         )
 
-    def fetch_and_process_urls(self, urls, query=None):
+    def fetch_and_process_urls(self, urls, query=None, progress=None):
         """
         Fetches content from a list of URLs and creates IntelligenceReports.
+        Downloads run concurrently (at most `per_host` at a time per host) and stop at
+        the overall deadline; reports are saved and analysed in the calling thread as
+        each download completes. `progress(url, results)` is called after every URL.
         Returns a summary dict.
         """
         results = {
             'success': 0,
             'failed': 0,
+            'processed': 0,
             'errors': [],
             'reports': []
         }
+        unique_urls = normalize_urls(urls)
 
-        # Deduplicate URLs
-        unique_urls = list(set(urls))[:50]  # Limit to 50 as requested
-
+        # Check if already exists to avoid duplicates
+        existing = set(IntelligenceReport.objects.filter(original_url__in=unique_urls).values_list('original_url', flat=True))
         for url in unique_urls:
-            url = url.strip()
-            if not url:
-                continue
-                
-            # Check if already exists to avoid duplicates
-            if IntelligenceReport.objects.filter(original_url=url).exists():
+            if url in existing:
                 results['errors'].append(f"Skipped (Duplicate): {url}")
-                continue
+                results['processed'] += 1
+                if progress:
+                    progress(url, results)
+        pending = [url for url in unique_urls if url not in existing]
+        if not pending:
+            return results
 
-            try:
-                report = self._fetch_single_url(url, query)
-                if report:
+        deadline = time.monotonic() + self.deadline
+        host_slots = {urlsplit(url).netloc: threading.BoundedSemaphore(self.per_host) for url in pending}
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending)), thread_name_prefix='url-fetch')
+        futures = {
+            executor.submit(self._download_and_parse, url, query, host_slots[urlsplit(url).netloc], deadline): url
+            for url in pending
+        }
+        handled = set()
+        try:
+            for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+                url = futures[future]
+                handled.add(url)
+                try:
+                    report = self._save_report(url, *future.result())
                     self.analyzer.analyze_report(report)
+                    record_report(report)
                     results['success'] += 1
                     results['reports'].append(report)
-                else:
+                except Exception as e:
                     results['failed'] += 1
-                    results['errors'].append(f"Failed to parse: {url}")
-            except Exception as e:
-                results['failed'] += 1
-                results['errors'].append(f"Error {url}: {str(e)}")
+                    results['errors'].append(f"Error {url}: {str(e)}")
+                results['processed'] += 1
+                if progress:
+                    progress(url, results)
+        except FuturesTimeout:
+            for url in pending:
+                if url not in handled:
+                    results['failed'] += 1
+                    results['processed'] += 1
+                    results['errors'].append(f"Timed out (deadline): {url}")
+            if progress:
+                progress(None, results)
+        finally:
+            # Downloads still in flight end by themselves: their timeout never exceeds the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
 
+        if results['success']:
+            refresh_global_status()
         return results
 
-    def _fetch_single_url(self, url, query=None):
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
+    def _download_and_parse(self, url, query, host_slot, deadline):
+        """Runs on a worker thread: no database access here."""
+        if not host_slot.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise TimeoutError("deadline reached while waiting for the host")
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("deadline reached")
+            html_content = self._download(url, timeout=min(self.timeout, remaining))
+        finally:
+            host_slot.release()
+        return self._parse(html_content, url, query)
+
+    def _download(self, url, timeout):
+        """
+        Streams the body up to `max_bytes` (the rest of a larger page is dropped)
+        and rejects non-HTML responses before reading them. `timeout` bounds the
+        whole download, not just each socket read.
+        """
+        read_deadline = time.monotonic() + timeout
+        with self.session.get(url, timeout=timeout, stream=True) as response:
             response.raise_for_status()
-            
-            # Auto-detect encoding
-            if response.encoding is None:
-                response.encoding = response.apparent_encoding
+            content_type = response.headers.get('Content-Type', '')
+            mime = content_type.split(';')[0].strip().lower()
+            if mime and mime not in HTML_CONTENT_TYPES:
+                raise ValueError(f"Unsupported content type: {mime}")
 
-            html_content = response.text
-            
-            title = ""
-            content = ""
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_bytes:
+                    break
+                if time.monotonic() > read_deadline:
+                    raise TimeoutError("download took too long")
+        raw = b''.join(chunks)[:self.max_bytes]
 
-            if HAS_BS4:
-                soup = BeautifulSoup(html_content, 'html.parser')
-                
-                # Extract Title
-                if soup.title:
-                    title = soup.title.string
-                else:
-                    h1 = soup.find('h1')
-                    title = h1.get_text() if h1 else url
-
-                # Extract Content (simple heuristic: grab paragraphs)
-                paragraphs = soup.find_all('p')
-                content = "\n\n".join([p.get_text() for p in paragraphs])
-                
-                # Fallback if no paragraphs
-                if not content:
-                    content = soup.get_text()
-            else:
-                # Fallback Regex extraction
-                title_match = re.search(r'<title>(.*?)</title>', html_content, re.IGNORECASE)
-                title = title_match.group(1) if title_match else url
-                
-                # Strip tags for content
-                content = re.sub(r'<[^>]+>', ' ', html_content)
-                content = re.sub(r'\s+', ' ', content).strip()
+        if not mime and b'\x00' in raw[:1024]:
+            raise ValueError("Binary content")
+        return html_extract.decode_body(raw, content_type)
+
+    def _parse(self, html_content, url, query=None):
+        """Extracts (title, content) from a page."""
+        title, content = html_extract.extract(html_content, url, self.parser)
+
+        if not title:
+            title = f"Report from {url}"
+        
+        # Truncate if necessary (though TextField usually handles large text)
+        title = title.strip()[:200]
 
-            if not title:
-                title = f"Report from {url}"
+        # Extraction Logic if query is provided
+        if query:
+            query_matches = []
+            lines = content.split('\n')
+            for line in lines:
+                if query.lower() in line.lower():
+                    query_matches.append(line.strip())
             
-            # Truncate if necessary (though TextField usually handles large text)
-            title = title.strip()[:200]
-
-            # Extraction Logic if query is provided
-            if query:
-                query_matches = []
-                lines = content.split('\n')
-                for line in lines:
-                    if query.lower() in line.lower():
-                        query_matches.append(line.strip())
+            if query_matches:
+                extraction_summary = f"** EXTRACTION RESULTS FOR '{query}' **\n"
+                extraction_summary += "\n- ".join(query_matches[:5]) # Top 5 matches
+                if len(query_matches) > 5:
+                    extraction_summary += f"\n... and {len(query_matches)-5} more matches."
+                extraction_summary += "\n" + "="*40 + "\n\n"
                 
-                if query_matches:
-                    extraction_summary = f"** EXTRACTION RESULTS FOR '{query}' **\n"
-                    extraction_summary += "\n- ".join(query_matches[:5]) # Top 5 matches
-                    if len(query_matches) > 5:
-                        extraction_summary += f"\n... and {len(query_matches)-5} more matches."
-                    extraction_summary += "\n" + "="*40 + "\n\n"
-                    
-                    content = extraction_summary + content
-
-            report = IntelligenceReport.objects.create(
-                title=title,
-                content=content,
-                source=self.source,
-                original_url=url,
-                published_at=timezone.now(),
-                classification=IntelligenceReport.Classification.UNCLASSIFIED,
-                credibility_score=self.source.reliability_score
-            )
-            return report
-
-        except Exception as e:
-            raise e
+                content = extraction_summary + content
+
+        return title, content
+
+    def _save_report(self, url, title, content):
+        return IntelligenceReport.objects.create(
+            title=title,
+            content=content,
+            source=self.source,
+            original_url=url,
+            published_at=timezone.now(),
+            classification=IntelligenceReport.Classification.UNCLASSIFIED,
+            credibility_score=self.source.reliability_score
+        )
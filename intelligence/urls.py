@@ -1,9 +1,11 @@
 from django.urls import path
-from . import views, search_views, graph_views, source_views
+from . import views, search_views, graph_views, source_views, trend_views
 
 urlpatterns = [
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('sources/', source_views.source_manager_view, name='source_manager'),
+    path('api/jobs/', source_views.job_list_api, name='job_list'),
+    path('api/jobs/<int:job_id>/', source_views.job_status_api, name='job_status'),
     path('report/<int:report_id>/', views.report_detail, name='report_detail'),
     path('report/<int:report_id>/translate/', views.translate_report_api, name='translate_report'),
     path('report/<int:report_id>/favorite/', views.toggle_favorite, name='toggle_favorite'),
@@ -13,8 +15,16 @@ urlpatterns = [
     path('api/notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
     path('search/', search_views.search_view, name='search'),
     path('search/fetch/', search_views.fetch_urls_view, name='fetch_urls'),
+    path('search/fetch/<int:job_id>/', search_views.fetch_job_status_view, name='fetch_job_status'),
+    path('search/export/', search_views.search_export_view, name='search_export'),
     path('graph/', views.graph_view, name='graph_view'),
     path('api/graph-data/', graph_views.graph_data_api, name='graph_data'),
+    path('api/graph/delta/', graph_views.graph_delta_api, name='graph_delta'),
+    path('api/graph/neighbourhood/', graph_views.graph_neighbourhood_api, name='graph_neighbourhood'),
+    path('api/entities/<int:entity_id>/cooccurring/', graph_views.entity_cooccurrence_api, name='entity_cooccurrence'),
+    path('api/entities/rising-pairs/', graph_views.rising_pairs_api, name='rising_pairs'),
+    path('api/trends/', trend_views.trend_series_api, name='trend_series'),
+    path('api/trends/baselines/', trend_views.trend_baselines_api, name='trend_baselines'),
     path('alerts/manage/', views.manage_alerts, name='manage_alerts'),
     path('alerts/delete/<int:rule_id>/', views.delete_alert_rule, name='delete_alert_rule'),
     path('alerts/analysis/<int:report_id>/', views.critical_analysis_view, name='critical_analysis'),
@@ -0,0 +1,245 @@
+"""
+Charset detection and main-content extraction for fetched web pages.
+
+Parsing uses lxml when it is installed and falls back to BeautifulSoup's
+html.parser, then to a regex tag stripper. All backends apply the same
+main-content heuristic: paragraphs vote for their parent (and, at half weight,
+their grandparent) with their text length, and only paragraphs inside the
+best-scoring container are kept. That drops navigation, sidebars and footers.
+
+clean_html() turns short feed summaries into plain text without building a tree.
+"""
+import re
+import html
+import codecs
+import unicodedata
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from bs4 import BeautifulSoup
+    HAS_BS4 = True
+except ImportError:
+    HAS_BS4 = False
+
+try:
+    from charset_normalizer import from_bytes as sniff_charset
+except ImportError:
+    sniff_charset = None
+
+# Only the head of the document is searched for <meta charset> and sniffed
+META_SCAN_BYTES = 4096
+SNIFF_BYTES = 64 * 1024
+
+_HEADER_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+BOILERPLATE_TAGS = ('script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'iframe', 'svg')
+# Shorter paragraphs (captions, bylines, buttons) do not vote for a container
+MIN_PARAGRAPH_CHARS = 40
+
+BACKENDS = ('lxml', 'html.parser', 'regex')
+
+
+def _valid_codec(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def detect_charset(raw, content_type=''):
+    """
+    Encoding of an HTML body: BOM, then the Content-Type header, then a <meta> tag
+    in the first bytes, then a UTF-8 check. Statistical sniffing is the last resort
+    and only looks at the first SNIFF_BYTES.
+    """
+    for bom, name in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')):
+        if raw.startswith(bom):
+            return name
+
+    match = _HEADER_CHARSET.search(content_type or '')
+    if match and _valid_codec(match.group(1)):
+        return _valid_codec(match.group(1))
+
+    match = _META_CHARSET.search(raw[:META_SCAN_BYTES])
+    if match and _valid_codec(match.group(1).decode('ascii', 'ignore')):
+        return _valid_codec(match.group(1).decode('ascii', 'ignore'))
+
+    try:
+        raw.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    if sniff_charset is not None:
+        best = sniff_charset(raw[:SNIFF_BYTES]).best()
+        if best is not None:
+            return best.encoding
+    return 'utf-8'
+
+
+def decode_body(raw, content_type=''):
+    return raw.decode(detect_charset(raw, content_type), errors='replace')
+
+
+def default_backend():
+    if HAS_LXML:
+        return 'lxml'
+    return 'html.parser' if HAS_BS4 else 'regex'
+
+
+def _main_content(paragraphs, parent_of):
+    """
+    paragraphs: [(node, text)] in document order. Returns the text of the paragraphs
+    inside the best-scoring container, or of all paragraphs if none qualifies.
+    """
+    scores = {}
+    nodes = {}
+    for node, text in paragraphs:
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        parent = parent_of(node)
+        if parent is None:
+            continue
+        nodes[id(parent)] = parent
+        scores[id(parent)] = scores.get(id(parent), 0) + len(text)
+        grandparent = parent_of(parent)
+        if grandparent is not None:
+            nodes[id(grandparent)] = grandparent
+            scores[id(grandparent)] = scores.get(id(grandparent), 0) + len(text) / 2
+
+    texts = [(node, text) for node, text in paragraphs if text]
+    if not scores:
+        return "\n\n".join(text for _, text in texts)
+
+    best = nodes[max(scores, key=scores.get)]
+
+    def inside(node):
+        while node is not None:
+            if node is best:
+                return True
+            node = parent_of(node)
+        return False
+
+    return "\n\n".join(text for node, text in texts if inside(node))
+
+
+def _extract_lxml(html_content, url):
+    try:
+        doc = lxml.html.document_fromstring(html_content)
+    except ValueError:
+        # Unicode input with an XML encoding declaration
+        doc = lxml.html.document_fromstring(html_content.encode('utf-8'))
+
+    title = (doc.findtext('.//title') or '').strip()
+    if not title:
+        h1 = doc.find('.//h1')
+        title = h1.text_content().strip() if h1 is not None else url
+
+    for element in [e for e in doc.iter(*BOILERPLATE_TAGS)]:
+        element.drop_tree()
+    paragraphs = [(p, p.text_content().strip()) for p in doc.iter('p')]
+    content = _main_content(paragraphs, lambda node: node.getparent())
+    return title, content or doc.text_content()
+
+
+def _extract_bs4(html_content, url):
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    if soup.title and soup.title.string:
+        title = soup.title.string.strip()
+    else:
+        h1 = soup.find('h1')
+        title = h1.get_text().strip() if h1 else url
+
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    paragraphs = [(p, p.get_text().strip()) for p in soup.find_all('p')]
+    content = _main_content(paragraphs, lambda node: node.parent)
+    return title, content or soup.get_text()
+
+
+def _extract_regex(html_content, url):
+    title_match = re.search(r'<title[^>]*>(.*?)</title>', html_content, re.IGNORECASE | re.DOTALL)
+    title = title_match.group(1).strip() if title_match else url
+
+    content = re.sub(r'<(script|style|noscript)[^>]*>.*?</\1>', ' ', html_content, flags=re.IGNORECASE | re.DOTALL)
+    content = re.sub(r'<[^>]+>', ' ', content)
+    content = re.sub(r'\s+', ' ', content).strip()
+    return title, content
+
+
+def extract(html_content, url='', backend=None):
+    """(title, main text) of an HTML page using the given or the fastest available backend."""
+    backend = backend or default_backend()
+    if backend == 'lxml' and HAS_LXML:
+        return _extract_lxml(html_content, url)
+    if backend in ('lxml', 'html.parser') and HAS_BS4:
+        return _extract_bs4(html_content, url)
+    return _extract_regex(html_content, url)
+
+
+# -- feed summaries -------------------------------------------------------------
+
+# One alternation, so tags are stripped and entities decoded in a single pass and a
+# decoded "&lt;b&gt;" is never stripped again. Quoted attribute values may contain ">".
+_MARKUP = re.compile(
+    r'<!--.*?-->'
+    r'|<(script|style)\b(?:[^"\'>]|"[^"]*"|\'[^\']*\')*>.*?</\1\s*>'
+    r'|<!\[CDATA\[(.*?)\]\]>'
+    r'|</?[A-Za-z](?:[^"\'>]|"[^"]*"|\'[^\']*\')*>'
+    r'|<[!?][^<>]*>'
+    r'|(&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);?)',
+    re.IGNORECASE | re.DOTALL,
+)
+# What is left of an unterminated tag or comment; html.parser decides what that means
+_BROKEN_MARKUP = re.compile(r'<[A-Za-z/!?]')
+
+_MOJIBAKE = (('â€™', "'"), ('â€œ', '"'), ('â€', '"'))
+
+
+def _markup_token(match):
+    entity = match.group(3)
+    if entity is not None:
+        return html.unescape(entity)
+    cdata = match.group(2)
+    if cdata is not None:
+        return f' {cdata} '
+    return ' '
+
+
+def _strip_markup_bs4(raw_html):
+    return BeautifulSoup(raw_html, 'html.parser').get_text(separator=' ')
+
+
+def strip_markup(raw_html):
+    """Text of an HTML fragment with tags as spaces, like BeautifulSoup's get_text(separator=' ')."""
+    if '<' not in raw_html and '&' not in raw_html:
+        return raw_html
+    text = _MARKUP.sub(_markup_token, raw_html)
+    if HAS_BS4 and '<' in text and _BROKEN_MARKUP.search(text):
+        return _strip_markup_bs4(raw_html)
+    return text
+
+
+def clean_html(raw_html):
+    """
+    Plain text of a feed summary: markup stripped, whitespace collapsed, NFKC
+    normalised and common UTF-8-as-cp1252 mojibake repaired.
+    """
+    if not raw_html:
+        return ""
+    text = ' '.join(strip_markup(raw_html).split())
+    if not text.isascii() and not unicodedata.is_normalized('NFKC', text):
+        text = unicodedata.normalize('NFKC', text)
+    if 'â€' in text:
+        for broken, fixed in _MOJIBAKE:
+            text = text.replace(broken, fixed)
+    if '&nbsp;' in text:
+        text = text.replace('&nbsp;', ' ')
+    return text.strip()
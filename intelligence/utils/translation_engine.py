@@ -1,9 +1,12 @@
 import re
 import logging
 from django.conf import settings
+from core.cache import translation_cache
 
 logger = logging.getLogger(__name__)
 
+TERMS_CACHE_KEY = 'sovereign_terms'
+
 class SmartDictionaryTranslator:
     """
     A sovereign, offline translation engine optimized for military and political intelligence.
@@ -32,45 +35,48 @@ class SmartDictionaryTranslator:
             r'\burgent\b': 'عاجل',
             r'\bbreaking\b': 'عاجل',
         }
-        self._cache = None
 
     def _load_terms(self):
         """Loads terms from the database into a sorted list of (pattern, replacement)."""
-        try:
-            # Avoid import errors at module level
-            from intelligence.models import SovereignTerm
-            
-            terms = []
-            
-            # Add common terms
-            for p, t in self.common_terms.items():
-                terms.append((p, t))
+        # Avoid import errors at module level
+        from intelligence.models import SovereignTerm
+        
+        terms = []
+        
+        # Add common terms
+        for p, t in self.common_terms.items():
+            terms.append((p, t))
 
-            # Add DB terms
-            db_terms = SovereignTerm.objects.all()
-            for term in db_terms:
-                pattern = term.english_term
-                
-                # If not a regex, enforce word boundaries and escape special chars
-                if not term.is_regex:
-                    escaped_term = re.escape(term.english_term)
-                    pattern = fr'\b{escaped_term}\b'
-                    
-                terms.append((pattern, term.arabic_translation))
+        # Add DB terms
+        db_terms = SovereignTerm.objects.all()
+        for term in db_terms:
+            pattern = term.english_term
             
-            # Sort by length of pattern string to prioritize longer matches
-            # e.g., "Prime Minister" (14 chars) should be replaced before "Minister" (8 chars)
-            terms.sort(key=lambda x: len(x[0]), reverse=True)
-            
-            return terms
+            # If not a regex, enforce word boundaries and escape special chars
+            if not term.is_regex:
+                escaped_term = re.escape(term.english_term)
+                pattern = fr'\b{escaped_term}\b'
+                
+            terms.append((pattern, term.arabic_translation))
+        
+        # Sort by length of pattern string to prioritize longer matches
+        # e.g., "Prime Minister" (14 chars) should be replaced before "Minister" (8 chars)
+        terms.sort(key=lambda x: len(x[0]), reverse=True)
+        
+        return terms
+
+    def _get_terms(self):
+        """Term list shared by all workers through the translation cache namespace."""
+        try:
+            return translation_cache.get_or_set(TERMS_CACHE_KEY, self._load_terms)
         except Exception as e:
             logger.error(f"Failed to load SovereignTerms from DB: {e}")
-            # Return just common terms as fallback
+            # Fall back to just common terms (not cached, so the next call retries)
             return list(self.common_terms.items())
 
     def refresh_cache(self):
-        """Forces a reload of terms from the database."""
-        self._cache = self._load_terms()
+        """Forces a reload of terms from the database on every worker."""
+        translation_cache.invalidate()
 
     def translate_text(self, text):
         """
@@ -79,13 +85,9 @@ class SmartDictionaryTranslator:
         if not text:
             return ""
 
-        # Lazy Load
-        if self._cache is None:
-            self._cache = self._load_terms()
-
         translated_text = text
         
-        for pattern, replacement in self._cache:
+        for pattern, replacement in self._get_terms():
             try:
                 # Case insensitive replacement
                 translated_text = re.sub(pattern, replacement, translated_text, flags=re.IGNORECASE)
@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from .models import IntelligenceReport, Source
 from core.models import UserActionLog
+from core.audit import record_action
 from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
@@ -8,6 +9,7 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from intelligence_agent.services import GroqClient
+from .graph_analytics import central_entities
 from django.contrib import messages
 import logging
 
@@ -124,15 +126,23 @@ def dashboard_view(request):
         'sources_count': sources_count,
         'critical_alerts_count': critical_alerts_count,
         'top_threats': top_threats,
+        'central_entities': central_entities(k=8),
     }
     return render(request, 'intelligence/dashboard.html', context)
 
 def report_detail(request, report_id):
-    report = get_object_or_404(IntelligenceReport, pk=report_id)
+    from django.db.models import Prefetch
+    report = get_object_or_404(
+        IntelligenceReport.objects.select_related('source').prefetch_related(
+            'entities',
+            Prefetch('related_reports', queryset=IntelligenceReport.objects.select_related('source')),
+        ),
+        pk=report_id,
+    )
     
     # Audit Log
     if request.user.is_authenticated:
-        UserActionLog.objects.create(
+        record_action(
             user=request.user,
             action=UserActionLog.ActionType.VIEW_REPORT,
             target_object=f"Report ID: {report.id}",
@@ -142,6 +152,7 @@ def report_detail(request, report_id):
     
     context = {
         'report': report,
+        'is_favorite': request.user.is_authenticated and report.favorites.filter(pk=request.user.pk).exists(),
     }
     return render(request, 'intelligence/report_detail.html', context)
 
@@ -153,7 +164,7 @@ def graph_view(request):
 @require_POST
 def toggle_favorite(request, report_id):
     report = get_object_or_404(IntelligenceReport, pk=report_id)
-    if request.user in report.favorites.all():
+    if report.favorites.filter(pk=request.user.pk).exists():
         report.favorites.remove(request.user)
         is_favorite = False
     else:
@@ -263,7 +274,7 @@ def critical_analysis_view(request, report_id):
 
 @login_required
 def favorites_list(request):
-    favorite_reports = request.user.favorite_reports.all().order_by('-created_at')
+    favorite_reports = request.user.favorite_reports.select_related('source').order_by('-created_at')
     return render(request, 'intelligence/favorites_list.html', {'favorite_reports': favorite_reports})
 
 @login_required
@@ -323,7 +334,7 @@ def export_report(request, report_id):
     report = get_object_or_404(IntelligenceReport, pk=report_id)
     
     # Security Audit
-    UserActionLog.objects.create(
+    record_action(
         user=request.user,
         action=UserActionLog.ActionType.EXPORT,
         target_object=f"Report ID: {report.id}",
@@ -361,13 +372,13 @@ def check_notifications(request):
     Returns unread critical notifications for the polling script.
     """
     from .models import IntelligenceNotification
-    notifications = IntelligenceNotification.objects.filter(
+    notifications = list(IntelligenceNotification.objects.filter(
         user=request.user, 
         is_read=False, 
         level='CRITICAL'
-    ).order_by('-created_at')
+    ).order_by('-created_at'))
     
-    if not notifications.exists():
+    if not notifications:
         return JsonResponse({'status': 'ok', 'count': 0})
         
     data = []
@@ -377,10 +388,10 @@ def check_notifications(request):
             'title': notif.title,
             'message': notif.message,
             'level': notif.level,
-            'report_id': notif.report.id if notif.report else None
+            'report_id': notif.report_id
         })
         
-    return JsonResponse({'status': 'alert', 'count': notifications.count(), 'notifications': data})
+    return JsonResponse({'status': 'alert', 'count': len(notifications), 'notifications': data})
 
 @login_required
 @require_POST
@@ -0,0 +1,165 @@
+import codecs
+import logging
+from django.conf import settings
+from django.db import transaction
+from .models import AgentDocument
+from .knowledge import PassageChunker, store_passages
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = ('.txt', '.md', '.csv', '.json')
+TEXT_BLOCK_SIZE = 64 * 1024
+# Pages extracted between progress updates
+PAGE_BATCH_SIZE = 10
+
+
+def pdf_reader(file_obj, filename):
+    """Opens a PdfReader for PDF files (None otherwise), to share between counting and extraction."""
+    if not filename.lower().endswith('.pdf'):
+        return None
+    import pypdf
+    file_obj.seek(0)
+    return pypdf.PdfReader(file_obj)
+
+
+def count_pages(file_obj, filename, reader=None):
+    """Returns the number of extraction units (PDF pages or text blocks) in a file."""
+    filename = filename.lower()
+    if filename.endswith('.pdf'):
+        return len((reader or pdf_reader(file_obj, filename)).pages)
+    if filename.endswith(TEXT_EXTENSIONS):
+        size = getattr(file_obj, 'size', None)
+        if size is None:
+            file_obj.seek(0, 2)
+            size = file_obj.tell()
+        return max(1, -(-size // TEXT_BLOCK_SIZE))
+    return 0
+
+
+def iter_text_pages(file_obj, filename, max_pages=None, reader=None):
+    """
+    Streams extracted text one page at a time (PDF pages, or fixed-size blocks
+    for plain text) so large files are never materialized as a single string.
+    Pass the `reader` from pdf_reader() to avoid parsing a PDF twice.
+    """
+    filename = filename.lower()
+    if hasattr(file_obj, 'seek'):
+        file_obj.seek(0)
+
+    if filename.endswith('.pdf'):
+        reader = reader or pdf_reader(file_obj, filename)
+        for index, page in enumerate(reader.pages):
+            if max_pages is not None and index >= max_pages:
+                break
+            yield page.extract_text() or ""
+
+    elif filename.endswith(TEXT_EXTENSIONS):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        index = 0
+        while max_pages is None or index < max_pages:
+            block = file_obj.read(TEXT_BLOCK_SIZE)
+            if not block:
+                break
+            yield decoder.decode(block)
+            index += 1
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+    else:
+        raise ValueError(f"File type '{filename}' not fully supported for text extraction")
+
+
+def enqueue_document(document_id):
+    """
+    Queues extraction of a stored document as a background job (see intelligence.jobs),
+    so a document whose worker dies mid-extraction is picked up again.
+    """
+    from intelligence import jobs
+    job, _ = jobs.enqueue(
+        jobs.JobType.PROCESS_DOCUMENT, {'document_id': document_id}, unique_key=f"process_document:{document_id}",
+    )
+    return job
+
+
+def _update(document, **fields):
+    """Writes progress fields without clobbering concurrent edits to other columns."""
+    for name, value in fields.items():
+        setattr(document, name, value)
+    AgentDocument.objects.filter(pk=document.pk).update(**fields)
+
+
+def process_document(document_id):
+    """
+    Extracts a stored document page by page into indexed passages, tracking
+    status and progress on the AgentDocument row.
+    """
+    document = AgentDocument.objects.get(pk=document_id)
+    max_pages = int(getattr(settings, 'AGENT_DOC_MAX_PAGES', 1000))
+    max_bytes = int(getattr(settings, 'AGENT_DOC_MAX_BYTES', 50 * 1024 * 1024))
+
+    try:
+        file_size = document.file.size
+    except Exception as e:
+        _update(document, status=AgentDocument.Status.FAILED, error_message=f"File unavailable: {e}")
+        return document
+
+    if file_size > max_bytes:
+        _update(document, status=AgentDocument.Status.FAILED, file_size=file_size,
+                error_message=f"File exceeds the {max_bytes} byte limit")
+        return document
+
+    _update(document, status=AgentDocument.Status.PROCESSING, file_size=file_size,
+            pages_processed=0, error_message='')
+
+    content_chars = int(getattr(settings, 'AGENT_DOC_CONTENT_CHARS', 200_000))
+    notes = []
+    try:
+        with document.file.open('rb') as file_obj:
+            reader = pdf_reader(file_obj, document.file.name)
+            pages_total = count_pages(file_obj, document.file.name, reader=reader)
+            if pages_total > max_pages:
+                notes.append(f"Truncated to the first {max_pages} of {pages_total} pages")
+                pages_total = max_pages
+            _update(document, pages_total=pages_total)
+
+            # Pages go straight into the index; only a capped prefix is kept on the row.
+            # The previous passages stay searchable until the new ones replace them.
+            with transaction.atomic():
+                document.chunks.all().delete()
+                chunker = PassageChunker()
+                count = 0
+                content_parts = []
+                content_length = 0
+                pages = iter_text_pages(file_obj, document.file.name, max_pages=max_pages, reader=reader)
+                for index, page_text in enumerate(pages, start=1):
+                    if page_text.strip():
+                        page_text += "\n"
+                        count += store_passages(document, chunker.feed(page_text))
+                        if content_length < content_chars:
+                            content_parts.append(page_text[:content_chars - content_length])
+                            content_length += len(content_parts[-1])
+                    if index % PAGE_BATCH_SIZE == 0:
+                        _update(document, pages_processed=min(index, pages_total or index))
+                count += store_passages(document, chunker.flush())
+
+                if not count:
+                    notes.append("Document contains no extractable text - might be an image scan")
+                _update(
+                    document,
+                    content_text="".join(content_parts),
+                    status=AgentDocument.Status.COMPLETED,
+                    is_processed=True,
+                    pages_processed=document.pages_total,
+                    error_message="; ".join(notes),
+                )
+    except ImportError:
+        _update(document, status=AgentDocument.Status.FAILED,
+                error_message="System Error: pypdf library not installed on server")
+        return document
+    except Exception as e:
+        logger.error(f"Error processing document {document.id}: {e}")
+        _update(document, status=AgentDocument.Status.FAILED, error_message=str(e))
+        return document
+
+    logger.info(f"Processed document {document.id}: {document.pages_total} pages, {count} passages")
+    return document
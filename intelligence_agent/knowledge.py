@@ -0,0 +1,215 @@
+import math
+import re
+import logging
+from collections import Counter, namedtuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Greatest, Ln, Sqrt
+from .models import AgentDocument, DocumentChunk, DocumentTerm
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = int(getattr(settings, 'AGENT_CHUNK_SIZE', 1200))
+CHUNK_OVERLAP = int(getattr(settings, 'AGENT_CHUNK_OVERLAP', 200))
+MAX_TERM_LENGTH = 64
+# Added to the score of passages whose document title matches a query term
+TITLE_MATCH_BOOST = 1.0
+
+_DIACRITICS_RE = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_LETTER_MAP = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ى': 'ي', 'ة': 'ه'})
+
+Passage = namedtuple('Passage', ['position', 'start_offset', 'end_offset', 'content'])
+
+
+def normalize_text(text):
+    """
+    Arabic-aware normalization used for both indexing and querying:
+    strips diacritics/tatweel, unifies alef/yaa/taa marbuta variants and lowercases.
+    """
+    return _DIACRITICS_RE.sub('', text).translate(_LETTER_MAP).lower()
+
+
+def tokenize(text):
+    """Splits normalized text into index terms, dropping single-character tokens."""
+    if not text:
+        return []
+    return [t[:MAX_TERM_LENGTH] for t in _TOKEN_RE.findall(normalize_text(text)) if len(t) > 1]
+
+
+class PassageChunker:
+    """
+    Incrementally splits a text stream into overlapping passages.
+    Text can be fed page by page; offsets are absolute positions in the concatenated stream.
+    """
+
+    def __init__(self, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+        if overlap >= size:
+            raise ValueError("Chunk overlap must be smaller than chunk size")
+        self.size = size
+        self.overlap = overlap
+        self.position = 0
+        self._buffer = ""
+        self._buffer_start = 0
+        self._covered_until = 0
+
+    def feed(self, text):
+        """Appends text and yields every passage that is now complete."""
+        if not text:
+            return
+        self._buffer += text
+        cursor = 0
+        while len(self._buffer) - cursor >= self.size:
+            passage, cursor = self._emit(cursor, final=False)
+            yield passage
+        # Compact once per feed instead of slicing for every passage
+        self._buffer = self._buffer[cursor:]
+        self._buffer_start += cursor
+
+    def flush(self):
+        """Yields the trailing passage if it holds text not covered by a previous one."""
+        if self._buffer_start + len(self._buffer) > self._covered_until and self._buffer.strip():
+            passage, cursor = self._emit(0, final=True)
+            yield passage
+        self._buffer_start += len(self._buffer)
+        self._buffer = ""
+
+    def _emit(self, cursor, final):
+        window = self._buffer[cursor:cursor + self.size]
+        end = len(window)
+        if not final:
+            # Prefer to break on whitespace in the last fifth of the window
+            cut = window.rfind(' ', int(self.size * 0.8))
+            if cut > 0:
+                end = cut
+        start_offset = self._buffer_start + cursor
+        passage = Passage(self.position, start_offset, start_offset + end, window[:end])
+        self.position += 1
+        self._covered_until = start_offset + end
+        return passage, cursor + max(end - self.overlap, 1)
+
+
+def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Returns the list of overlapping passages for a complete text."""
+    chunker = PassageChunker(size=size, overlap=overlap)
+    return list(chunker.feed(text)) + list(chunker.flush())
+
+
+def store_passages(document, passages):
+    """
+    Persists a batch of passages and their inverted-index postings.
+    Returns the number of chunks written.
+    """
+    chunks = []
+    term_counts = []
+    for passage in passages:
+        counts = Counter(tokenize(passage.content))
+        chunks.append(DocumentChunk(
+            document=document,
+            position=passage.position,
+            start_offset=passage.start_offset,
+            end_offset=passage.end_offset,
+            content=passage.content,
+            token_count=sum(counts.values()),
+        ))
+        term_counts.append(counts)
+
+    if not chunks:
+        return 0
+
+    created = DocumentChunk.objects.bulk_create(chunks)
+    if any(chunk.pk is None for chunk in created):
+        # Backends without RETURNING support: resolve ids by position
+        ids = dict(DocumentChunk.objects.filter(
+            document=document, position__in=[c.position for c in chunks]
+        ).values_list('position', 'id'))
+        for chunk in created:
+            chunk.pk = chunk.id = ids[chunk.position]
+
+    postings = [
+        DocumentTerm(chunk=chunk, term=term, frequency=freq)
+        for chunk, counts in zip(created, term_counts)
+        for term, freq in counts.items()
+    ]
+    DocumentTerm.objects.bulk_create(postings, batch_size=2000)
+    return len(created)
+
+
+def index_document(document, text=None):
+    """
+    (Re)builds the chunk table and search index for a document from its extracted text.
+    """
+    text = document.content_text if text is None else text
+    with transaction.atomic():
+        document.chunks.all().delete()
+        count = store_passages(document, chunk_text(text or ""))
+    logger.info(f"Indexed document {document.id} into {count} passages")
+    return count
+
+
+def search_passages(terms, limit=3):
+    """
+    Ranks indexed passages of processed documents against the query terms (TF-IDF with
+    length normalization), scored by the database over the postings of the query terms.
+    Documents whose title matches a term are boosted, and contribute their opening
+    passage when none of their passages matched.
+    Returns a list of DocumentChunk objects annotated with `score`, best first.
+    """
+    terms = [term for term in terms if term and term.strip()]
+    query_terms = set()
+    for term in terms:
+        query_terms.update(tokenize(term))
+    if not query_terms:
+        return []
+
+    title_q = Q()
+    for term in terms:
+        title_q |= Q(title__icontains=term.strip())
+    title_matches = AgentDocument.objects.filter(title_q, is_processed=True)
+
+    postings = DocumentTerm.objects.filter(term__in=query_terms, chunk__document__is_processed=True)
+    doc_freq = dict(postings.values_list('term').annotate(n=Count('id')).order_by())
+    scores = {}
+    if doc_freq:
+        total_chunks = DocumentChunk.objects.filter(document__is_processed=True).count() or 1
+        idf = Case(
+            *[When(term=term, then=Value(math.log(1 + total_chunks / n))) for term, n in doc_freq.items()],
+            output_field=FloatField(),
+        )
+        weight = ExpressionWrapper(
+            (Ln(F('frequency')) + 1.0) * idf / Sqrt(Greatest(F('chunk__token_count'), 1)),
+            output_field=FloatField(),
+        )
+        # Boost inside the query so a title match can lift a passage into the top `limit`
+        boost = Case(
+            When(chunk__document_id__in=title_matches.values('id'), then=Value(TITLE_MATCH_BOOST)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        ranked = (
+            postings.values('chunk_id', 'chunk__document_id')
+            .annotate(score=Sum(weight) + boost)
+            .order_by('-score', 'chunk_id')[:limit]
+        )
+        for row in ranked:
+            scores[row['chunk_id']] = row['score']
+
+    matched_docs = set(
+        DocumentChunk.objects.filter(pk__in=scores).values_list('document_id', flat=True)
+    )
+    # Newest title matches first, so the capped set is stable between calls
+    title_docs = title_matches.exclude(id__in=matched_docs).order_by('-created_at', 'id').values_list('id', flat=True)[:limit]
+    for chunk_id in DocumentChunk.objects.filter(
+        document_id__in=list(title_docs), position=0,
+    ).values_list('id', flat=True):
+        scores[chunk_id] = TITLE_MATCH_BOOST
+
+    best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    chunks = DocumentChunk.objects.select_related('document').in_bulk([chunk_id for chunk_id, _ in best])
+    results = []
+    for chunk_id, score in best:
+        chunk = chunks[chunk_id]
+        chunk.score = score
+        results.append(chunk)
+    return results
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from intelligence_agent.models import AgentDocument
+from intelligence_agent.documents import process_document
+from intelligence_agent.knowledge import index_document
+
+class Command(BaseCommand):
+    help = 'Re-extracts knowledge base documents into passage chunks and rebuilds the search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true', help='Only index documents that have no chunks yet')
+
+    def handle(self, *args, **options):
+        documents = AgentDocument.objects.all()
+        if options['missing_only']:
+            documents = documents.filter(chunks__isnull=True)
+
+        for document in documents:
+            if document.file:
+                document = process_document(document.id)
+                self.stdout.write(f"{document.title}: {document.get_status_display()} ({document.chunks.count()} passages)")
+            elif document.content_text:
+                # Legacy rows that only kept the extracted text
+                count = index_document(document)
+                self.stdout.write(f"{document.title}: {count} passages (from stored text)")
+
+        self.stdout.write(self.style.SUCCESS("Indexing complete."))
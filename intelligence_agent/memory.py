@@ -0,0 +1,76 @@
+import logging
+from django.conf import settings
+from django.utils import timezone
+from .models import AgentSession, AgentMessage
+from .prompting import get_budgets, truncate_to_tokens
+from .services import HISTORY_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# Per-turn cap when turns are handed to the summariser
+TURN_EXCERPT_TOKENS = 400
+
+
+def _threshold():
+    # The prompt only sees the last HISTORY_WINDOW messages, one of which is the new
+    # user turn, so older turns must be folded before they fall out of that window
+    return min(int(getattr(settings, 'AGENT_SUMMARY_THRESHOLD', HISTORY_WINDOW - 1)), HISTORY_WINDOW - 1)
+
+
+def _keep_recent():
+    return int(getattr(settings, 'AGENT_SUMMARY_KEEP_RECENT', 6))
+
+
+def needs_summary(session):
+    """True once the unsummarised tail of the session exceeds the threshold."""
+    return session.unsummarized_messages().count() > _threshold()
+
+
+def schedule_summary(session):
+    """Queues a summarize_session job (one per session at a time) when a summary is due."""
+    from intelligence import jobs
+    if needs_summary(session):
+        jobs.enqueue(jobs.JobType.SUMMARIZE_SESSION, {'session_id': session.id}, unique_key=f"summarize_session:{session.id}")
+
+
+def _extractive_summary(previous, turns):
+    """Fallback when the LLM is unavailable: keep a short excerpt of each folded turn."""
+    lines = [previous] if previous else []
+    for role, content in turns:
+        label = "المستخدم" if role == AgentMessage.Role.USER else "الوكيل"
+        lines.append(f"- {label}: {truncate_to_tokens(content, 60)}")
+    return "\n".join(lines)
+
+
+def summarize_session(session_id, client=None):
+    """
+    Incrementally condenses the session: every unsummarised turn except the most
+    recent ones is merged into the stored summary. Returns True if the summary moved.
+    """
+    session = AgentSession.objects.get(pk=session_id)
+    pending = list(
+        session.unsummarized_messages().order_by('id').values_list('id', 'role', 'content')
+    )
+    if len(pending) <= _threshold():
+        return False
+
+    to_fold = pending[:-_keep_recent()] if _keep_recent() else pending
+    if not to_fold:
+        return False
+    turns = [(role, truncate_to_tokens(content, TURN_EXCERPT_TOKENS)) for _, role, content in to_fold]
+
+    if client is None:
+        from .services import GroqClient
+        client = GroqClient()
+    summary = client.summarize_conversation(session.summary, turns) or _extractive_summary(session.summary, turns)
+    summary = truncate_to_tokens(summary, get_budgets()['summary'])
+
+    # Guard against a concurrent summariser having already advanced the cursor
+    updated = AgentSession.objects.filter(pk=session.pk, summary_upto=session.summary_upto).update(
+        summary=summary,
+        summary_upto=to_fold[-1][0],
+        summary_updated_at=timezone.now(),
+    )
+    if updated:
+        logger.info(f"Session {session.pk}: folded {len(to_fold)} turns into rolling summary")
+    return bool(updated)
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence_agent', '0004_alter_agentinstruction_system_prompt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='الترتيب')),
+                ('start_offset', models.PositiveIntegerField(verbose_name='بداية المقطع')),
+                ('end_offset', models.PositiveIntegerField(verbose_name='نهاية المقطع')),
+                ('content', models.TextField(verbose_name='نص المقطع')),
+                ('token_count', models.PositiveIntegerField(default=0, verbose_name='عدد الكلمات')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='intelligence_agent.agentdocument')),
+            ],
+            options={
+                'ordering': ['document', 'position'],
+                'unique_together': {('document', 'position')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DocumentTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='المصطلح')),
+                ('frequency', models.PositiveIntegerField(default=1, verbose_name='التكرار')),
+                ('chunk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='intelligence_agent.documentchunk')),
+            ],
+            options={
+                'unique_together': {('term', 'chunk')},
+            },
+        ),
+    ]
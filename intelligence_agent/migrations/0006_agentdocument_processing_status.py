@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:42
+
+from django.db import migrations, models
+
+
+def mark_processed_documents(apps, schema_editor):
+    AgentDocument = apps.get_model('intelligence_agent', 'AgentDocument')
+    AgentDocument.objects.filter(is_processed=True).update(status='COMPLETED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence_agent', '0005_documentchunk_documentterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentdocument',
+            name='error_message',
+            field=models.TextField(blank=True, verbose_name='رسالة الخطأ'),
+        ),
+        migrations.AddField(
+            model_name='agentdocument',
+            name='file_size',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='حجم الملف'),
+        ),
+        migrations.AddField(
+            model_name='agentdocument',
+            name='pages_processed',
+            field=models.PositiveIntegerField(default=0, verbose_name='الصفحات المعالجة'),
+        ),
+        migrations.AddField(
+            model_name='agentdocument',
+            name='pages_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='إجمالي الصفحات'),
+        ),
+        migrations.AddField(
+            model_name='agentdocument',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'في الانتظار'), ('PROCESSING', 'قيد المعالجة'), ('COMPLETED', 'جاهز للبحث'), ('FAILED', 'فشل المعالجة')], default='PENDING', max_length=20, verbose_name='حالة المعالجة'),
+        ),
+        migrations.RunPython(mark_processed_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intelligence_agent', '0006_agentdocument_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentsession',
+            name='summary',
+            field=models.TextField(blank=True, verbose_name='ملخص المحادثة'),
+        ),
+        migrations.AddField(
+            model_name='agentsession',
+            name='summary_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر تحديث للملخص'),
+        ),
+        migrations.AddField(
+            model_name='agentsession',
+            name='summary_upto',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='آخر رسالة ملخصة'),
+        ),
+    ]
@@ -75,9 +75,62 @@ class AgentDocument(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_processed = models.BooleanField(_("تمت المعالجة"), default=False)
 
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('في الانتظار')
+        PROCESSING = 'PROCESSING', _('قيد المعالجة')
+        COMPLETED = 'COMPLETED', _('جاهز للبحث')
+        FAILED = 'FAILED', _('فشل المعالجة')
+
+    status = models.CharField(_("حالة المعالجة"), max_length=20, choices=Status.choices, default=Status.PENDING)
+    file_size = models.PositiveBigIntegerField(_("حجم الملف"), default=0)
+    pages_total = models.PositiveIntegerField(_("إجمالي الصفحات"), default=0)
+    pages_processed = models.PositiveIntegerField(_("الصفحات المعالجة"), default=0)
+    error_message = models.TextField(_("رسالة الخطأ"), blank=True)
+
+    @property
+    def progress(self):
+        """Extraction progress as a percentage (0-100)."""
+        if self.status == self.Status.COMPLETED:
+            return 100
+        if not self.pages_total:
+            return 0
+        return min(100, int(self.pages_processed * 100 / self.pages_total))
+
     def __str__(self):
         return self.title
 
+class DocumentChunk(models.Model):
+    """
+    An overlapping passage of an AgentDocument, addressable by its character offsets.
+    """
+    document = models.ForeignKey(AgentDocument, on_delete=models.CASCADE, related_name='chunks')
+    position = models.PositiveIntegerField(_("الترتيب"))
+    start_offset = models.PositiveIntegerField(_("بداية المقطع"))
+    end_offset = models.PositiveIntegerField(_("نهاية المقطع"))
+    content = models.TextField(_("نص المقطع"))
+    token_count = models.PositiveIntegerField(_("عدد الكلمات"), default=0)
+
+    class Meta:
+        ordering = ['document', 'position']
+        unique_together = ('document', 'position')
+
+    def __str__(self):
+        return f"{self.document.title} #{self.position} ({self.start_offset}-{self.end_offset})"
+
+class DocumentTerm(models.Model):
+    """
+    Inverted index posting: a normalized term and its frequency within one chunk.
+    """
+    chunk = models.ForeignKey(DocumentChunk, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(_("المصطلح"), max_length=64)
+    frequency = models.PositiveIntegerField(_("التكرار"), default=1)
+
+    class Meta:
+        unique_together = ('term', 'chunk')
+
+    def __str__(self):
+        return f"{self.term} -> {self.chunk_id} ({self.frequency})"
+
 class AgentSession(models.Model):
     """
     A chat session between a user and the agent.
@@ -87,18 +140,30 @@ class AgentSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     last_interaction = models.DateTimeField(auto_now=True)
 
-    def get_context(self):
+    # Rolling summary of older turns; messages with id <= summary_upto are folded into it
+    summary = models.TextField(_("ملخص المحادثة"), blank=True)
+    summary_upto = models.PositiveBigIntegerField(_("آخر رسالة ملخصة"), default=0)
+    summary_updated_at = models.DateTimeField(_("آخر تحديث للملخص"), null=True, blank=True)
+
+    def unsummarized_messages(self):
+        """Messages not yet folded into the rolling summary."""
+        return self.messages.filter(id__gt=self.summary_upto)
+
+    def get_context(self, recent=10):
         """
         Constructs the message history for the LLM.
-        Includes the active system prompt.
+        Includes the active system prompt, the rolling summary and the most recent turns.
         """
         # Get System Prompt
         instruction = AgentInstruction.objects.filter(is_active=True).first()
         system_prompt = instruction.system_prompt if instruction else "You are a helpful intelligence analyst."
 
         messages = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append({"role": "system", "content": f"ملخص ما سبق من المحادثة:\n{self.summary}"})
         
-        for msg in self.messages.all().order_by('created_at'):
+        latest = self.unsummarized_messages().order_by('-created_at')[:recent]
+        for msg in reversed(latest):
             role = msg.role
             # Ensure role compatibility if needed, but our choices match standard API roles
             messages.append({"role": role, "content": msg.content})
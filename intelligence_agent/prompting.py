@@ -0,0 +1,132 @@
+import logging
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-message framing overhead added by chat templates
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = "\n[...]"
+
+DEFAULT_BUDGETS = {
+    'system': 3000,
+    'report': 1500,
+    'rag': 2000,
+    'summary': 800,
+    'history': 3000,
+    'user': 4000,
+}
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate without a tokenizer: roughly 4 characters per token for
+    Latin script and 2.5 for Arabic/other scripts, which BPE vocabularies split more finely.
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    other_chars = len(text) - ascii_chars
+    return int(ascii_chars / 4 + other_chars / 2.5) + 1
+
+
+def truncate_to_tokens(text, budget):
+    """Cuts text so its estimate fits the budget, marking the cut. Returns the text unchanged if it fits."""
+    if not text or estimate_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ""
+    # Scale by the observed chars-per-token ratio, then tighten until it fits
+    ratio = len(text) / estimate_tokens(text)
+    cut = max(int(budget * ratio) - len(TRUNCATION_MARKER), 0)
+    while cut > 0 and estimate_tokens(text[:cut] + TRUNCATION_MARKER) > budget:
+        cut = int(cut * 0.9)
+    return text[:cut].rstrip() + TRUNCATION_MARKER
+
+
+def get_budgets():
+    """Per-section token budgets, overridable via settings."""
+    budgets = dict(DEFAULT_BUDGETS)
+    for section in budgets:
+        value = getattr(settings, f'AGENT_PROMPT_{section.upper()}_TOKENS', None)
+        if value is not None:
+            budgets[section] = int(value)
+    return budgets
+
+
+class PromptBuilder:
+    """
+    Assembles a chat prompt section by section, enforcing a token budget per section
+    and an overall ceiling. History is filled newest-first and older turns that do not
+    fit are dropped.
+    """
+
+    def __init__(self, budgets=None, max_tokens=None):
+        self.budgets = budgets or get_budgets()
+        self.max_tokens = int(max_tokens or getattr(settings, 'AGENT_PROMPT_MAX_TOKENS', 12000))
+        self.system_messages = []
+        self.history = []
+        self.user_message = None
+        self.usage = {}
+        self.dropped_history = 0
+
+    @property
+    def total_tokens(self):
+        return sum(self.usage.values())
+
+    def _remaining(self):
+        return max(self.max_tokens - self.total_tokens, 0)
+
+    def _fit(self, section, content):
+        budget = min(self.budgets.get(section, self._remaining()), self._remaining())
+        return truncate_to_tokens(content, max(budget - MESSAGE_OVERHEAD_TOKENS, 0))
+
+    def add_system(self, section, content):
+        """Adds a system message for a named section (system, report, rag, ...) within its budget."""
+        if not content:
+            return
+        fitted = self._fit(section, content)
+        if not fitted:
+            return
+        if fitted is not content:
+            logger.warning(f"Prompt section '{section}' truncated to its {self.budgets.get(section)} token budget")
+        self.system_messages.append({"role": "system", "content": fitted})
+        self.usage[section] = self.usage.get(section, 0) + estimate_tokens(fitted) + MESSAGE_OVERHEAD_TOKENS
+
+    def set_user(self, content):
+        """Sets the current user turn, truncating oversized input such as attached files."""
+        fitted = self._fit('user', content or "")
+        self.user_message = {"role": "user", "content": fitted}
+        self.usage['user'] = estimate_tokens(fitted) + MESSAGE_OVERHEAD_TOKENS
+
+    def add_history(self, turns):
+        """
+        Adds prior turns, given oldest-first as (role, content) pairs. Turns are taken
+        newest-first until the history budget (or the overall ceiling) is exhausted.
+        """
+        budget = min(self.budgets.get('history', 0), self._remaining())
+        per_turn = max(budget // 3, 1)
+        kept = []
+        used = 0
+        turns = list(turns)
+        for index in range(len(turns) - 1, -1, -1):
+            role, content = turns[index]
+            content = truncate_to_tokens(content, per_turn)
+            cost = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > budget:
+                self.dropped_history = index + 1
+                break
+            kept.append({"role": role, "content": content})
+            used += cost
+        self.history = list(reversed(kept))
+        self.usage['history'] = used
+
+    def build(self):
+        messages = list(self.system_messages) + list(self.history)
+        if self.user_message:
+            messages.append(self.user_message)
+        breakdown = ", ".join(f"{name}={tokens}" for name, tokens in self.usage.items())
+        logger.info(
+            f"Prompt assembled: ~{self.total_tokens} tokens ({breakdown}); "
+            f"{len(self.history)} history turns kept, {self.dropped_history} dropped"
+        )
+        return messages
@@ -1,50 +1,41 @@
 import os
 import logging
 import re
+import time
 from django.conf import settings
 from django.utils import timezone
 from .models import AgentInstruction, AgentMessage, AgentSession, AgentDocument
+from .knowledge import search_passages
+from .documents import iter_text_pages, TEXT_EXTENSIONS
+from .prompting import PromptBuilder
 from intelligence.models import IntelligenceReport
 from django.db.models import Q
 
 logger = logging.getLogger(__name__)
 
+# Most recent messages considered for history before budgeting
+HISTORY_WINDOW = 10
+
 def extract_text_from_file(file_obj):
     """
     Extracts text from an uploaded file (PDF, TXT, MD, CSV, JSON).
     Returns a string containing the extracted text or an error message.
     """
     try:
-        # Reset pointer
-        if hasattr(file_obj, 'seek'):
-            file_obj.seek(0)
-            
         filename = file_obj.name.lower()
-        extracted_text = ""
+        if not filename.endswith(('.pdf',) + TEXT_EXTENSIONS):
+            return f"[File type '{filename}' not fully supported for text extraction]"
 
-        if filename.endswith('.pdf'):
-            try:
-                import pypdf
-                reader = pypdf.PdfReader(file_obj)
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        extracted_text += text + "\n"
-                
-                if not extracted_text.strip():
-                    return "[PDF contains no extractable text - might be an image scan]"
-            except ImportError:
-                return "[System Error: pypdf library not installed on server]"
-            except Exception as e:
-                return f"[Error extracting PDF: {str(e)}]"
+        try:
+            pages = [text for text in iter_text_pages(file_obj, filename) if text]
+        except ImportError:
+            return "[System Error: pypdf library not installed on server]"
+        except Exception as e:
+            return f"[Error extracting text: {str(e)}]"
 
-        elif filename.endswith(('.txt', '.md', '.csv', '.json')):
-            try:
-                extracted_text = file_obj.read().decode('utf-8', errors='ignore')
-            except Exception as e:
-                return f"[Error reading text file: {str(e)}]"
-        else:
-            return f"[File type '{filename}' not fully supported for text extraction]"
+        extracted_text = "\n".join(pages) if filename.endswith('.pdf') else "".join(pages)
+        if filename.endswith('.pdf') and not extracted_text.strip():
+            return "[PDF contains no extractable text - might be an image scan]"
 
         return extracted_text if extracted_text else "[File is empty]"
 
@@ -481,19 +472,13 @@ Operate with discipline, depth, and precision."""
                 context_str += f"  المحتوى: {content[:400]}...\n\n"
 
         # 2. Search Agent Documents (Knowledge Base)
-        # Build Q Object for Docs
-        doc_q = Q()
-        for term in search_terms:
-            doc_q |= Q(title__icontains=term) | Q(content_text__icontains=term)
-
-        docs = AgentDocument.objects.filter(doc_q).filter(is_processed=True).distinct().order_by('-created_at')[:3]
+        # Ranked passage lookup over the chunk index instead of scanning whole documents
+        passages = search_passages(search_terms, limit=3)
 
-        if docs.exists():
+        if passages:
             context_str += "\n--- قاعدة المعرفة (Knowledge Base) ---\n"
-            for doc in docs:
-                # Simple snippet extraction around the keyword could be better, but truncating is safe for now
-                snippet = doc.content_text[:500]
-                context_str += f"- [Doc: {doc.title}]\n{snippet}...\n\n"
+            for passage in passages:
+                context_str += f"- [Doc: {passage.document.title} | {passage.start_offset}-{passage.end_offset}]\n{passage.content.strip()}\n\n"
 
         return context_str
 
@@ -619,68 +604,113 @@ Operate with discipline, depth, and precision."""
             logger.error(f"Translation Error: {e}")
             return None
 
+    def build_messages(self, session_or_prompt, user_content=None, context_data=None):
+        """
+        Assembles the message list for a completion: system prompt, injected report,
+        RAG context and recent history for sessions, or a single user turn for plain prompts.
+        Session prompts are built under per-section token budgets (see prompting.PromptBuilder).
+        """
+        # Simple prompt mode
+        if not hasattr(session_or_prompt, 'messages'):
+            return [{"role": "user", "content": session_or_prompt}]
+
+        session = session_or_prompt
+        builder = PromptBuilder()
+
+        # 1. Add System Prompt
+        builder.add_system('system', self.get_system_prompt())
+
+        # 1.0 Inject Direct Context (If User is viewing a specific report)
+        if context_data and context_data.get('report_id'):
+            try:
+                report = IntelligenceReport.objects.get(id=context_data['report_id'])
+                report_context = f"""
+                ** Active Intelligence Report Context **
+                You are currently analyzing this specific report. All answers should reference it.
+                Title: {report.translated_title or report.title}
+                Classification: {report.get_classification_display()} / {report.severity}
+                Content: {report.translated_content or report.content}
+                """
+                builder.add_system('report', report_context)
+                logger.info(f"Injected context for Report ID: {report.id}")
+            except IntelligenceReport.DoesNotExist:
+                pass
+
+        # 1.1 Add RAG Context (General Search)
+        rag_context = self.get_relevant_context(user_content)
+        if rag_context:
+            builder.add_system('rag', f"Use this broader knowledge base if relevant:\n{rag_context}")
+
+        # 1.2 Rolling summary of turns older than the raw history window
+        if session.summary:
+            builder.add_system('summary', f"ملخص ما سبق من المحادثة:\n{session.summary}")
+
+        # 2. Recent unsummarised history, newest first; the just-saved user turn is replaced by user_content
+        recent = list(session.unsummarized_messages().order_by('-created_at')[:HISTORY_WINDOW])
+        if user_content and recent and recent[0].role == AgentMessage.Role.USER:
+            recent = recent[1:]
+        turns = [
+            ("user" if msg.role == AgentMessage.Role.USER else "assistant", msg.content)
+            for msg in reversed(recent)
+        ]
+
+        # 3. Current user turn is reserved before history so it is never crowded out
+        if user_content:
+            builder.set_user(user_content)
+        builder.add_history(turns)
+
+        return builder.build()
+
+    def summarize_conversation(self, previous_summary, turns):
+        """
+        Merges older (role, content) turns into the running session summary.
+        Returns None when the model is unavailable so callers can fall back.
+        """
+        if not self.client:
+            return None
+
+        transcript = "\n".join(
+            f"{'المستخدم' if role == AgentMessage.Role.USER else 'الوكيل'}: {content}"
+            for role, content in turns
+        )
+        prompt = f"""حدّث ملخص المحادثة التالية بإيجاز (لا يتجاوز 200 كلمة) مع الحفاظ على الحقائق والأسماء والأرقام والأسئلة المفتوحة. لا تضف معلومات.
+
+الملخص السابق:
+{previous_summary or "لا يوجد"}
+
+الرسائل الجديدة:
+{transcript}
+
+أعد الملخص المحدّث فقط."""
+
+        try:
+            completion = self._call_groq(
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.2,
+                max_tokens=600,
+                reasoning_effort='low',
+            )
+            return completion.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Conversation summary failed: {e}")
+            return None
+
+    def _format_error(self, error):
+        error_msg = str(error)
+        if "invalid_api_key" in error_msg or "Error code: 401" in error_msg:
+            return "⚠️ فشل الاتصال بمحرك الذكاء الاصطناعي: مفتاح Groq غير صالح أو غير مفعل. حدّث المفتاح من (إعدادات الوكيل) ثم أعد المحاولة."
+        return f"⚠️ حدث خطأ أثناء الاتصال بالنموذج الذكي: {error_msg}"
+
     def chat_completion(self, session_or_prompt, user_content=None, context_data=None):
         """
         Wrapper for chat completion that handles both simple prompts and full session context.
         Supports 'context_data' to inject specific report details.
         """
-        # Resolve actual user text
-        actual_text = user_content
-        if not actual_text and not hasattr(session_or_prompt, 'messages'):
-            actual_text = str(session_or_prompt)
-
         # --- Strict Real Mode: No Simulation ---
         if not self.client:
             return "⚠️ خطأ في النظام: لا يمكن الاتصال بمحرك الذكاء الاصطناعي (Groq Client Not Initialized)."
 
-        messages = []
-        
-        # Check if first arg is a session object
-        if hasattr(session_or_prompt, 'messages'):
-            session = session_or_prompt
-            
-            # 1. Add System Prompt
-            system_prompt = self.get_system_prompt()
-            messages.append({"role": "system", "content": system_prompt})
-            
-            # 1.0 Inject Direct Context (If User is viewing a specific report)
-            if context_data and context_data.get('report_id'):
-                try:
-                    report = IntelligenceReport.objects.get(id=context_data['report_id'])
-                    report_context = f"""
-                    ** Active Intelligence Report Context **
-                    You are currently analyzing this specific report. All answers should reference it.
-                    Title: {report.translated_title or report.title}
-                    Classification: {report.get_classification_display()} / {report.severity}
-                    Content: {report.translated_content or report.content}
-                    """
-                    messages.append({"role": "system", "content": report_context})
-                    logger.info(f"Injected context for Report ID: {report.id}")
-                except IntelligenceReport.DoesNotExist:
-                    pass
-
-            # 1.1 Add RAG Context (General Search)
-            rag_context = self.get_relevant_context(actual_text)
-            if rag_context:
-                messages.append({"role": "system", "content": f"Use this broader knowledge base if relevant:\n{rag_context}"})
-            
-            # 2. Add History (Last 10 messages)
-            history = session.messages.order_by('-created_at')[:10]
-            for msg in reversed(history):
-                role = "user" if msg.role == 'USER' else "assistant"
-                content = msg.content[:4000] if len(msg.content) > 4000 else msg.content
-                messages.append({"role": role, "content": content})
-            
-            # 3. Enhance latest user message
-            if messages and messages[-1]['role'] == 'user' and user_content:
-                messages[-1]['content'] = user_content
-            elif user_content:
-                messages.append({"role": "user", "content": user_content})
-                
-        else:
-            # Simple prompt mode
-            prompt = session_or_prompt
-            messages = [{"role": "user", "content": prompt}]
+        messages = self.build_messages(session_or_prompt, user_content, context_data)
 
         try:
             # Use _call_groq wrapper
@@ -693,7 +723,44 @@ Operate with discipline, depth, and precision."""
             return completion.choices[0].message.content
         except Exception as e:
             logger.error(f"Groq Chat Error: {e}")
-            error_msg = str(e)
-            if "invalid_api_key" in error_msg or "Error code: 401" in error_msg:
-                return "⚠️ فشل الاتصال بمحرك الذكاء الاصطناعي: مفتاح Groq غير صالح أو غير مفعل. حدّث المفتاح من (إعدادات الوكيل) ثم أعد المحاولة."
-            return f"⚠️ حدث خطأ أثناء الاتصال بالنموذج الذكي: {error_msg}"
+            return self._format_error(e)
+
+    def stream_chat_completion(self, session_or_prompt, user_content=None, context_data=None):
+        """
+        Streaming variant of chat_completion: yields text deltas as the model produces them.
+        Errors are yielded as a final text fragment so callers can persist them like any reply.
+        Time-to-first-token and total duration are logged per call.
+        """
+        if not self.client:
+            yield "⚠️ خطأ في النظام: لا يمكن الاتصال بمحرك الذكاء الاصطناعي (Groq Client Not Initialized)."
+            return
+
+        messages = self.build_messages(session_or_prompt, user_content, context_data)
+
+        started = time.perf_counter()
+        first_token_at = None
+        chunk_count = 0
+        try:
+            stream = self._call_groq(
+                messages=messages,
+                temperature=getattr(settings, 'GROQ_TEMPERATURE', 0.3),
+                max_tokens=4096,
+                reasoning_effort=getattr(settings, 'GROQ_REASONING_EFFORT', None),
+                stream=True,
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    logger.info(f"LLM stream time-to-first-token: {(first_token_at - started) * 1000:.0f}ms")
+                chunk_count += 1
+                yield delta
+        except Exception as e:
+            logger.error(f"Groq Stream Error: {e}")
+            yield self._format_error(e)
+        finally:
+            logger.info(f"LLM stream finished in {(time.perf_counter() - started) * 1000:.0f}ms ({chunk_count} chunks)")
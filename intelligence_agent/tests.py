@@ -1,11 +1,30 @@
+import shutil
+import tempfile
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from unittest.mock import patch
-from .models import AgentSession, AgentMessage, AgentInstruction
+from django.test import override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest.mock import patch, MagicMock
+from intelligence.models import BackgroundJob
+from .models import AgentSession, AgentMessage, AgentInstruction, AgentDocument
+from .knowledge import TITLE_MATCH_BOOST, chunk_text, index_document, search_passages
+from .documents import enqueue_document, process_document
+from .prompting import PromptBuilder, estimate_tokens
+from .memory import needs_summary, schedule_summary, summarize_session
+from .services import GroqClient, HISTORY_WINDOW
 
 User = get_user_model()
 
+# Creating a user writes its QR code image; keep those out of the real media directory
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class IntelligenceAgentTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -54,6 +73,38 @@ class IntelligenceAgentTests(TestCase):
         # 4. Verify DB
         self.assertEqual(AgentMessage.objects.filter(session=session).count(), 2) # User + Assistant
 
+    @patch('intelligence_agent.views.GroqClient')
+    def test_stream_message_forwards_tokens_and_persists(self, MockGroqClient):
+        """Test the SSE endpoint streams deltas and stores the final assistant message."""
+        mock_instance = MockGroqClient.return_value
+        mock_instance.stream_chat_completion.return_value = iter(["Threat ", "level ", "elevated."])
+
+        session = AgentSession.objects.create(user=self.user, title="Stream Session")
+        url = reverse('agent_stream_message', args=[session.id])
+        response = self.client.post(url, {'content': 'Assess the situation'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('event: token', body)
+        self.assertIn('event: done', body)
+
+        assistant = AgentMessage.objects.get(session=session, role=AgentMessage.Role.ASSISTANT)
+        self.assertEqual(assistant.content, "Threat level elevated.")
+
+    def test_stream_chat_completion_yields_deltas(self):
+        """Test the client unwraps streamed chunks into text deltas."""
+        def chunk(text):
+            return MagicMock(choices=[MagicMock(delta=MagicMock(content=text))])
+
+        client = GroqClient()
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = iter([chunk("مرحبا"), chunk(None), chunk(" بك")])
+
+        deltas = list(client.stream_chat_completion("ping"))
+        self.assertEqual(deltas, ["مرحبا", " بك"])
+        self.assertTrue(client.client.chat.completions.create.call_args.kwargs['stream'])
+
     def test_settings_update(self):
         """Test updating the system prompt."""
         url = reverse('agent_settings')
@@ -68,3 +119,253 @@ class IntelligenceAgentTests(TestCase):
         
         instruction = AgentInstruction.objects.first()
         self.assertEqual(instruction.system_prompt, new_prompt)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class KnowledgeBaseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kb_user', password='password123')
+        preamble = "مقدمة عامة عن الوثيقة " * 200
+        self.text = preamble + " تفاصيل منظومة الدفاع الجوي في القطاع الشمالي " + "خاتمة " * 100
+        self.document = AgentDocument.objects.create(
+            title="دليل التهديدات",
+            file='agent_docs/guide.txt',
+            uploaded_by=self.user,
+            content_text=self.text,
+            is_processed=True,
+        )
+
+    def test_chunks_overlap_and_cover_text(self):
+        passages = chunk_text(self.text, size=500, overlap=100)
+        self.assertEqual(passages[0].start_offset, 0)
+        self.assertEqual(passages[-1].end_offset, len(self.text))
+        for previous, current in zip(passages, passages[1:]):
+            self.assertLess(current.start_offset, previous.end_offset)
+            self.assertEqual(self.text[current.start_offset:current.end_offset], current.content)
+
+    def test_search_returns_matching_passage_with_offsets(self):
+        self.assertGreater(index_document(self.document), 1)
+        results = search_passages(["الدفاع الجوي"])
+        self.assertTrue(results)
+        best = results[0]
+        self.assertIn("الدفاع الجوي", best.content)
+        self.assertGreater(best.start_offset, 0)
+
+    def test_title_match_returns_opening_passage(self):
+        index_document(self.document)
+        results = search_passages(["دليل التهديدات"])
+        self.assertTrue(results)
+        self.assertEqual((results[0].document_id, results[0].position), (self.document.id, 0))
+
+    def test_title_boost_applies_before_the_limit(self):
+        index_document(self.document)
+        dense = AgentDocument.objects.create(
+            title="نشرة", file='agent_docs/dense.txt', uploaded_by=self.user,
+            content_text="رادار رادار ملاحظات " * 2, is_processed=True,
+        )
+        titled = AgentDocument.objects.create(
+            title="تقرير رادار", file='agent_docs/titled.txt', uploaded_by=self.user,
+            content_text="ملاحظات رادار", is_processed=True,
+        )
+        index_document(dense)
+        index_document(titled)
+        # Unboosted, the dense passage ranks first; the title match must still win the only slot
+        results = search_passages(["رادار"], limit=1)
+        self.assertEqual([chunk.document_id for chunk in results], [titled.id])
+        self.assertGreater(results[0].score, TITLE_MATCH_BOOST)
+
+    def test_search_is_capped_to_limit(self):
+        index_document(self.document)
+        self.assertEqual(len(search_passages(["مقدمة"], limit=2)), 2)
+
+    def test_rag_context_carries_passage_not_preamble(self):
+        index_document(self.document)
+        context = GroqClient().get_relevant_context("الدفاع الجوي")
+        self.assertIn("قاعدة المعرفة", context)
+        self.assertIn("الدفاع الجوي", context)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DocumentPipelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='doc_admin',
+            password='password123',
+            role=User.Role.ADMIN,
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _make_document(self, name, payload):
+        return AgentDocument.objects.create(
+            title=name,
+            file=SimpleUploadedFile(name, payload),
+            uploaded_by=self.user,
+        )
+
+    @patch('intelligence_agent.views.enqueue_document')
+    def test_upload_enqueues_instead_of_extracting(self, mock_enqueue):
+        upload = SimpleUploadedFile('brief.txt', "تقرير ميداني".encode('utf-8'))
+        response = self.client.post(reverse('agent_settings'), {'upload_document': '1', 'document': upload})
+        self.assertEqual(response.status_code, 302)
+
+        document = AgentDocument.objects.get(title='brief.txt')
+        self.assertEqual(document.status, AgentDocument.Status.PENDING)
+        self.assertFalse(document.chunks.exists())
+        mock_enqueue.assert_called_once_with(document.id)
+
+    def test_process_document_streams_into_chunks(self):
+        document = self._make_document('notes.txt', ("رصد تحركات " * 2000).encode('utf-8'))
+        process_document(document.id)
+
+        document.refresh_from_db()
+        self.assertEqual(document.status, AgentDocument.Status.COMPLETED)
+        self.assertTrue(document.is_processed)
+        self.assertEqual(document.progress, 100)
+        self.assertGreater(document.chunks.count(), 1)
+
+        self.assertTrue(document.content_text.startswith("رصد تحركات"))
+
+        response = self.client.get(reverse('agent_document_status', args=[document.id]))
+        self.assertEqual(response.json()['status'], 'COMPLETED')
+
+    @override_settings(AGENT_DOC_CONTENT_CHARS=100)
+    def test_content_text_is_capped_but_chunks_cover_the_document(self):
+        document = self._make_document('notes.txt', ("رصد تحركات " * 2000 + "خاتمة التقرير").encode('utf-8'))
+        process_document(document.id)
+
+        document.refresh_from_db()
+        self.assertEqual(len(document.content_text), 100)
+        self.assertIn("خاتمة التقرير", document.chunks.order_by('-position').first().content)
+
+    def test_failed_reprocessing_keeps_previous_passages(self):
+        document = self._make_document('notes.txt', ("رصد تحركات " * 2000).encode('utf-8'))
+        process_document(document.id)
+        chunk_ids = set(document.chunks.values_list('id', flat=True))
+
+        with patch('intelligence_agent.documents.iter_text_pages', side_effect=ValueError("corrupt file")):
+            process_document(document.id)
+
+        document.refresh_from_db()
+        self.assertEqual(document.status, AgentDocument.Status.FAILED)
+        self.assertEqual(set(document.chunks.values_list('id', flat=True)), chunk_ids)
+
+    def test_enqueue_runs_extraction_as_background_job(self):
+        document = self._make_document('notes.txt', "تقرير ميداني".encode('utf-8'))
+        job = enqueue_document(document.id)
+
+        document.refresh_from_db()
+        self.assertEqual(job.job_type, BackgroundJob.JobType.PROCESS_DOCUMENT)
+        self.assertEqual(job.status, BackgroundJob.Status.SUCCEEDED)
+        self.assertEqual(document.status, AgentDocument.Status.COMPLETED)
+        # A finished job does not block reprocessing the same document
+        self.assertNotEqual(enqueue_document(document.id).pk, job.pk)
+
+    @override_settings(AGENT_DOC_MAX_BYTES=10)
+    def test_oversized_document_fails(self):
+        document = self._make_document('big.txt', b'x' * 100)
+        process_document(document.id)
+
+        document.refresh_from_db()
+        self.assertEqual(document.status, AgentDocument.Status.FAILED)
+        self.assertFalse(document.chunks.exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PromptBudgetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='budget_user', password='password123')
+        self.session = AgentSession.objects.create(user=self.user, title="Budget Session")
+
+    def test_sections_are_truncated_to_budget(self):
+        budgets = {'system': 50, 'report': 100, 'rag': 100, 'history': 200, 'user': 100}
+        builder = PromptBuilder(budgets=budgets, max_tokens=1000)
+        builder.add_system('report', "تفاصيل التقرير " * 500)
+        builder.set_user("سؤال قصير")
+        messages = builder.build()
+
+        self.assertLessEqual(estimate_tokens(messages[0]['content']), budgets['report'])
+        self.assertLessEqual(builder.total_tokens, 1000)
+
+    def test_history_keeps_newest_turns_within_budget(self):
+        builder = PromptBuilder(budgets={'history': 60}, max_tokens=1000)
+        turns = [("user", f"turn {i} " + "x" * 60) for i in range(10)]
+        builder.add_history(turns)
+        messages = builder.build()
+
+        self.assertTrue(messages)
+        self.assertGreater(builder.dropped_history, 0)
+        self.assertTrue(messages[-1]['content'].startswith("turn 9"))
+        self.assertLessEqual(builder.usage['history'], 60)
+
+    def test_session_history_roles_and_current_turn(self):
+        AgentMessage.objects.create(session=self.session, role=AgentMessage.Role.USER, content="first question")
+        AgentMessage.objects.create(session=self.session, role=AgentMessage.Role.ASSISTANT, content="first answer")
+        AgentMessage.objects.create(session=self.session, role=AgentMessage.Role.USER, content="second question")
+
+        messages = GroqClient().build_messages(self.session, "second question + attachment")
+        conversation = [m for m in messages if m['role'] != 'system']
+
+        self.assertEqual([m['role'] for m in conversation], ['user', 'assistant', 'user'])
+        self.assertEqual(conversation[-1]['content'], "second question + attachment")
+
+
+@override_settings(AGENT_SUMMARY_THRESHOLD=6, AGENT_SUMMARY_KEEP_RECENT=2)
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RollingSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='summary_user', password='password123')
+        self.session = AgentSession.objects.create(user=self.user, title="Long Session")
+
+    def _add_turns(self, count, start=0):
+        for i in range(start, start + count):
+            role = AgentMessage.Role.USER if i % 2 == 0 else AgentMessage.Role.ASSISTANT
+            AgentMessage.objects.create(session=self.session, role=role, content=f"turn {i}")
+
+    def test_no_summary_below_threshold(self):
+        self._add_turns(5)
+        self.assertFalse(summarize_session(self.session.id))
+
+    def test_older_turns_are_folded_incrementally(self):
+        mock_client = MagicMock()
+        mock_client.summarize_conversation.return_value = "summary v1"
+        self._add_turns(8)
+        self.assertTrue(summarize_session(self.session.id, client=mock_client))
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary, "summary v1")
+        self.assertEqual(self.session.unsummarized_messages().count(), 2)
+
+        # Next round receives the previous summary plus only the newly folded turns
+        mock_client.summarize_conversation.return_value = "summary v2"
+        self._add_turns(6, start=8)
+        self.assertTrue(summarize_session(self.session.id, client=mock_client))
+        previous, turns = mock_client.summarize_conversation.call_args.args
+        self.assertEqual(previous, "summary v1")
+        self.assertEqual(len(turns), 6)
+
+    def test_summary_is_scheduled_as_a_background_job(self):
+        self._add_turns(8)
+        schedule_summary(self.session)  # no API key: extractive fallback
+        job = BackgroundJob.objects.get()
+        self.assertEqual(
+            (job.job_type, job.status, job.unique_key),
+            (BackgroundJob.JobType.SUMMARIZE_SESSION, BackgroundJob.Status.SUCCEEDED, f"summarize_session:{self.session.id}"),
+        )
+        self.session.refresh_from_db()
+        self.assertIn("turn 0", self.session.summary)
+
+    @override_settings(AGENT_SUMMARY_THRESHOLD=50)
+    def test_threshold_never_exceeds_history_window(self):
+        self._add_turns(HISTORY_WINDOW)
+        self.assertTrue(needs_summary(self.session))
+
+    def test_prompt_uses_summary_and_recent_turns_only(self):
+        self._add_turns(8)
+        summarize_session(self.session.id)  # no API key: extractive fallback
+        self.session.refresh_from_db()
+
+        messages = GroqClient().build_messages(self.session, "follow-up")
+        self.assertTrue(any(self.session.summary in m['content'] for m in messages if m['role'] == 'system'))
+        history = [m['content'] for m in messages if m['role'] != 'system']
+        self.assertEqual(history, ["turn 6", "turn 7", "follow-up"])
@@ -1,13 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.core.exceptions import PermissionDenied
 from django.conf import settings
 from .models import AgentSession, AgentMessage, AgentDocument, AgentInstruction
 from .services import GroqClient, extract_text_from_file
+from .documents import enqueue_document, TEXT_EXTENSIONS
+from .memory import schedule_summary
 from intelligence.models import IntelligenceReport
 import os
+import json
 from dotenv import set_key
 
 @login_required
@@ -93,19 +96,17 @@ def create_new_session(request):
 
     return redirect('agent_chat', session_id=session.id)
 
-@login_required
-@require_POST
-def send_message(request, session_id):
+def _record_user_turn(request, session):
     """
-    API endpoint to handle user messages with optional attachments.
+    Saves the user's message (and attachment) and returns the text to send to the model
+    together with any active report context. Returns None when the message is empty.
     """
-    session = get_object_or_404(AgentSession, id=session_id, user=request.user)
     data = request.POST
     content = data.get('content', '').strip()
     attachment = request.FILES.get('attachment')
     
     if not content and not attachment:
-        return JsonResponse({'error': 'No content or attachment'}, status=400)
+        return None
     
     # Update title if it's the first message
     if session.messages.count() == 0:
@@ -124,48 +125,34 @@ def send_message(request, session_id):
     # Prepare context for AI
     ai_context_content = content
     if attachment:
-        try:
-            # Simple text extraction for now. 
-            # Ideally, use libraries like PyPDF2 or textract for robust parsing.
-            if attachment.name.endswith('.txt') or attachment.name.endswith('.md') or attachment.name.endswith('.csv'):
-                file_content = attachment.read().decode('utf-8', errors='ignore')
-                ai_context_content += f"\n\n[System: User uploaded file '{attachment.name}'. Content:]\n{file_content}\n[End of file]"
-            elif attachment.name.endswith('.pdf'):
-                try:
-                    import pypdf
-                    # Reset pointer just in case, though usually at 0 for fresh upload
-                    if hasattr(attachment, 'seek'):
-                        attachment.seek(0)
-                    
-                    reader = pypdf.PdfReader(attachment)
-                    text = ""
-                    for page in reader.pages:
-                        extracted = page.extract_text()
-                        if extracted:
-                            text += extracted + "\n"
-                    
-                    if not text.strip():
-                        text = "[PDF contains no extractable text - might be an image scan]"
-
-                    ai_context_content += f"\n\n[System: User uploaded PDF '{attachment.name}'. Content extracted below:]\n{text}\n[End of PDF]"
-                except ImportError:
-                    ai_context_content += f"\n\n[System: User uploaded PDF '{attachment.name}'. Error: pypdf library not installed on server.]"
-                except Exception as e:
-                    ai_context_content += f"\n\n[System: User uploaded PDF '{attachment.name}'. Error parsing PDF: {str(e)}]"
-            else:
-                ai_context_content += f"\n\n[System: User uploaded file '{attachment.name}'. File content analysis not fully supported yet, but acknowledge receipt.]"
-        except Exception as e:
-            ai_context_content += f"\n\n[System: Error reading file '{attachment.name}': {str(e)}]"
+        if attachment.name.lower().endswith(('.pdf',) + TEXT_EXTENSIONS):
+            file_content = extract_text_from_file(attachment)
+            ai_context_content += f"\n\n[System: User uploaded file '{attachment.name}'. Content:]\n{file_content}\n[End of file]"
+        else:
+            ai_context_content += f"\n\n[System: User uploaded file '{attachment.name}'. File content analysis not fully supported yet, but acknowledge receipt.]"
 
-    # 2. Get AI Response
-    client = GroqClient()
-    
     # Check for report context (Active Context Injection)
     context_data = {}
     report_id = data.get('report_id')
     if report_id:
         context_data['report_id'] = report_id
 
+    return user_msg, ai_context_content, context_data
+
+@login_required
+@require_POST
+def send_message(request, session_id):
+    """
+    API endpoint to handle user messages with optional attachments.
+    """
+    session = get_object_or_404(AgentSession, id=session_id, user=request.user)
+    turn = _record_user_turn(request, session)
+    if turn is None:
+        return JsonResponse({'error': 'No content or attachment'}, status=400)
+    user_msg, ai_context_content, context_data = turn
+
+    # 2. Get AI Response
+    client = GroqClient()
     ai_response_text = client.chat_completion(session, ai_context_content, context_data=context_data)
     
     # 3. Save AI Message
@@ -174,15 +161,71 @@ def send_message(request, session_id):
         role=AgentMessage.Role.ASSISTANT,
         content=ai_response_text
     )
+    schedule_summary(session)
     
     return JsonResponse({
         'status': 'success',
-        'user_message': content,
+        'user_message': user_msg.content,
         'attachment_url': user_msg.attachment.url if user_msg.attachment else None,
         'ai_message': ai_message.content,
         'created_at': ai_message.created_at.strftime('%H:%M')
     })
 
+def _sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@login_required
+@require_POST
+def stream_message(request, session_id):
+    """
+    Server-Sent Events variant of send_message: forwards model tokens as they arrive
+    and persists the assistant message once the stream ends (or the client disconnects).
+    """
+    session = get_object_or_404(AgentSession, id=session_id, user=request.user)
+    turn = _record_user_turn(request, session)
+    if turn is None:
+        return JsonResponse({'error': 'No content or attachment'}, status=400)
+    user_msg, ai_context_content, context_data = turn
+
+    client = GroqClient()
+
+    def event_stream():
+        parts = []
+        saved = False
+        try:
+            yield _sse_event('start', {
+                'user_message': user_msg.content,
+                'attachment_url': user_msg.attachment.url if user_msg.attachment else None,
+            })
+            for delta in client.stream_chat_completion(session, ai_context_content, context_data=context_data):
+                parts.append(delta)
+                yield _sse_event('token', {'text': delta})
+
+            ai_message = AgentMessage.objects.create(
+                session=session,
+                role=AgentMessage.Role.ASSISTANT,
+                content="".join(parts)
+            )
+            saved = True
+            schedule_summary(session)
+            yield _sse_event('done', {
+                'id': ai_message.id,
+                'created_at': ai_message.created_at.strftime('%H:%M'),
+            })
+        finally:
+            # Keep whatever was generated if the client went away mid-stream
+            if not saved and parts:
+                AgentMessage.objects.create(
+                    session=session,
+                    role=AgentMessage.Role.ASSISTANT,
+                    content="".join(parts)
+                )
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 @require_POST
 def delete_session(request, session_id):
@@ -255,20 +298,12 @@ def agent_settings_view(request):
             agent_doc = AgentDocument.objects.create(
                 title=doc.name,
                 file=doc,
+                file_size=doc.size,
                 uploaded_by=request.user,
                 is_processed=False
             )
-            
-            # Process Document Immediately
-            try:
-                extracted_text = extract_text_from_file(doc)
-                if extracted_text:
-                    agent_doc.content_text = extracted_text
-                    agent_doc.is_processed = True
-                    agent_doc.save()
-            except Exception as e:
-                # Log error but keep document
-                print(f"Error processing document {doc.name}: {e}")
+            # Extraction and indexing run as a background job
+            enqueue_document(agent_doc.id)
 
         return redirect('agent_settings')
 
@@ -287,6 +322,22 @@ def agent_settings_view(request):
     }
     return render(request, 'intelligence_agent/settings.html', context)
 
+@login_required
+def document_status(request, document_id):
+    """
+    Progress endpoint polled by the settings page while a document is processed.
+    """
+    document = get_object_or_404(AgentDocument, id=document_id, uploaded_by=request.user)
+    return JsonResponse({
+        'id': document.id,
+        'status': document.status,
+        'status_display': document.get_status_display(),
+        'pages_processed': document.pages_processed,
+        'pages_total': document.pages_total,
+        'progress': document.progress,
+        'error': document.error_message,
+    })
+
 def llm_health_check(request):
     """
     Health check endpoint for LLM connectivity.
@@ -46,6 +46,8 @@ fi
 if [ "$SKIP_DB_TASKS" != "1" ]; then
   echo "Running migrations..."
   python manage.py migrate --no-input
+  python manage.py createcachetable
+  python manage.py flush_audit_spool || true
 fi
 
 if [ "$SKIP_DB_TASKS" != "1" ]; then
@@ -59,4 +61,4 @@ python manage.py collectstatic --noinput --clear || echo "⚠️  Static files c
 
 # Start Gunicorn
 echo "Starting Gunicorn on port ${PORT:-8004}..."
-exec gunicorn --bind=0.0.0.0:${PORT:-8004} --timeout 600 --workers ${WEB_CONCURRENCY:-3} --log-level info --access-logfile - --error-logfile - config.wsgi:application
+exec gunicorn --bind=0.0.0.0:${PORT:-8004} --timeout 600 --workers ${WEB_CONCURRENCY:-3} --worker-class gthread --threads ${GUNICORN_THREADS:-4} --log-level info --access-logfile - --error-logfile - config.wsgi:application
@@ -53,6 +53,8 @@ fi
 if [ "$SKIP_DB_TASKS" != "1" ]; then
   echo "🗄️  Running database migrations..."
   python manage.py migrate --no-input
+  python manage.py createcachetable
+  python manage.py flush_audit_spool || true
   echo "✅ Migrations completed"
   echo ""
 fi
@@ -89,6 +91,7 @@ echo "=========================================="
 echo "🌐 Starting Gunicorn Server"
    echo "   Binding: 0.0.0.0:${PORT:-8004}"
    echo "   Workers: $WORKERS"
+   echo "   Threads: ${GUNICORN_THREADS:-4}"
    echo "   Timeout: 600s"
    echo "   Log Level: info"
 echo "=========================================="
@@ -99,7 +102,8 @@ exec gunicorn \
     --bind=0.0.0.0:${PORT:-8004} \
     --workers=$WORKERS \
     --timeout=600 \
-    --worker-class=sync \
+    --worker-class=gthread \
+    --threads=${GUNICORN_THREADS:-4} \
     --worker-tmp-dir=/dev/shm \
     --log-level=info \
     --access-logfile=- \